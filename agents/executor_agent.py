@@ -1,59 +1,76 @@
 ## agents/execution_agent.py
 
-from typing import Dict, Any
-from openai import OpenAI
+from typing import Dict, Any, List, Optional, Tuple
+import json
+from openai import OpenAI, AsyncOpenAI
 from config.llm_settings import client, LLM_MODEL, LLM_TEMPERATURE
-from tools.budget_tool import manage_budget
-from tools.search_tool import search_internet
+from tools.budget_tool import BUDGETS, DEFAULT_SESSION
+from tools.tool_executor import ToolExecutor
+from tools.tool_registry import TOOL_REGISTRY
+from framework.llm_cache import CompletionCache, with_completion_cache
+from framework.context_manager import ContextManager, message_to_dict
+from framework.streaming import print_token, stream_completion, astream_completion
+from framework.tracing import with_tracing
+from framework.loop_guard import llm_usage_tokens
+from framework.itinerary import CATALOGS, DEFAULT_CATALOG, Itinerary, catalog_for, parse_goal, parse_travelers
+from framework.itinerary_optimizer import ItineraryOptimizer
+
+EXECUTOR_TOOLS = ("search_internet", "manage_budget")
 
 class ExecutionAgent:
-    def __init__(self):
-        self.client = client
+    def __init__(self, tool_executor: ToolExecutor = None, llm_client=None, async_llm_client=None,
+                 completion_cache: CompletionCache = None, context_manager: ContextManager = None,
+                 stream: bool = False, on_token=print_token, local_budgeting: bool = True,
+                 optimizer: ItineraryOptimizer = None):
+        self.completion_cache = completion_cache
+        # stream=True prints tokens as they arrive and starts tools as soon as their arguments are complete
+        self.stream = stream
+        self.on_token = on_token
+        self.context_manager = context_manager or ContextManager()
+        # Tracing wraps the cache, so cached replies show up as cache hits on the LLM span
+        self.client = with_tracing(with_completion_cache(llm_client or client, completion_cache), "executor")
+        self._async_client = with_tracing(
+            with_completion_cache(async_llm_client, completion_cache, is_async=True), "executor", is_async=True
+        )
         self.model = LLM_MODEL
         self.temperature = LLM_TEMPERATURE
-        self.tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_internet",
-                    "description": "Search the internet for detailed information for specific parts of the plan (e.g., specific restaurant, exact timings for a temple).",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {"type": "string", "description": "The search query."},
-                        },
-                        "required": ["query"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "manage_budget",
-                    "description": "Track and manage the trip budget for granular expenses.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "action": {"type": "string", "enum": ["add_expense", "get_status"], "description": "Action to perform on the budget."},
-                            "item": {"type": "string", "description": "Name of the expense item (required for add_expense)."},
-                            "cost": {"type": "number", "description": "Cost of the item (required for add_expense)."},
-                        },
-                        "required": ["action"],
-                    },
-                },
-            },
-        ]
+        # Schemas come from the shared registry, built once at import
+        self.tools = TOOL_REGISTRY.schemas(EXECUTOR_TOOLS)
+        self.tool_executor = tool_executor or ToolExecutor()
+        # local_budgeting=True fits the itinerary to the budget without the LLM,
+        # which is then called once to narrate the result
+        self.local_budgeting = local_budgeting
+        # One optimizer per destination catalog; `optimizer` replaces the default (Bali) one
+        self.optimizers = {name: ItineraryOptimizer(*catalog) for name, catalog in CATALOGS.items()}
+        if optimizer is not None:
+            self.optimizers[DEFAULT_CATALOG] = optimizer
 
-    def refine_and_execute(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+    @property
+    def async_client(self):
+        # Created on first use, mirroring the configured sync client
+        if self._async_client is None:
+            self._async_client = with_tracing(
+                with_completion_cache(
+                    AsyncOpenAI(api_key=self.client.api_key, base_url=self.client.base_url),
+                    self.completion_cache,
+                    is_async=True,
+                ),
+                "executor",
+                is_async=True,
+            )
+        return self._async_client
+
+    def _prepare_messages(self, current_state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Refines the trip plan and simulates execution, making detailed budget entries.
+        Returns (history, new_messages); new messages go back to the graph as an update.
         """
         trip_plan = current_state.get("trip_plan")
-        messages = current_state.get("messages", [])
+        history = current_state.get("messages", [])
+        new_messages = []
 
-        if not messages or (messages and messages[-1].get("role") == "tool"):
+        if not history or history[-1].get("role") == "tool":
              # Add system message if not already present or if previous was a tool call
-            messages.append({
+            new_messages.append({
                 "role": "system",
                 "content": (
                     "You are an execution agent. Your task is to refine the trip plan, "
@@ -65,72 +82,211 @@ class ExecutionAgent:
                     "or 'EXECUTION_PENDING' if more details are needed or tools were called."
                 )
             })
-            if trip_plan and not any("trip_plan" in msg.get("content", "") for msg in messages if msg.get("role") == "user"):
+            refine_request = f"Refine and budget this plan:\n{trip_plan}"
+            if trip_plan and not any(msg.get("content") == refine_request for msg in history if msg.get("role") == "user"):
                  # Only add the trip plan as a new user message if it hasn't been added yet
-                messages.append({"role": "user", "content": f"Refine and budget this plan:\n{trip_plan}"})
+                new_messages.append({"role": "user", "content": refine_request})
+        return history + new_messages, new_messages
+
+    def _completion_kwargs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        prompt, _ = self.context_manager.prepare(messages)
+        return dict(
+            model=self.model,
+            messages=prompt,
+            tools=self.tools,
+            tool_choice="auto",
+            temperature=self.temperature
+        )
+
+    def _apply_response(self, new_messages: List[Dict[str, Any]], response_message, tool_results) -> Dict[str, Any]:
+        # The assistant message is recorded once, followed by one result per tool call
+        new_messages.append(message_to_dict(response_message))
+        if response_message.tool_calls:
+            for tool_call, function_name, tool_response in tool_results:
+                new_messages.append(
+                    {
+                        "tool_call_id": tool_call.id,
+                        "role": "tool",
+                        "name": function_name,
+                        "content": tool_response,
+                    }
+                )
+            return {"messages": new_messages, "next_step": "execution"} # Stay in execution if tools were called
+
+        execution_status = response_message.content or ""
+        print(f"\n[EXECUTION AGENT] Execution status update: {execution_status}")
+        if "EXECUTION_COMPLETE" in execution_status:
+            next_step = "finalize"
+        elif "EXECUTION_PENDING" in execution_status:
+            next_step = "execution"
+        else:
+            # If it's just general text, assume it's part of refinement and loop
+            next_step = "execution"
+        return {"messages": new_messages, "next_step": next_step}
 
+    def _plan_locally(self, current_state: Dict[str, Any], session_id: str) -> Optional[Itinerary]:
+        """
+        Fits an itinerary for the goal's destination, length and group size to
+        the session's remaining budget and records its expenses. Returns None
+        when the local path does not apply (no catalog for the destination) or
+        nothing fits, in which case the LLM budgets its own plan item by item.
+        """
+        if not self.local_budgeting or not current_state.get("trip_plan") or current_state.get("itinerary"):
+            return None
+        goal = current_state.get("goal", "")
+        optimizer = self.optimizers.get(catalog_for(goal))
+        if optimizer is None:
+            print("\n[EXECUTION AGENT] No activity catalog for this destination; budgeting the plan with the LLM.")
+            return None
+        days, themes = parse_goal(goal)
+        travelers = parse_travelers(goal)
+        budget = BUDGETS.get(session_id)
+        itinerary = optimizer.optimize(days, budget.remaining_budget, themes, travelers)
+        if itinerary is None:
+            print(f"\n[EXECUTION AGENT] Remaining budget ₹{budget.remaining_budget:.2f} is too small for a "
+                  f"{days}-day itinerary; budgeting with the LLM instead.")
+            return None
+        for item, cost, category in itinerary.expense_lines():
+            budget.add_expense(item, cost, category)
+        print(f"\n[EXECUTION AGENT] Itinerary fitted locally: {len(itinerary.activities)} activities "
+              f"for {travelers} traveler(s), total ₹{itinerary.total_cost:.2f}.")
+        return itinerary
+
+    def _narration_kwargs(self, current_state: Dict[str, Any], itinerary: Itinerary) -> Dict[str, Any]:
+        # No tools: every cost is already decided, the model only writes
+        return dict(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a travel writer. Turn the costed itinerary into a short, friendly day-by-day plan. "
+                        "Keep every activity, day and cost exactly as given; do not add or change prices."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"Goal: {current_state.get('goal', '')}\n"
+                        f"Draft plan:\n{current_state.get('trip_plan', '')}\n\n"
+                        f"Itinerary (JSON):\n{json.dumps(itinerary.to_dict(), ensure_ascii=False)}"
+                    ),
+                },
+            ],
+            temperature=self.temperature,
+        )
+
+    def _apply_narration(self, itinerary: Itinerary, narration: str) -> Dict[str, Any]:
+        trip_plan = f"{narration}\n\n{itinerary.to_text()}" if narration else itinerary.to_text()
+        return {
+            "messages": [{"role": "assistant", "content": trip_plan}],
+            "trip_plan": trip_plan,
+            "itinerary": itinerary.to_dict(),
+            "next_step": "finalize",
+        }
+
+    def narrate(self, current_state: Dict[str, Any], itinerary: Itinerary) -> Dict[str, Any]:
+        """One LLM call that describes a locally fitted itinerary. Falls back to the plain itinerary text."""
+        completion_kwargs = self._narration_kwargs(current_state, itinerary)
+        response, narration = None, None
+        try:
+            if self.stream:
+                narration, _ = stream_completion(self.client, completion_kwargs, self.tool_executor, {}, self.on_token)
+            else:
+                response = self.client.chat.completions.create(**completion_kwargs)
+                narration = response.choices[0].message
+        except Exception as e:
+            print(f"Narration failed, using the itinerary as is: {e}")
+        update = self._apply_narration(itinerary, narration.content if narration is not None else None)
+        update["llm_calls"] = 1
+        update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, narration) if narration is not None else 0
+        return update
+
+    async def anarrate(self, current_state: Dict[str, Any], itinerary: Itinerary) -> Dict[str, Any]:
+        """Async version of narrate()."""
+        completion_kwargs = self._narration_kwargs(current_state, itinerary)
+        response, narration = None, None
+        try:
+            if self.stream:
+                narration, _ = await astream_completion(self.async_client, completion_kwargs, self.tool_executor, {}, self.on_token)
+            else:
+                response = await self.async_client.chat.completions.create(**completion_kwargs)
+                narration = response.choices[0].message
+        except Exception as e:
+            print(f"Narration failed, using the itinerary as is: {e}")
+        update = self._apply_narration(itinerary, narration.content if narration is not None else None)
+        update["llm_calls"] = 1
+        update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, narration) if narration is not None else 0
+        return update
+
+    def refine_and_execute(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Refines the trip plan and simulates execution, making detailed budget entries.
+        Returns a partial state update containing only the new messages.
+        """
+        messages, new_messages = self._prepare_messages(current_state)
+        session_id = current_state.get("session_id", DEFAULT_SESSION)
 
         print("\n[EXECUTION AGENT] Refining plan and managing budget...")
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.tools,
-                tool_choice="auto",
-                temperature=self.temperature
-            )
-            response_message = response.choices[0].message
-            tool_calls = response_message.tool_calls
-
-            if tool_calls:
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = {}
-                    try:
-                        function_args = eval(tool_call.function.arguments) # Be cautious
-                    except Exception as e:
-                        print(f"Error parsing tool arguments: {e}")
-                        import json
-                        try:
-                            function_args = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse arguments as JSON: {tool_call.function.arguments}")
-                            continue
-
-                    tool_response = ""
-                    if function_name == "manage_budget":
-                        tool_response = manage_budget(**function_args)
-                    elif function_name == "search_internet":
-                        tool_response = search_internet(**function_args)
-                    
-                    messages.append(response_message)
-                    messages.append(
-                        {
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": tool_response,
-                        }
-                    )
-                current_state["messages"] = messages
-                current_state["next_step"] = "execution" # Stay in execution if tools were called
+            itinerary = self._plan_locally(current_state, session_id)
+            if itinerary is not None:
+                return self.narrate(current_state, itinerary)
+            context = {"session_id": session_id}
+            completion_kwargs = self._completion_kwargs(messages)
+            response = None
+            if self.stream:
+                response_message, tool_results = stream_completion(
+                    self.client, completion_kwargs, self.tool_executor, context, self.on_token
+                )
             else:
-                execution_status = response_message.content
-                print(f"\n[EXECUTION AGENT] Execution status update: {execution_status}")
-                messages.append(response_message)
-                current_state["messages"] = messages
-                if "EXECUTION_COMPLETE" in execution_status:
-                    current_state["next_step"] = "finalize"
-                elif "EXECUTION_PENDING" in execution_status:
-                    current_state["next_step"] = "execution"
-                else:
-                    # If it's just general text, assume it's part of refinement and loop
-                    current_state["next_step"] = "execution"
+                response = self.client.chat.completions.create(**completion_kwargs)
+                response_message = response.choices[0].message
+                tool_results = []
+                if response_message.tool_calls:
+                    tool_results = self.tool_executor.run_tool_calls(response_message.tool_calls, context)
+            update = self._apply_response(new_messages, response_message, tool_results)
+            # Usage feeds the loop guard's per-session budgets
+            update["llm_calls"] = 1
+            update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, response_message)
+            return update
 
         except Exception as e:
             print(f"Error in Execution Agent: {e}")
-            current_state["error"] = str(e)
-            current_state["next_step"] = "error"
+            return {"error": str(e), "next_step": "error"}
+
+    async def arefine_and_execute(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async version of refine_and_execute for the async graph.
+        """
+        messages, new_messages = self._prepare_messages(current_state)
+        session_id = current_state.get("session_id", DEFAULT_SESSION)
+
+        print("\n[EXECUTION AGENT] Refining plan and managing budget...")
         
-        return current_state Executor agent: calls tools like search, budget
+        try:
+            itinerary = self._plan_locally(current_state, session_id)
+            if itinerary is not None:
+                return await self.anarrate(current_state, itinerary)
+            context = {"session_id": session_id}
+            completion_kwargs = self._completion_kwargs(messages)
+            response = None
+            if self.stream:
+                response_message, tool_results = await astream_completion(
+                    self.async_client, completion_kwargs, self.tool_executor, context, self.on_token
+                )
+            else:
+                response = await self.async_client.chat.completions.create(**completion_kwargs)
+                response_message = response.choices[0].message
+                tool_results = []
+                if response_message.tool_calls:
+                    tool_results = await self.tool_executor.arun_tool_calls(response_message.tool_calls, context)
+            update = self._apply_response(new_messages, response_message, tool_results)
+            update["llm_calls"] = 1
+            update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, response_message)
+            return update
+
+        except Exception as e:
+            print(f"Error in Execution Agent: {e}")
+            return {"error": str(e), "next_step": "error"}
@@ -2,26 +2,45 @@
 # agents/memory_agent.py
 
 from typing import Dict, Any, List
+from framework.memory_store import MemoryIndex
+from framework.snapshot_store import SnapshotStore
 
 class MemoryAgent:
-    def __init__(self):
-        self.memory_store: List[Dict[str, Any]] = []
+    def __init__(self, use_vectors: bool = False, max_snapshots: int = 200, max_sessions: int = 1000):
+        # Delta snapshots with an append-only message log per session
+        self.memory_store = SnapshotStore(max_snapshots=max_snapshots, max_sessions=max_sessions)
+        # Chunked, incrementally indexed view of the stored states, for the same sessions
+        self.index = MemoryIndex(use_vectors=use_vectors, max_sessions=max_sessions)
 
     def store_state(self, state: Dict[str, Any]) -> None:
-        """Stores the current state in memory."""
-        # A simple append; in a real scenario, you might summarize or extract key info
-        self.memory_store.append(state)
+        """Stores the current state in memory and indexes what is new in it."""
+        self.memory_store.add(state)
+        self.index.add_state(state)
         print("\n[MEMORY AGENT] State stored.")
 
-    def retrieve_info(self, query: str = None) -> List[Dict[str, Any]]:
-        """Retrieves relevant information from memory."""
-        print(f"\n[MEMORY AGENT] Retrieving info for: '{query}' (dummy retrieval).")
-        # For simplicity, return all recent states or states matching a simple keyword
+    def retrieve_info(self, query: str = None, k: int = 5, mode: str = "bm25") -> List[Dict[str, Any]]:
+        """
+        Retrieves relevant information from memory.
+        With a query, returns the top-k matching records (BM25 by default, or
+        'vector'/'hybrid' when the vector index is enabled); without one, the last 5 states.
+        """
+        print(f"\n[MEMORY AGENT] Retrieving info for: '{query}'.")
         if query:
-            return [s for s in self.memory_store if query.lower() in str(s).lower()]
-        return self.memory_store[-5:] # Return last 5 states
+            return self.index.search(query, k=k, mode=mode)
+        return self.memory_store.recent(5) # Return last 5 states
+
+    def forget(self, session_id: str) -> None:
+        """Drops a session's snapshots and its searchable records."""
+        self.memory_store.drop(session_id)
+        self.index.forget(session_id)
 
     def process_memory(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
         """Processes and potentially updates memory based on current state."""
-        self.store_state(current_state.copy()) # Store a copy to avoid mutation issues
-        return current_state
\ No newline at end of file
+        # The snapshot store copies only what is new, so no full copy is needed here
+        self.store_state(current_state)
+        # Nothing to change: returning the state would re-append its messages via the reducer
+        return {}
+
+    async def aprocess_memory(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Async node wrapper; storing is in-process and never waits on I/O."""
+        return self.process_memory(current_state)
@@ -1,155 +1,227 @@
 # Planner agent: decides next step using LLM
 # agents/planning_agent.py
 
-from typing import List, Dict, Any
-from openai import OpenAI
+from typing import List, Dict, Any, Tuple
+from openai import OpenAI, AsyncOpenAI
 from config.llm_settings import client, LLM_MODEL, LLM_TEMPERATURE
-from tools.search_tool import search_internet
-from tools.budget_tool import manage_budget
-from tools.flight_tool import search_flights
+from tools.budget_tool import BUDGETS, manage_budget, DEFAULT_SESSION
+from tools.flight_tool import cheapest_flight
+from tools.tool_executor import ToolExecutor
+from tools.tool_registry import TOOL_REGISTRY
+from framework.llm_cache import CompletionCache, with_completion_cache
+from framework.context_manager import ContextManager, message_to_dict
+from framework.streaming import print_token, stream_completion, astream_completion
+from framework.tracing import with_tracing
+from framework.loop_guard import llm_usage_tokens
+from framework.plan_fanout import PlanFanout, report as fanout_report, research_done
+
+PLANNER_TOOLS = ("search_internet", "search_flights", "manage_budget")
 
 class PlanningAgent:
-    def __init__(self):
-        self.client = client
+    def __init__(self, tool_executor: ToolExecutor = None, llm_client=None, async_llm_client=None,
+                 completion_cache: CompletionCache = None, context_manager: ContextManager = None,
+                 stream: bool = False, on_token=print_token, fanout: int = 1, fanout_threshold: float = 0.8):
+        self.completion_cache = completion_cache
+        # stream=True prints tokens as they arrive and starts tools as soon as their arguments are complete
+        self.stream = stream
+        self.on_token = on_token
+        self.context_manager = context_manager or ContextManager()
+        # Tracing wraps the cache, so cached replies show up as cache hits on the LLM span
+        self.client = with_tracing(with_completion_cache(llm_client or client, completion_cache), "planner")
+        self._async_client = with_tracing(
+            with_completion_cache(async_llm_client, completion_cache, is_async=True), "planner", is_async=True
+        )
         self.model = LLM_MODEL
         self.temperature = LLM_TEMPERATURE
-        self.tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_internet",
-                    "description": "Search the internet for information about Bali trip planning, attractions, costs, etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {"type": "string", "description": "The search query."},
-                        },
-                        "required": ["query"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_flights",
-                    "description": "Search for flight availability and estimated costs.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "origin": {"type": "string", "description": "Departure city (e.g., Delhi)."},
-                            "destination": {"type": "string", "description": "Arrival city (e.g., Bali)."},
-                            "date": {"type": "string", "description": "Travel date (e.g., '2025-07-20')."},
-                            "num_travelers": {"type": "integer", "description": "Number of travelers."},
-                        },
-                        "required": ["origin", "destination", "date"],
-                    },
-                },
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "manage_budget",
-                    "description": "Track and manage the trip budget.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "action": {"type": "string", "enum": ["add_expense", "get_status"], "description": "Action to perform on the budget."},
-                            "item": {"type": "string", "description": "Name of the expense item (required for add_expense)."},
-                            "cost": {"type": "number", "description": "Cost of the item (required for add_expense)."},
-                        },
-                        "required": ["action"],
-                    },
-                },
-            },
-        ]
+        # Schemas come from the shared registry, built once at import
+        self.tools = TOOL_REGISTRY.schemas(PLANNER_TOOLS)
+        self.tool_executor = tool_executor or ToolExecutor()
+        # fanout > 1 writes the final plan alongside fanout-1 concurrent emphasis candidates
+        self.fanout = PlanFanout(fanout, fanout_threshold) if fanout > 1 else None
 
-    def generate_plan(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+    @property
+    def async_client(self):
+        # Created on first use, mirroring the configured sync client
+        if self._async_client is None:
+            self._async_client = with_tracing(
+                with_completion_cache(
+                    AsyncOpenAI(api_key=self.client.api_key, base_url=self.client.base_url),
+                    self.completion_cache,
+                    is_async=True,
+                ),
+                "planner",
+                is_async=True,
+            )
+        return self._async_client
+
+    def _prepare_messages(self, current_state: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Generates a high-level 7-day Bali trip plan based on the goal.
-        Utilizes tools for information gathering.
+        Returns (history, new_messages). The state's message list is never mutated:
+        new messages are returned as an update and appended by the graph reducer.
         """
         user_goal = current_state.get("goal")
-        messages = current_state.get("messages", [])
+        history = current_state.get("messages", [])
+        new_messages = []
 
-        if not messages:
-            messages.append({"role": "user", "content": user_goal})
-            messages.append({
+        if not history:
+            new_messages.append({"role": "user", "content": user_goal})
+            new_messages.append({
                 "role": "system",
                 "content": (
                     "You are a Bali trip planning expert. Your goal is to create a detailed 7-day "
                     "relaxing trip plan covering beach, culture, and nature, staying under ₹80,000 from Delhi. "
                     "Use the provided tools (search_internet, search_flights, manage_budget) to gather information and estimate costs. "
                     "First, research Bali, then flights, and then start outlining a daily itinerary. "
+                    "One search_flights call can cover a date window (date to date_to) and several comma-separated cities; "
+                    "the cheapest fare it finds is added to the budget automatically. "
                     "Be mindful of the budget at all times. Respond with a comprehensive plan when complete, or suggest next steps."
                 )
             })
+        return history + new_messages, new_messages
+
+    def _completion_kwargs(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        prompt, _ = self.context_manager.prepare(messages)
+        return dict(
+            model=self.model,
+            messages=prompt,
+            tools=self.tools,
+            tool_choice="auto",
+            temperature=self.temperature
+        )
+
+    def _apply_response(self, new_messages: List[Dict[str, Any]], response_message, tool_results, session_id: str) -> Dict[str, Any]:
+        # The assistant message is recorded once, followed by one result per tool call
+        new_messages.append(message_to_dict(response_message))
+        if response_message.tool_calls:
+            # Results come back in the original tool_call order
+            for tool_call, function_name, tool_response in tool_results:
+                if function_name == "search_flights":
+                    # Budget the cheapest fare the search found
+                    flight = cheapest_flight(tool_response)
+                    if flight:
+                        item = f"Flights {flight['origin']}-{flight['destination']} on {flight['date']} ({flight['airline']})"
+                        manage_budget("add_expense", item, flight["total_cost"], "transport", session_id=session_id)
+                
+                new_messages.append(
+                    {
+                        "tool_call_id": tool_call.id,
+                        "role": "tool",
+                        "name": function_name,
+                        "content": tool_response,
+                    }
+                )
+            return {"messages": new_messages, "next_step": "planning"} # Keep planning if tools were called
+
+        # If no tool calls, it's generating a text response (the plan)
+        plan_content = response_message.content
+        print(f"\n[PLANNING AGENT] Generated Plan:\n{plan_content}")
+        return {
+            "messages": new_messages,
+            "trip_plan": plan_content,
+            "next_step": "review", # Transition to review or execution
+        }
+
+    def _use_fanout(self, messages: List[Dict[str, Any]]) -> bool:
+        # Only the final plan step fans out: earlier replies are tool calls, which no emphasis can improve
+        return self.fanout is not None and not self.stream and research_done(messages)
+
+    def _fanout_usage(self, candidates, completion_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Every sent request counts against the loop guard, answered or not
+        tokens = sum(llm_usage_tokens(c.response, completion_kwargs, c.message) for c in candidates if c.message is not None)
+        return {"llm_calls": sum(1 for c in candidates if c.sent), "llm_tokens": tokens}
+
+    def generate_plan(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generates a high-level 7-day Bali trip plan based on the goal.
+        Utilizes tools for information gathering.
+        Returns a partial state update containing only the new messages.
+        """
+        messages, new_messages = self._prepare_messages(current_state)
+        session_id = current_state.get("session_id", DEFAULT_SESSION)
 
         print("\n[PLANNING AGENT] Thinking...")
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.tools,
-                tool_choice="auto",
-                temperature=self.temperature
-            )
-            response_message = response.choices[0].message
-            tool_calls = response_message.tool_calls
-
-            if tool_calls:
-                # Call tools and add their output to messages
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = {}
-                    try:
-                        function_args = eval(tool_call.function.arguments) # Be cautious with eval in production
-                    except Exception as e:
-                        print(f"Error parsing tool arguments: {e}")
-                        # Fallback for ill-formatted JSON from LLM
-                        import json
-                        try:
-                            function_args = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse arguments as JSON: {tool_call.function.arguments}")
-                            continue
-
-                    tool_response = ""
-                    if function_name == "search_internet":
-                        tool_response = search_internet(**function_args)
-                    elif function_name == "search_flights":
-                        tool_response = search_flights(**function_args)
-                        # Add flight cost to budget (dummy)
-                        if "Estimated total cost" in tool_response:
-                            cost_str = tool_response.split("Estimated total cost: ₹")[1].split(".")[0]
-                            flight_cost = float(cost_str)
-                            manage_budget("add_expense", "Flights", flight_cost)
-                    elif function_name == "manage_budget":
-                        tool_response = manage_budget(**function_args)
-                    
-                    messages.append(response_message)
-                    messages.append(
-                        {
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": tool_response,
-                        }
-                    )
-                current_state["messages"] = messages
-                current_state["next_step"] = "planning" # Keep planning if tools were called
+            context = {"session_id": session_id}
+            completion_kwargs = self._completion_kwargs(messages)
+            response = None
+            if self._use_fanout(messages):
+                remaining = BUDGETS.get(session_id).remaining_budget
+                winner, candidates = self.fanout.run(
+                    self.client.chat.completions.create, completion_kwargs, current_state.get("goal", ""), remaining
+                )
+                print(fanout_report(candidates, winner))
+                if winner is None:
+                    raise RuntimeError("every plan candidate failed")
+                tool_results = []
+                if winner.message.tool_calls:
+                    tool_results = self.tool_executor.run_tool_calls(winner.message.tool_calls, context)
+                update = self._apply_response(new_messages, winner.message, tool_results, session_id)
+                update.update(self._fanout_usage(candidates, completion_kwargs))
+                return update
+            if self.stream:
+                response_message, tool_results = stream_completion(
+                    self.client, completion_kwargs, self.tool_executor, context, self.on_token
+                )
+            else:
+                response = self.client.chat.completions.create(**completion_kwargs)
+                response_message = response.choices[0].message
+                tool_results = []
+                if response_message.tool_calls:
+                    tool_results = self.tool_executor.run_tool_calls(response_message.tool_calls, context)
+            update = self._apply_response(new_messages, response_message, tool_results, session_id)
+            # Usage feeds the loop guard's per-session budgets
+            update["llm_calls"] = 1
+            update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, response_message)
+            return update
+
+        except Exception as e:
+            print(f"Error in Planning Agent: {e}")
+            return {"error": str(e), "next_step": "error"}
+
+    async def agenerate_plan(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async version of generate_plan: awaits the LLM and the tool calls instead
+        of blocking, so one event loop can drive many planning sessions.
+        """
+        messages, new_messages = self._prepare_messages(current_state)
+        session_id = current_state.get("session_id", DEFAULT_SESSION)
+
+        print("\n[PLANNING AGENT] Thinking...")
+
+        try:
+            context = {"session_id": session_id}
+            completion_kwargs = self._completion_kwargs(messages)
+            response = None
+            if self._use_fanout(messages):
+                remaining = BUDGETS.get(session_id).remaining_budget
+                winner, candidates = await self.fanout.arun(
+                    self.async_client.chat.completions.create, completion_kwargs, current_state.get("goal", ""), remaining
+                )
+                print(fanout_report(candidates, winner))
+                if winner is None:
+                    raise RuntimeError("every plan candidate failed")
+                tool_results = []
+                if winner.message.tool_calls:
+                    tool_results = await self.tool_executor.arun_tool_calls(winner.message.tool_calls, context)
+                update = self._apply_response(new_messages, winner.message, tool_results, session_id)
+                update.update(self._fanout_usage(candidates, completion_kwargs))
+                return update
+            if self.stream:
+                response_message, tool_results = await astream_completion(
+                    self.async_client, completion_kwargs, self.tool_executor, context, self.on_token
+                )
             else:
-                # If no tool calls, it's generating a text response (the plan)
-                plan_content = response_message.content
-                print(f"\n[PLANNING AGENT] Generated Plan:\n{plan_content}")
-                current_state["trip_plan"] = plan_content
-                current_state["next_step"] = "review" # Transition to review or execution
-                messages.append(response_message)
-                current_state["messages"] = messages # Update messages for next step
+                response = await self.async_client.chat.completions.create(**completion_kwargs)
+                response_message = response.choices[0].message
+                tool_results = []
+                if response_message.tool_calls:
+                    tool_results = await self.tool_executor.arun_tool_calls(response_message.tool_calls, context)
+            update = self._apply_response(new_messages, response_message, tool_results, session_id)
+            update["llm_calls"] = 1
+            update["llm_tokens"] = llm_usage_tokens(response, completion_kwargs, response_message)
+            return update
 
         except Exception as e:
             print(f"Error in Planning Agent: {e}")
-            current_state["error"] = str(e)
-            current_state["next_step"] = "error"
-        
-        return current_state
\ No newline at end of file
+            return {"error": str(e), "next_step": "error"}
\ No newline at end of file
@@ -0,0 +1,113 @@
+# Gateway load test: interactive and batch traffic through LLMGateway against the mock server
+# bench/gateway_load.py
+#
+# Usage (from the repository root):
+#   python -m bench.gateway_load --requests 400 --threads 48 --concurrency 8 --failure-rate 0.05
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+from framework.llm_gateway import LLMGateway
+from framework.mock_llm_server import MockLLMServer
+
+QUESTIONS = ("beaches in Bali", "Ubud temples", "Nusa Penida day trip", "Bali food costs", "Mount Batur trek")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    # Nearest rank, as in the batch runner (importing it would pull in the graph)
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _request(i: int, rng: random.Random, duplicate_share: float) -> Dict[str, Any]:
+    # A share of requests repeat a few prompts, as concurrent sessions with the same goal do
+    question = rng.choice(QUESTIONS) if rng.random() < duplicate_share else f"{rng.choice(QUESTIONS)} #{i}"
+    return {
+        "model": "mock-model",
+        "messages": [{"role": "system", "content": "You are a travel assistant."}, {"role": "user", "content": question}],
+        "temperature": 0,
+    }
+
+
+def run_load(requests: int = 400, threads: int = 48, concurrency: int = 8, rate: float = None,
+             latency: float = 0.05, failure_rate: float = 0.05, batch_share: float = 0.7,
+             duplicate_share: float = 0.2, seed: int = 7) -> Dict[str, Any]:
+    server = MockLLMServer(latency=latency, failure_rate=failure_rate, seed=seed)
+    base_url = server.start()
+    gateway = LLMGateway(api_key="mock", base_url=base_url, default_rate=rate, max_concurrency=concurrency,
+                         max_connections=concurrency, max_retries=5)
+    clients = {"interactive": gateway.client("interactive"), "batch": gateway.client("batch")}
+    rng = random.Random(seed)
+    jobs = [("batch" if rng.random() < batch_share else "interactive", _request(i, rng, duplicate_share))
+            for i in range(requests)]
+    latencies: Dict[str, List[float]] = {"interactive": [], "batch": []}
+    errors: List[str] = []
+    lock = threading.Lock()
+    cursor = iter(jobs)
+
+    def worker() -> None:
+        while True:
+            with lock:
+                job = next(cursor, None)
+            if job is None:
+                return
+            priority, request = job
+            started = time.perf_counter()
+            try:
+                clients[priority].chat.completions.create(**request)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            with lock:
+                latencies[priority].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    gateway.close()
+    server.stop()
+
+    return {
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "errors": len(errors),
+        "latency_s": {
+            priority: {"n": len(values), "p50": round(_percentile(values, 0.5), 3), "p95": round(_percentile(values, 0.95), 3)}
+            for priority, values in latencies.items()
+        },
+        "gateway": dict(gateway.stats),
+        "server": dict(server.stats),
+        "max_concurrency": concurrency,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test LLMGateway against the mock LLM server.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=48, help="Concurrent callers.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Gateway concurrency slots.")
+    parser.add_argument("--rate", type=float, default=None, help="Requests/second for the model (default: unlimited).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server seconds per request.")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of mock responses that are 429/503.")
+    parser.add_argument("--batch-share", type=float, default=0.7, help="Share of requests sent with batch priority.")
+    args = parser.parse_args()
+    result = run_load(args.requests, args.threads, args.concurrency, args.rate, args.latency,
+                      args.failure_rate, args.batch_share)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
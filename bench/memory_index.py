@@ -0,0 +1,67 @@
+# Memory index benchmark: BM25 lookup latency against the old str(state) scan
+# bench/memory_index.py
+#
+# Usage (from the repository root):
+#   python -m bench.memory_index --states 10000 100000 --queries 200
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from framework.memory_store import MemoryIndex
+
+
+def run(state_counts: Tuple[int, ...] = (10_000, 100_000), queries: int = 200) -> None:
+    """Lookup latency of MemoryIndex for growing numbers of stored states."""
+    rng = random.Random(7)
+    places = ["seminyak", "ubud", "uluwatu", "kuta", "nusa dua", "tanah lot", "mount batur", "tegalalang", "jimbaran"]
+    topics = ["beach", "temple", "trek", "dinner", "hotel", "driver", "snorkeling", "spa", "market", "waterfall"]
+    query_terms = [f"{rng.choice(topics)} {rng.choice(places)}" for _ in range(queries)]
+
+    for count in state_counts:
+        # Every session is kept, so only the postings cap bounds the lookup
+        index = MemoryIndex(max_sessions=None)
+        messages: List[Dict[str, Any]] = []
+        started = time.perf_counter()
+        for i in range(count):
+            session_id = f"s{i // 50}"
+            if i % 50 == 0:
+                messages = []
+            place, topic = rng.choice(places), rng.choice(topics)
+            messages = messages + [{
+                "role": "tool",
+                "name": "search_internet",
+                "content": f"{topic} near {place}: option {i} costs ₹{rng.randint(500, 9000)} per person.",
+            }]
+            index.add_state({"session_id": session_id, "goal": "Plan a 7-day Bali trip", "messages": messages})
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in query_terms:
+            index.search(query, k=5)
+        per_query_ms = (time.perf_counter() - started) / queries * 1000
+
+        # The previous str(state) substring scan, on a sample to keep the run short
+        sample = [{"goal": "Plan a 7-day Bali trip", "messages": [{"content": "x" * 80}] * 25} for _ in range(2000)]
+        started = time.perf_counter()
+        for query in query_terms[:20]:
+            [s for s in sample if query in str(s).lower()]
+        scan_ms = (time.perf_counter() - started) / 20 * 1000 * (count / len(sample))
+
+        print(
+            f"{count:>7} states | {len(index):>7} records | build {build_seconds:.1f}s | "
+            f"bm25 lookup {per_query_ms:.2f} ms | str(state) scan ~{scan_ms:.0f} ms (extrapolated)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MemoryIndex lookup latency vs. stored states")
+    parser.add_argument("--states", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(tuple(args.states), args.queries)
+
+
+if __name__ == "__main__":
+    main()
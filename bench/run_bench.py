@@ -0,0 +1,162 @@
+# Benchmark harness: replays scripted sessions through the LangGraph workflow
+# bench/run_bench.py
+#
+# Usage (from the repository root):
+#   python -m bench.run_bench                      # all scenarios
+#   python -m bench.run_bench --scenario long_loop --repeats 5 --output bench_results.json
+#   python -m bench.run_bench --script recorded.json   # replay a recorded script
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from framework.langgraph_auto_loop import BaliTripAgent
+from framework.fake_llm import FakeLLMClient
+from tools.budget_tool import BUDGETS
+from tools.tool_cache import TOOL_CACHES
+from bench.scripted_llm import ScriptedPolicy, load_script
+from bench.scenarios import SCENARIOS, Scenario
+
+RECURSION_LIMIT = 500  # long scripted loops go past LangGraph's default of 25 steps
+
+
+def _timed_run(agent: BaliTripAgent, goal: str, session_id: str) -> Dict[str, Any]:
+    """
+    Streams the graph in "updates" mode: each item is one finished node, so the
+    gap between items is that node's latency.
+    """
+    BUDGETS.reset(session_id)
+    config = dict(agent._config(session_id), recursion_limit=RECURSION_LIMIT)
+    node_ms: Dict[str, List[float]] = {}
+    tool_calls: Dict[str, int] = {}
+    stop_reason = None
+    steps = 0
+    last = time.perf_counter()
+    for update in agent.workflow.stream(agent._initial_state(goal, session_id), config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, node_update in update.items():
+            steps += 1
+            node_ms.setdefault(node, []).append((now - last) * 1000)
+            stop_reason = (node_update or {}).get("stop_reason") or stop_reason
+            for message in (node_update or {}).get("messages", []):
+                if message.get("role") == "tool":
+                    tool_calls[message["name"]] = tool_calls.get(message["name"], 0) + 1
+        last = now
+    return {"node_ms": node_ms, "tool_calls": tool_calls, "steps": steps, "stop_reason": stop_reason}
+
+
+def run_scenario(scenario: Scenario, repeats: int = 3, verbose: bool = False) -> Dict[str, Any]:
+    runs = []
+    for repeat in range(repeats):
+        # Every repeat starts with cold tool caches, so repeats are comparable.
+        # A TOOL_CACHE_DB is left intact (and will serve hits): unset it for cold numbers.
+        for cache in TOOL_CACHES.values():
+            cache.clear(persisted=False)
+        client = FakeLLMClient(policy=ScriptedPolicy(scenario.script))
+        output = None if verbose else io.StringIO()
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            agent = BaliTripAgent(llm_client=client, loop_limits=scenario.loop_limits,
+                                  local_budgeting=scenario.local_budgeting)
+            setup = scenario.setup(agent) if scenario.setup else {}
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = _timed_run(agent, "Plan a 7-day relaxing trip to Bali", f"bench-{scenario.name}-{repeat}")
+            wall_ms = (time.perf_counter() - started) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            retrieval_ms = []
+            for query in scenario.queries:
+                query_started = time.perf_counter()
+                agent.memory_agent.retrieve_info(query, k=5)
+                retrieval_ms.append((time.perf_counter() - query_started) * 1000)
+
+        runs.append(dict(result, wall_ms=wall_ms, peak_kb=peak / 1024, llm_calls=client.call_count,
+                         prompt_tokens=list(client.prompt_tokens), setup=setup, retrieval_ms=retrieval_ms))
+    return summarize(scenario, runs)
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.mean(values), 3),
+        "min": round(min(values), 3),
+        "max": round(max(values), 3),
+    }
+
+
+def summarize(scenario: Scenario, runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Counts (LLM calls, tool calls, prompt tokens) are deterministic and come from
+    the first run; timings and peak memory are aggregated over all runs.
+    """
+    first = runs[0]
+    nodes = sorted({node for run in runs for node in run["node_ms"]})
+    prompt_tokens = first["prompt_tokens"]
+    return {
+        "scenario": scenario.name,
+        "description": scenario.description,
+        "repeats": len(runs),
+        "setup": first["setup"],
+        "counts": {
+            "graph_steps": first["steps"],
+            "stop_reason": first["stop_reason"],
+            "llm_calls": first["llm_calls"],
+            "tool_calls": first["tool_calls"],
+            "node_visits": {node: len(first["node_ms"].get(node, [])) for node in nodes},
+        },
+        "prompt_tokens": {
+            "per_call": prompt_tokens,
+            "total": sum(prompt_tokens),
+            "max": max(prompt_tokens) if prompt_tokens else 0,
+            "growth_per_call": round((prompt_tokens[-1] - prompt_tokens[0]) / (len(prompt_tokens) - 1), 1)
+            if len(prompt_tokens) > 1 else 0.0,
+        },
+        "latency_ms": {
+            "wall": _stats([run["wall_ms"] for run in runs]),
+            "per_node": {
+                node: _stats([ms for run in runs for ms in run["node_ms"].get(node, [])])
+                for node in nodes
+            },
+            "memory_retrieval": _stats([ms for run in runs for ms in run["retrieval_ms"]])
+            if first["retrieval_ms"] else None,
+        },
+        "peak_memory_kb": _stats([run["peak_kb"] for run in runs]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planning and execution loops with a scripted fake LLM.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable; default: all).")
+    parser.add_argument("--script", help="Replay a recorded script (JSON) as an extra scenario.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' output while running.")
+    args = parser.parse_args()
+
+    scenarios = [SCENARIOS[name]() for name in (args.scenario or sorted(SCENARIOS))]
+    if args.script:
+        scenarios.append(Scenario("recorded", f"Replay of {args.script}", load_script(args.script)))
+
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.repeats, args.verbose)
+        results.append(result)
+        print(f"[BENCH] {scenario.name}: {result['latency_ms']['wall']['mean']:.1f} ms, "
+              f"{result['counts']['llm_calls']} LLM calls, {result['prompt_tokens']['total']} prompt tokens, "
+              f"peak {result['peak_memory_kb']['max']:.0f} KB")
+
+    report = {"python": platform.python_version(), "repeats": args.repeats, "scenarios": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Benchmark scenarios: scripted LLM turns plus optional setup for each run
+# bench/scenarios.py
+
+from typing import Any, Callable, Dict, List, Optional
+
+from framework.loop_guard import LoopLimits
+
+PLAN_TEXT = (
+    "Day 1: Arrive, Seminyak beach. Day 2: Ubud culture. Day 3: Tegalalang rice terraces. "
+    "Day 4: Mount Batur sunrise trek. Day 5: Uluwatu temple. Day 6: Nusa Dua. Day 7: Depart."
+)
+
+RESEARCH_TURN = {"tool_calls": [
+    ["search_internet", {"query": "7-day relaxing trip bali"}],
+    ["search_flights", {"origin": "Delhi", "destination": "Bali", "date": "20 July 2025", "num_travelers": 1}],
+]}
+
+
+class Scenario:
+    def __init__(self, name: str, description: str, script: Dict[str, List[Dict[str, Any]]],
+                 setup: Optional[Callable[[Any], Dict[str, Any]]] = None,
+                 queries: List[str] = (), loop_limits: LoopLimits = None, local_budgeting: bool = True):
+        self.name = name
+        self.description = description
+        self.script = script
+        # setup(agent) runs before the timed graph run and returns facts for the report
+        self.setup = setup
+        # Memory retrieval queries timed after the run
+        self.queries = list(queries)
+        # Loop guard limits for the agent (None: the agent's defaults)
+        self.loop_limits = loop_limits
+        # False makes the executor budget through the LLM loop instead of the local optimizer
+        self.local_budgeting = local_budgeting
+
+
+def baseline_script() -> Dict[str, List[Dict[str, Any]]]:
+    """The stock session: one research round, the plan, one budgeting round, done (the budgeting round only runs with local_budgeting=False)."""
+    return {
+        "planner": [RESEARCH_TURN, {"content": PLAN_TEXT}],
+        "executor": [
+            {"tool_calls": [
+                ["manage_budget", {"action": "add_expense", "item": "Accommodation", "cost": 21000}],
+                ["manage_budget", {"action": "add_expense", "item": "Activities", "cost": 12000}],
+                ["manage_budget", {"action": "get_status"}],
+            ]},
+            {"content": "EXECUTION_COMPLETE: accommodation and activities are budgeted."},
+        ],
+    }
+
+
+def long_loop_script(iterations: int = 40) -> Dict[str, List[Dict[str, Any]]]:
+    """An executor that budgets one item per turn, with research and status checks mixed in."""
+    turns = []
+    for i in range(iterations):
+        if i % 10 == 9:
+            turns.append({"tool_calls": [["manage_budget", {"action": "get_status"}]]})
+        elif i % 5 == 4:
+            turns.append({"tool_calls": [["search_internet", {"query": f"bali day {i % 7 + 1} restaurants"}]]})
+        else:
+            turns.append({"tool_calls": [
+                ["manage_budget", {"action": "add_expense", "item": f"Day {i % 7 + 1} meal {i}", "cost": 400}],
+            ]})
+    turns.append({"content": "EXECUTION_COMPLETE: every day is budgeted."})
+    return {"planner": [RESEARCH_TURN, {"content": PLAN_TEXT}], "executor": turns}
+
+
+def runaway_script() -> Dict[str, List[Dict[str, Any]]]:
+    """An executor that never says EXECUTION_COMPLETE; the loop guard has to stop it."""
+    return {
+        "planner": [RESEARCH_TURN, {"content": PLAN_TEXT}],
+        "executor": [{"content": "Still refining the plan, more details needed."}],
+    }
+
+
+def prefill_memory(states: int, messages_per_state: int = 6) -> Callable[[Any], Dict[str, Any]]:
+    """Setup that stores `states` synthetic session states in the agent's memory."""
+    places = ("Ubud", "Seminyak", "Uluwatu", "Canggu", "Sanur", "Amed", "Lovina", "Munduk")
+    topics = ("temple", "beach", "rice terraces", "trek", "spa", "snorkeling", "market", "waterfall")
+
+    def setup(agent) -> Dict[str, Any]:
+        memory = agent.memory_agent
+        for i in range(states):
+            session_id = f"prefill-{i % 500}"
+            place, topic = places[i % len(places)], topics[(i // len(places)) % len(topics)]
+            memory.store_state({
+                "session_id": session_id,
+                "goal": f"Trip {i} to Bali",
+                "trip_plan": f"Visit {place} for the {topic}.",
+                "messages": [
+                    {"role": "assistant", "content": f"Day {d + 1}: {place} {topic} visit, note {i}-{d}."}
+                    for d in range(messages_per_state)
+                ],
+                "next_step": "finished",
+                "error": "",
+            })
+        return {"prefilled_states": states, "stored_snapshots": len(memory.memory_store)}
+
+    return setup
+
+
+SCENARIOS = {
+    "baseline": lambda: Scenario("baseline", "Stock goal: research, plan, local budget fit and one narration call.", baseline_script()),
+    "long_loop": lambda: Scenario(
+        "long_loop", "40 executor iterations over a growing history.", long_loop_script(40),
+        loop_limits=LoopLimits(max_llm_calls=100), local_budgeting=False,
+    ),
+    "runaway": lambda: Scenario(
+        "runaway", "Executor that never completes, stopped by the loop guard.", runaway_script(), local_budgeting=False,
+    ),
+    "llm_budgeting": lambda: Scenario(
+        "llm_budgeting", "Stock session with the LLM budgeting item by item (no local optimizer).",
+        baseline_script(), local_budgeting=False,
+    ),
+    "large_memory": lambda: Scenario(
+        "large_memory",
+        "Stock session on top of a memory store prefilled with 5,000 states.",
+        baseline_script(),
+        setup=prefill_memory(5000),
+        queries=["Ubud temple", "beach snorkeling Amed", "rice terraces trek", "Uluwatu"],
+    ),
+}
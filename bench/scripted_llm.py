@@ -0,0 +1,77 @@
+# Scripted fake LLM: replays a recorded sequence of model turns per agent
+# bench/scripted_llm.py
+
+import json
+from typing import Any, Dict, List, Optional
+
+from framework.fake_llm import FakeLLMClient
+
+# A script maps each agent to its turns, in call order:
+# {"planner": [turn, ...], "executor": [turn, ...], "narrator": [turn, ...]}
+# where a turn is {"content": "..."} or {"tool_calls": [[name, {arguments}], ...]}.
+# "narrator" (optional) answers the tool-less narration call of a locally fitted itinerary.
+
+DEFAULT_NARRATION = {"content": "A relaxed week in Bali, fitted to the budget."}
+
+
+def _agent_for(tools: Optional[List[Dict[str, Any]]]) -> str:
+    # Only the planner is offered search_flights; narration is offered no tools
+    if not tools:
+        return "narrator"
+    names = {t["function"]["name"] for t in tools or []}
+    return "planner" if "search_flights" in names else "executor"
+
+
+class ScriptedPolicy:
+    """
+    FakeLLMClient policy that returns the next scripted turn for the calling
+    agent. Past the end of an agent's script the last turn repeats, so a
+    script should end each agent on its final content turn.
+    """
+
+    def __init__(self, script: Dict[str, List[Dict[str, Any]]]):
+        self.script = script
+        self.cursor = {"planner": 0, "executor": 0, "narrator": 0}
+
+    def reset(self) -> None:
+        self.cursor = {"planner": 0, "executor": 0, "narrator": 0}
+
+    def __call__(self, messages: List[Any], tools: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        agent = _agent_for(tools)
+        turns = self.script.get(agent) or [DEFAULT_NARRATION]
+        turn = turns[min(self.cursor[agent], len(turns) - 1)]
+        self.cursor[agent] += 1
+        if "tool_calls" in turn:
+            return {"tool_calls": [(name, arguments) for name, arguments in turn["tool_calls"]]}
+        return {"content": turn["content"]}
+
+
+def scripted_client(script: Dict[str, List[Dict[str, Any]]]) -> FakeLLMClient:
+    return FakeLLMClient(policy=ScriptedPolicy(script))
+
+
+def script_from_messages(messages: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Records a script from a finished session's message log (e.g. a checkpoint).
+    Assistant turns belong to the planner up to and including the first plain
+    answer (the plan); later ones belong to the executor.
+    """
+    script = {"planner": [], "executor": []}
+    agent = "planner"
+    for message in messages:
+        if message.get("role") != "assistant" or "--- BALI TRIP PLAN COMPLETE ---" in (message.get("content") or ""):
+            continue
+        if message.get("tool_calls"):
+            script[agent].append({"tool_calls": [
+                [call["function"]["name"], json.loads(call["function"]["arguments"] or "{}")]
+                for call in message["tool_calls"]
+            ]})
+        else:
+            script[agent].append({"content": message.get("content") or ""})
+            agent = "executor"
+    return script
+
+
+def load_script(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
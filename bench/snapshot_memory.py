@@ -0,0 +1,57 @@
+# Snapshot memory benchmark: SnapshotStore against the previous shallow state copies
+# bench/snapshot_memory.py
+#
+# Usage (from the repository root):
+#   python -m bench.snapshot_memory --steps 300 --sessions 5
+
+import argparse
+import tracemalloc
+from typing import Any, Dict, List
+
+from framework.snapshot_store import SnapshotStore
+
+
+def run(steps: int = 300, sessions: int = 5) -> None:
+    """Resident memory of the previous shallow state copies vs SnapshotStore for long sessions."""
+    def measure(store_fn) -> int:
+        tracemalloc.start()
+        for s in range(sessions):
+            state = {"session_id": f"s{s}", "goal": "Plan a 7-day Bali trip", "trip_plan": "", "next_step": "plan",
+                     "error": "", "messages": []}
+            for step in range(steps):
+                state["messages"] = state["messages"] + [
+                    {"role": "assistant", "content": None, "tool_calls": [
+                        {"id": f"c{step}", "type": "function",
+                         "function": {"name": "manage_budget", "arguments": '{"action": "get_status"}'}}]},
+                    {"role": "tool", "tool_call_id": f"c{step}", "name": "manage_budget",
+                     "content": f"Remaining budget: ₹{80000 - step * 100:.2f}. " * 4},
+                ]
+                state["next_step"] = "execution"
+                store_fn(state)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return current
+
+    # MemoryAgent used to keep state.copy(): the dicts are shared, but each step keeps its own list
+    shallow_copies: List[Dict[str, Any]] = []
+    full = measure(lambda state: shallow_copies.append(dict(state)))
+    del shallow_copies
+    store = SnapshotStore(max_snapshots=None)
+    delta = measure(store.add)
+    bounded = measure(SnapshotStore(max_snapshots=50).add)
+    print(f"{sessions} sessions x {steps} steps")
+    print(f"  shallow state copies    : {full / 1e6:8.1f} MB")
+    print(f"  SnapshotStore (all)     : {delta / 1e6:8.1f} MB")
+    print(f"  SnapshotStore (keep 50) : {bounded / 1e6:8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SnapshotStore memory vs. shallow state copies")
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--sessions", type=int, default=5)
+    args = parser.parse_args()
+    run(args.steps, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
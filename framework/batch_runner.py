@@ -0,0 +1,253 @@
+# Batch mode: plan trips for a JSONL file of goals across an asyncio or process pool
+# framework/batch_runner.py
+
+import asyncio
+import json
+import math
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from framework.langgraph_auto_loop import BaliTripAgent
+from framework.llm_cache import CompletionCache
+from framework.llm_gateway import LLMGateway, shared_gateway
+from tools.budget_tool import BUDGETS
+
+DEFAULT_GOAL = "Plan a {days}-day relaxing trip to {destination} with beach, culture, nature under ₹{budget:,.0f} from {origin}."
+
+
+def goal_text(record: Dict[str, Any]) -> str:
+    """A record either carries the goal text or the fields to build it from."""
+    if record.get("goal"):
+        return record["goal"]
+    return DEFAULT_GOAL.format(
+        days=record.get("days", 7),
+        destination=record.get("destination", "Bali"),
+        budget=float(record.get("budget", BUDGETS.initial_budget)),
+        origin=record.get("origin", "Delhi"),
+    )
+
+
+def load_goals(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads one JSON object per line, e.g.
+    {"id": "c1", "origin": "Mumbai", "days": 5, "budget": 60000} or {"goal": "..."}.
+    Records without an id are numbered by line.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            record.setdefault("id", str(line_number))
+            records.append(record)
+    return records
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values` (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _result(agent: BaliTripAgent, record: Dict[str, Any], session_id: str, state: Dict[str, Any], error: str,
+            attempts: int, latency: float) -> Dict[str, Any]:
+    # The budget is read once for the result, then everything the session holds is released
+    budget_status = BUDGETS.get(session_id).get_status()
+    agent.forget(session_id)
+    return {
+        "id": record["id"],
+        "goal": goal_text(record),
+        "session_id": session_id,
+        "status": "error" if error else "ok",
+        "error": error or None,
+        "trip_plan": state.get("trip_plan"),
+        "budget": budget_status,
+        "attempts": attempts,
+        "latency_s": round(latency, 3),
+    }
+
+
+class BatchRunner:
+    """
+    Runs one BaliTripAgent session per goal. Sessions are isolated by session
+    id: each gets its own budget (from the record, if given) and its own memory
+    snapshots, while the agent's clients, caches and tool pool are shared.
+    Finished and failed attempts are released with agent.forget().
+    A session that ends in an error is retried with a fresh session up to
+    `session_retries` times; transient LLM errors are already retried per call
+    by the rate-limited client. Each result is appended to `output_path` as soon
+    as its goal finishes.
+    """
+
+    def __init__(self, output_path: str, concurrency: int = 8, session_retries: int = 1,
+                 agent: BaliTripAgent = None):
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.session_retries = session_retries
+        self.agent = agent
+        self.batch_id = uuid.uuid4().hex[:8]
+        self.latencies: List[float] = []
+        self.failures = 0
+
+    def _record_result(self, out, result: Dict[str, Any]) -> None:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        self.latencies.append(result["latency_s"])
+        if result["status"] != "ok":
+            self.failures += 1
+        print(f"[BATCH] {result['id']}: {result['status']} in {result['latency_s']:.2f}s "
+              f"({len(self.latencies)} done)")
+
+    async def _run_goal(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        state, error = {}, ""
+        for attempt in range(1, self.session_retries + 2):
+            session_id = f"{self.batch_id}-{record['id']}-{attempt}"
+            try:
+                state = await self.agent.arun(goal_text(record), verbose=False, session_id=session_id,
+                                              budget=record.get("budget"))
+                error = state.get("error") or ""
+            except Exception as e:
+                state, error = {}, str(e)
+            if not error:
+                break
+            if attempt <= self.session_retries:
+                self.agent.forget(session_id)
+        return _result(self.agent, record, session_id, state, error, attempt, time.perf_counter() - started)
+
+    async def arun(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Runs all goals on the event loop with at most `concurrency` sessions in flight."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for record in records:
+            queue.put_nowait(record)
+        started = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    try:
+                        record = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    self._record_result(out, await self._run_goal(record))
+
+            await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        return self.summary(time.perf_counter() - started)
+
+    def run_processes(self, records: Iterable[Dict[str, Any]], processes: int,
+                      agent_factory: Callable[..., BaliTripAgent], factory_args: tuple = ()) -> Dict[str, Any]:
+        """
+        Runs goals across `processes` worker processes, each with its own agent
+        built by `agent_factory(*factory_args)` (a module-level, picklable callable).
+        """
+        started = time.perf_counter()
+        with open(self.output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(agent_factory, factory_args)
+        ) as pool:
+            futures = [pool.submit(_run_goal_in_worker, record, self.batch_id, self.session_retries) for record in records]
+            for future in as_completed(futures):
+                self._record_result(out, future.result())
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        return {
+            "goals": count,
+            "failed": self.failures,
+            "elapsed_s": round(elapsed, 3),
+            "goals_per_min": round(count / elapsed * 60, 2) if elapsed else 0.0,
+            "p50_latency_s": round(percentile(self.latencies, 0.50), 3),
+            "p95_latency_s": round(percentile(self.latencies, 0.95), 3),
+        }
+
+    @staticmethod
+    def report(summary: Dict[str, Any]) -> str:
+        return (
+            f"[BATCH] {summary['goals']} goals in {summary['elapsed_s']:.1f}s: "
+            f"{summary['goals_per_min']:.1f} goals/min, p50 {summary['p50_latency_s']:.2f}s, "
+            f"p95 {summary['p95_latency_s']:.2f}s, {summary['failed']} failed"
+        )
+
+
+def build_agent(rate_limit: float = None, llm_client=None, async_llm_client=None, max_retries: int = 3,
+                completion_cache: CompletionCache = None, checkpointer=None) -> BaliTripAgent:
+    """
+    BaliTripAgent whose LLM clients share one rate limiter (`rate_limit`
+    requests/second, unlimited if None) and retry transient failures, both
+    done by an LLMGateway at batch priority. Defaults to the configured
+    OpenAI endpoint through the process-wide gateway, so interactive sessions
+    sharing it go first; explicit clients get a gateway of their own.
+    """
+    if llm_client is None:
+        gateway = shared_gateway(rate_limit, max_retries)
+    else:
+        gateway = LLMGateway(client=llm_client, async_client=async_llm_client, default_rate=rate_limit,
+                             max_retries=max_retries)
+    return BaliTripAgent(
+        llm_client=gateway.client("batch"),
+        async_llm_client=gateway.async_client("batch") if llm_client is None or async_llm_client is not None else None,
+        completion_cache=completion_cache,
+        checkpointer=checkpointer,
+    )
+
+
+def default_worker_agent(rate_limit: float = None, cache_db: str = None) -> BaliTripAgent:
+    """Agent factory for process workers: own rate share and a cache over the shared database."""
+    completion_cache = CompletionCache(db_path=cache_db) if cache_db else None
+    return build_agent(rate_limit, completion_cache=completion_cache)
+
+
+_WORKER_AGENT: Optional[BaliTripAgent] = None
+
+
+def _init_worker(agent_factory: Callable[..., BaliTripAgent], factory_args: tuple) -> None:
+    # One warm agent per worker process, reused for every goal it runs
+    global _WORKER_AGENT
+    _WORKER_AGENT = agent_factory(*factory_args)
+
+
+def _run_goal_in_worker(record: Dict[str, Any], batch_id: str, session_retries: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    state, error = {}, ""
+    for attempt in range(1, session_retries + 2):
+        session_id = f"{batch_id}-{record['id']}-{attempt}"
+        try:
+            state = _WORKER_AGENT.run(goal_text(record), verbose=False, session_id=session_id,
+                                      budget=record.get("budget"))
+            error = state.get("error") or ""
+        except Exception as e:
+            state, error = {}, str(e)
+        if not error:
+            break
+        if attempt <= session_retries:
+            _WORKER_AGENT.forget(session_id)
+    return _result(_WORKER_AGENT, record, session_id, state, error, attempt, time.perf_counter() - started)
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 8, processes: int = 0,
+              rate_limit: float = None, session_retries: int = 1, agent: BaliTripAgent = None,
+              cache_db: str = None) -> Dict[str, Any]:
+    """
+    Plans every goal in `input_path`, appending one JSON result per line to
+    `output_path`, and prints the throughput summary. With processes > 0 the
+    goals run across a process pool (the rate limit is split between workers);
+    otherwise `concurrency` sessions share one event loop and `agent`.
+    """
+    records = load_goals(input_path)
+    print(f"[BATCH] {len(records)} goals from {input_path} -> {output_path}")
+    if processes > 0:
+        worker_rate = rate_limit / processes if rate_limit else None
+        runner = BatchRunner(output_path, session_retries=session_retries)
+        summary = runner.run_processes(records, processes, default_worker_agent, (worker_rate, cache_db))
+    else:
+        runner = BatchRunner(output_path, concurrency, session_retries, agent or build_agent(rate_limit))
+        summary = asyncio.run(runner.arun(records))
+    print(BatchRunner.report(summary))
+    return summary
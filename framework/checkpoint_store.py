@@ -0,0 +1,331 @@
+# Durable, resumable checkpoints for the LangGraph workflow (SQLite)
+# framework/checkpoint_store.py
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+# Append-only channel (operator.add reducer) stored once per message by digest
+# instead of being re-serialized with every checkpoint.
+INCREMENTAL_CHANNEL = "messages"
+_DIGEST_SIZE = 16
+_IN_CHUNK = 500  # digests per SELECT ... IN (...), under SQLite's variable limit
+LATENCY_SAMPLES = 10_000  # put() latencies kept for latency_stats()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    seq INTEGER NOT NULL,
+    message_count INTEGER NOT NULL,
+    checkpoint_type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    message_digests BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_by_seq ON checkpoints (thread_id, checkpoint_ns, seq);
+CREATE TABLE IF NOT EXISTS message_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    digest BLOB NOT NULL,
+    value_type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, digest)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value_type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointStore(BaseCheckpointSaver):
+    """
+    Checkpointer for `StateGraph.compile(checkpointer=...)`.
+    LangGraph writes one checkpoint per completed node (super-step), keyed by
+    thread_id, which BaliTripAgent sets to the session id. The growing
+    `messages` list is stored content-addressed: each message is serialized
+    once into `message_blobs` under its digest, and a checkpoint keeps only
+    its ordered list of digests (the parent's list plus the new messages).
+    Forks and re-runs from an older checkpoint therefore never overwrite the
+    messages another checkpoint points to.
+    The async methods run the SQLite calls on a worker thread, so the event
+    loop is not blocked. Write latency of the last LATENCY_SAMPLES put() calls
+    is kept in `write_latencies`.
+    """
+
+    def __init__(self, path: str = "checkpoints.sqlite", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.write_latencies: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    # --- helpers ---------------------------------------------------------
+
+    @staticmethod
+    def _ids(config: RunnableConfig) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return configurable["thread_id"], configurable.get("checkpoint_ns", "")
+
+    @staticmethod
+    def _digest(value_type: str, value: bytes) -> bytes:
+        return hashlib.blake2b(value_type.encode() + b"\0" + value, digest_size=_DIGEST_SIZE).digest()
+
+    @staticmethod
+    def _split(digests: bytes) -> List[bytes]:
+        return [digests[i:i + _DIGEST_SIZE] for i in range(0, len(digests), _DIGEST_SIZE)]
+
+    def _load_messages(self, thread_id: str, checkpoint_ns: str, digests: bytes) -> List[Any]:
+        order = self._split(digests)
+        unique = list(dict.fromkeys(order))
+        blobs: Dict[bytes, Tuple[str, bytes]] = {}
+        for start in range(0, len(unique), _IN_CHUNK):
+            chunk = unique[start:start + _IN_CHUNK]
+            rows = self.conn.execute(
+                "SELECT digest, value_type, value FROM message_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND digest IN ({', '.join('?' * len(chunk))})",
+                (thread_id, checkpoint_ns, *chunk),
+            ).fetchall()
+            blobs.update((digest, (value_type, value)) for digest, value_type, value in rows)
+        return [self.serde.loads_typed(blobs[digest]) for digest in order]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, message_count, c_type, c_blob, m_type, m_blob, digests = row
+        checkpoint = self.serde.loads_typed((c_type, c_blob))
+        if message_count >= 0:
+            checkpoint["channel_values"][INCREMENTAL_CHANNEL] = self._load_messages(thread_id, checkpoint_ns, digests)
+        writes = self.conn.execute(
+            "SELECT task_id, channel, value_type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((m_type, m_blob)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((v_type, value))) for task_id, channel, v_type, value in writes],
+        )
+
+    # --- BaseCheckpointSaver interface ----------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self._ids(config)
+        columns = (
+            "checkpoint_id, parent_checkpoint_id, message_count, checkpoint_type, checkpoint, "
+            "metadata_type, metadata, message_digests"
+        )
+        with self.lock:
+            checkpoint_id = get_checkpoint_id(config)
+            if checkpoint_id:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY seq DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._to_tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, message_count, "
+            "checkpoint_type, checkpoint, metadata_type, metadata, message_digests FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config is not None:
+            thread_id, checkpoint_ns = self._ids(config)
+            clauses += ["thread_id = ?", "checkpoint_ns = ?"]
+            params += [thread_id, checkpoint_ns]
+        if before is not None:
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY seq DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            results = []
+            for row in rows:
+                item = self._to_tuple(row[0], row[1], row[2:])
+                if filter and any(item.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                results.append(item)
+                if limit is not None and len(results) >= limit:
+                    break
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        started = time.perf_counter()
+        thread_id, checkpoint_ns = self._ids(config)
+        parent_id = config["configurable"].get("checkpoint_id")
+
+        stored = checkpoint.copy()
+        channel_values = dict(stored.get("channel_values", {}))
+        messages = channel_values.pop(INCREMENTAL_CHANNEL, None)
+        stored["channel_values"] = channel_values
+        c_type, c_blob = self.serde.dumps_typed(stored)
+        m_type, m_blob = self.serde.dumps_typed(metadata)
+
+        with self.lock:
+            parent_digests: List[bytes] = []
+            seq = 0
+            if parent_id:
+                row = self.conn.execute(
+                    "SELECT message_digests, seq FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, parent_id),
+                ).fetchone()
+                if row:
+                    parent_digests, seq = self._split(row[0] or b""), row[1] + 1
+            message_count, digests = -1, None
+            if messages is not None:
+                message_count = len(messages)
+                # The reducer only appends, so the parent's messages are this list's prefix;
+                # anything else (e.g. a shorter list) is stored in full
+                keep = len(parent_digests) if len(parent_digests) <= message_count else 0
+                blobs = [self.serde.dumps_typed(message) for message in messages[keep:]]
+                new_digests = [self._digest(value_type, value) for value_type, value in blobs]
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO message_blobs (thread_id, checkpoint_ns, digest, value_type, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(thread_id, checkpoint_ns, digest, *blob) for digest, blob in zip(new_digests, blobs)],
+                )
+                digests = b"".join(parent_digests[:keep] + new_digests)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, seq, "
+                "message_count, checkpoint_type, checkpoint, metadata_type, metadata, message_digests) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_id, seq, message_count,
+                 c_type, c_blob, m_type, m_blob, digests),
+            )
+            self.conn.commit()
+        self.write_latencies.append(time.perf_counter() - started)
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, *self.serde.dumps_typed(value))
+                    for idx, (channel, value) in enumerate(writes)
+                ],
+            )
+            self.conn.commit()
+
+    # The async API runs the sync calls on a worker thread; self.lock serializes them.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    # --- maintenance -----------------------------------------------------
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock:
+            for table in ("checkpoints", "message_blobs", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self.conn.commit()
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Per-step checkpoint write latency in milliseconds."""
+        if not self.write_latencies:
+            return {"writes": 0}
+        ordered = sorted(self.write_latencies)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return {
+            "writes": len(ordered),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(pick(0.50), 3),
+            "p95_ms": round(pick(0.95), 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
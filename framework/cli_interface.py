@@ -1 +1,429 @@
-# CLI entrypoint to provide user goal
+# CLI entrypoint to provide user goals: a long-lived service over stdin JSON lines or HTTP
+# framework/cli_interface.py
+#
+# Usage (from the repository root):
+#   python main.py --serve stdio        # one JSON request per line on stdin, events on stdout
+#   python main.py --serve http --port 8080
+#
+# stdin requests:  {"id": "r1", "goal": "Plan a 5-day trip ...", "budget": 60000}
+#                  {"op": "status" | "close", "session_id": "..."}   {"op": "stats"}
+# HTTP:            POST /plan (same JSON, answered with NDJSON events), GET /stats,
+#                  GET /sessions/<id>, DELETE /sessions/<id>
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.budget_tool import BUDGETS
+
+# The token sink of the session whose task is running, so one shared agent can stream to many clients
+_TOKEN_SINK: contextvars.ContextVar = contextvars.ContextVar("token_sink", default=None)
+
+
+def session_token(token: str) -> None:
+    """on_token for an agent shared by the service: routes the token to its session's client."""
+    sink = _TOKEN_SINK.get()
+    if sink is not None:
+        sink(token)
+
+
+class ServiceBusy(Exception):
+    """The service is at its queue limit, or the session is already running."""
+
+
+class Session:
+    __slots__ = ("id", "goal", "status", "state", "created_at", "last_active", "future", "closed")
+
+    def __init__(self, session_id: str, goal: str):
+        self.id = session_id
+        self.goal = goal
+        self.status = "queued"  # queued -> running -> done | error | cancelled
+        self.state: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self.future: Optional[Future] = None
+        self.closed = False  # set by close(); a run that has started releases the session when it ends
+
+    @property
+    def busy(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def summary(self) -> Dict[str, Any]:
+        # find(), not get(): a released session must not get a fresh budget just by being looked at
+        budget = BUDGETS.find(self.id)
+        return {
+            "session_id": self.id,
+            "status": self.status,
+            "goal": self.goal,
+            "trip_plan": self.state.get("trip_plan") or None,
+            "itinerary": self.state.get("itinerary") or None,
+            "budget": budget.get_status() if budget is not None else None,
+            "error": self.state.get("error") or None,
+            "stop_reason": self.state.get("stop_reason") or None,
+            "llm_calls": self.state.get("llm_calls", 0),
+            "llm_tokens": self.state.get("llm_tokens", 0),
+        }
+
+
+class TripService:
+    """
+    Serves many planning sessions from one warm BaliTripAgent (compiled graph,
+    tool registry, pooled clients) on a background event loop. Each session
+    has its own graph state, budget, loop guard and memory snapshots, keyed by
+    session id. At most `max_active` sessions run at once and `max_queued`
+    more may wait; beyond that, submit() raises ServiceBusy. Finished
+    sessions stay queryable until idle for `idle_timeout` seconds, or until
+    `max_sessions` is exceeded (least recently used first).
+    """
+
+    def __init__(self, agent: Any, max_active: int = 8, max_queued: int = 32, max_sessions: int = 1000,
+                 idle_timeout: float = 900.0, sweep_interval: float = 30.0):
+        self.agent = agent
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._pending = 0  # queued + running
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"started": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0, "evicted": 0}
+
+    def start(self) -> "TripService":
+        """Runs the event loop on a background thread."""
+        ready = threading.Event()
+
+        def run_loop() -> None:
+            asyncio.set_event_loop(self.loop)
+            self._slots = asyncio.Semaphore(self.max_active)
+            self.loop.create_task(self._sweep())
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name="trip-service", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        """Cancels sessions still running and stops the loop."""
+        async def shutdown() -> None:
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def submit(self, goal: str, emit: Callable[[Dict[str, Any]], None], session_id: str = None,
+               budget: float = None) -> Future:
+        """
+        Queues a planning session; `emit` receives its events (started, step,
+        plan, token, done, error) on the service thread. Reusing the id of a
+        finished session starts it over from a fresh budget and an empty
+        checkpoint thread. Raises ServiceBusy when the queue is full or that
+        session is still running.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            if self._pending >= self.max_active + self.max_queued:
+                self.stats["rejected"] += 1
+                raise ServiceBusy(f"{self._pending} sessions in flight; try again shortly")
+            existing = self.sessions.get(session_id)
+            if existing is not None and existing.busy:
+                self.stats["rejected"] += 1
+                raise ServiceBusy(f"session {session_id} is still running")
+            session = self.sessions[session_id] = Session(session_id, goal)
+            self.sessions.move_to_end(session_id)
+            self._pending += 1
+            self.stats["started"] += 1
+        session.future = asyncio.run_coroutine_threadsafe(self._run(session, emit, budget), self.loop)
+        # Also runs when the future is cancelled before the task starts, which skips _run() entirely
+        session.future.add_done_callback(self._finished)
+        return session.future
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, session: Session, emit: Callable[[Dict[str, Any]], None], budget: Optional[float]) -> Dict[str, Any]:
+        started = False
+        try:
+            async with self._slots:
+                with self._lock:
+                    if session.closed:
+                        raise asyncio.CancelledError()
+                    session.status = "running"
+                started = True
+                emit({"event": "started", "session_id": session.id})
+                _TOKEN_SINK.set(lambda token: emit({"event": "token", "session_id": session.id, "text": token}))
+                last_plan = ""
+                # aclosing: a cancelled stream is shut down here, not later by the garbage collector
+                async with contextlib.aclosing(self.agent.astream(session.goal, session.id, budget)) as states:
+                    async for state in states:
+                        session.state = state
+                        session.last_active = time.time()
+                        emit({"event": "step", "session_id": session.id, "next_step": state.get("next_step"),
+                              "llm_calls": state.get("llm_calls", 0)})
+                        if state.get("trip_plan") and state["trip_plan"] != last_plan:
+                            last_plan = state["trip_plan"]
+                            emit({"event": "plan", "session_id": session.id, "trip_plan": last_plan})
+                session.status = "error" if session.state.get("error") else "done"
+                self._count("failed" if session.status == "error" else "completed")
+                summary = session.summary()
+                emit({"event": "done", **summary})
+                return summary
+        except asyncio.CancelledError:
+            session.status = "cancelled"
+            self._count("cancelled")
+            raise
+        except Exception as e:
+            session.status = "error"
+            self._count("failed")
+            emit({"event": "error", "session_id": session.id, "error": str(e)})
+            return session.summary()
+        finally:
+            session.last_active = time.time()
+            if started and session.closed:
+                # close() left the release to the run, so nothing is recreated after it
+                self.agent.forget(session.id)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            session.last_active = time.time()
+            self.sessions.move_to_end(session_id)
+        return session.summary()
+
+    def close(self, session_id: str) -> bool:
+        """
+        Cancels the session if it is running and releases its state. A run
+        that has started releases the session itself once it has unwound, so
+        its budget, loop guard and checkpoints are not recreated afterwards.
+        """
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                return False
+            session.closed = True
+            running = session.status == "running"
+        if session.future is not None and not session.future.done():
+            session.future.cancel()
+        if not running:
+            self.agent.forget(session_id)
+        return True
+
+    def evict_idle(self, now: float = None) -> int:
+        """
+        Releases finished sessions idle past the timeout, and the oldest beyond
+        max_sessions, along with their budgets, memory and checkpoints.
+        """
+        now = now or time.time()
+        with self._lock:
+            idle = [s for s in self.sessions.values() if not s.busy]
+            expired = [s for s in idle if now - s.last_active > self.idle_timeout]
+            overflow = len(self.sessions) - len(expired) - self.max_sessions
+            if overflow > 0:
+                # Least recently used first: the dict is kept in touch order
+                expired_ids = {s.id for s in expired}
+                expired += [s for s in idle if s.id not in expired_ids][:overflow]
+            for session in expired:
+                del self.sessions[session.id]
+            self.stats["evicted"] += len(expired)
+        for session in expired:
+            self.agent.forget(session.id)
+        return len(expired)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"[SERVICE] Evicted {evicted} idle sessions")
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            active = sum(1 for s in self.sessions.values() if s.status == "running")
+            return {**self.stats, "sessions": len(self.sessions), "active": active,
+                    "queued": self._pending - active, "max_active": self.max_active, "max_queued": self.max_queued}
+
+
+def _handle_line(service: TripService, line: str, write: Callable[[Dict[str, Any]], None],
+                 futures: List[Future]) -> None:
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        write({"event": "error", "error": f"invalid JSON: {e}"})
+        return
+    request_id = request.get("id")
+    op = request.get("op", "plan")
+
+    def reply(event: Dict[str, Any]) -> None:
+        write({"id": request_id, **event} if request_id is not None else event)
+
+    if op == "stats":
+        reply({"event": "stats", **service.report()})
+    elif op == "status":
+        summary = service.status(request.get("session_id", ""))
+        reply({"event": "status", **summary} if summary else {"event": "error", "error": "unknown session"})
+    elif op == "close":
+        closed = service.close(request.get("session_id", ""))
+        reply({"event": "closed", "session_id": request.get("session_id")} if closed
+              else {"event": "error", "error": "unknown session"})
+    elif op == "plan" and request.get("goal"):
+        try:
+            futures.append(service.submit(request["goal"], reply, request.get("session_id"), request.get("budget")))
+        except ServiceBusy as e:
+            reply({"event": "rejected", "error": str(e)})
+    else:
+        reply({"event": "error", "error": f"unsupported request (op '{op}' needs a goal or session_id)"})
+
+
+def serve_stdio(service: TripService, stdin=None, stdout=None) -> None:
+    """
+    Reads one JSON request per line and writes one JSON event per line.
+    Sessions run concurrently, so events of different sessions interleave;
+    each carries its session_id (and the request's id, if given). Agent logs
+    go to stderr while serving, keeping stdout to the protocol. Returns once
+    stdin is closed and every session has finished.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    write_lock = threading.Lock()
+    futures: List[Future] = []
+
+    def write(event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with write_lock:
+            stdout.write(line + "\n")
+            stdout.flush()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        for line in stdin:
+            if line.strip():
+                _handle_line(service, line, write, futures)
+        wait(futures)
+
+
+def _http_handler(service: TripService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args) -> None:
+            pass  # one line per request would drown the agent logs
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _session_id(self) -> Optional[str]:
+            parts = self.path.strip("/").split("/")
+            return parts[1] if len(parts) == 2 and parts[0] == "sessions" else None
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/stats":
+                self._send_json(200, service.report())
+                return
+            summary = service.status(self._session_id() or "")
+            if summary is None:
+                self._send_json(404, {"error": "unknown session"})
+            else:
+                self._send_json(200, summary)
+
+        def do_DELETE(self) -> None:
+            session_id = self._session_id()
+            if session_id and service.close(session_id):
+                self._send_json(200, {"session_id": session_id, "status": "closed"})
+            else:
+                self._send_json(404, {"error": "unknown session"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/plan":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self._send_json(400, {"error": f"invalid JSON: {e}"})
+                return
+            if not request.get("goal"):
+                self._send_json(400, {"error": "missing 'goal'"})
+                return
+            events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+            session_id = request.get("session_id") or uuid.uuid4().hex
+            try:
+                future = service.submit(request["goal"], events.put, session_id, request.get("budget"))
+            except ServiceBusy as e:
+                self._send_json(429, {"error": str(e)}, {"Retry-After": "5"})
+                return
+            future.add_done_callback(lambda _: events.put(None))
+            self._stream(events, session_id)
+
+        def _stream(self, events: "queue.Queue", session_id: str) -> None:
+            # One JSON event per line, sent as it happens
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("X-Session-Id", session_id)
+            self.end_headers()
+            try:
+                while True:
+                    event = events.get()
+                    if event is None:
+                        break
+                    payload = (json.dumps(event, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away: stop spending LLM calls on its session
+                print(f"[SERVICE] Client disconnected; cancelling session {session_id}")
+                service.close(session_id)
+
+    return Handler
+
+
+def http_server(service: TripService, host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    httpd = ThreadingHTTPServer((host, port), _http_handler(service))
+    httpd.daemon_threads = True
+    return httpd
+
+
+def serve_http(service: TripService, host: str = "127.0.0.1", port: int = 8080) -> None:
+    """Serves the HTTP API until interrupted."""
+    httpd = http_server(service, host, port)
+    print(f"[SERVICE] Listening on http://{host}:{httpd.server_address[1]} (Ctrl+C to stop)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
@@ -0,0 +1,58 @@
+# Base for OpenAI-style client wrappers that intercept chat.completions.create
+# framework/client_wrapper.py
+
+from typing import Any, Dict
+
+
+class _WrappedCompletions:
+    def __init__(self, wrapper: "ClientWrapper"):
+        self._wrapper = wrapper
+
+    def create(self, **kwargs) -> Any:
+        return self._wrapper.create(kwargs)
+
+
+class _AsyncWrappedCompletions(_WrappedCompletions):
+    async def create(self, **kwargs) -> Any:
+        return await self._wrapper.acreate(kwargs)
+
+
+class _WrappedChat:
+    def __init__(self, completions: _WrappedCompletions):
+        self.completions = completions
+
+
+class ClientWrapper:
+    """
+    Exposes client.chat.completions.create and routes each call to the
+    create(request) hook, or acreate(request) on an async wrapper (is_async
+    = True, usually set by an Async* subclass). The hooks default to calling
+    `upstream`, the wrapped client's chat.completions. Every other attribute
+    is forwarded to `wrapped`, the wrapped client.
+    """
+
+    is_async = False
+
+    def __init__(self, client: Any):
+        self._client = client
+        completions_class = _AsyncWrappedCompletions if self.is_async else _WrappedCompletions
+        self.chat = _WrappedChat(completions_class(self))
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    @property
+    def upstream(self) -> Any:
+        return self.wrapped.chat.completions
+
+    def create(self, request: Dict[str, Any]) -> Any:
+        return self.upstream.create(**request)
+
+    async def acreate(self, request: Dict[str, Any]) -> Any:
+        return await self.upstream.create(**request)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_client":  # not set yet, e.g. while copying
+            raise AttributeError(name)
+        return getattr(self.wrapped, name)
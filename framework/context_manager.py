@@ -0,0 +1,184 @@
+# Bounded LLM context: dedupe, token budget and rolling summary of old tool turns
+# framework/context_manager.py
+
+import json
+from typing import Any, Dict, List, Tuple
+
+from framework.tracing import current_span
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a ~4 chars/token estimate
+    _ENCODING = None
+
+
+def message_to_dict(message: Any) -> Dict[str, Any]:
+    """Converts an SDK response message into a plain chat message dict."""
+    if isinstance(message, dict):
+        return message
+    converted = {"role": getattr(message, "role", None) or "assistant", "content": message.content}
+    if message.tool_calls:
+        converted["tool_calls"] = [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+            }
+            for tool_call in message.tool_calls
+        ]
+    return converted
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = 4  # per-message framing overhead
+    tokens += count_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def _signature(message: Dict[str, Any]) -> tuple:
+    return (message.get("role"), message.get("content"), json.dumps(message.get("tool_calls"), sort_keys=True))
+
+
+class ContextManager:
+    """
+    Builds the prompt sent on every LLM call from the full conversation history.
+    - Repeated system/user/assistant messages are sent once.
+    - The system prompts and user messages (the goal, the plan to refine) stay pinned.
+    - When the prompt is over max_tokens, the oldest assistant/tool turns outside
+      the last keep_recent messages are folded into one rolling summary message,
+      which itself keeps only its newest lines within max_summary_tokens.
+    Each call's token counts go on the current trace span; verbose=True also
+    prints them.
+    """
+
+    def __init__(self, max_tokens: int = 6000, keep_recent: int = 8, summary_chars: int = 160,
+                 max_summary_tokens: int = None, verbose: bool = False):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.max_summary_tokens = max_summary_tokens or max_tokens // 5
+        self.verbose = verbose
+        self.totals = {"calls": 0, "raw_tokens": 0, "prompt_tokens": 0}
+
+    def _dedupe(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seen = set()
+        kept = []
+        for message in messages:
+            if message.get("role") == "tool":
+                kept.append(message)
+                continue
+            signature = _signature(message)
+            if signature in seen:
+                continue
+            seen.add(signature)
+            kept.append(message)
+        return kept
+
+    def _turns(self, messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        # An assistant message and the tool results answering it form one turn,
+        # so tool results are never separated from their tool_calls.
+        turns: List[List[Dict[str, Any]]] = []
+        for message in messages:
+            if message.get("role") == "tool" and turns and turns[-1][0].get("role") in ("assistant", "tool"):
+                turns[-1].append(message)
+            else:
+                turns.append([message])
+        return turns
+
+    def _summarize(self, turn: List[Dict[str, Any]]) -> List[str]:
+        lines = []
+        for message in turn:
+            if message.get("role") == "tool":
+                content = " ".join((message.get("content") or "").split())
+                lines.append(f"- {message.get('name')}: {content[:self.summary_chars]}")
+            elif message.get("content"):
+                content = " ".join(message["content"].split())
+                lines.append(f"- assistant: {content[:self.summary_chars]}")
+        return lines
+
+    def prepare(self, messages: List[Any]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Returns the bounded prompt for `messages` and its token counts."""
+        history = [message_to_dict(m) for m in messages]
+        raw_tokens = sum(message_tokens(m) for m in history)
+        kept = self._dedupe(history)
+
+        turns = self._turns(kept)
+        tokens = [sum(message_tokens(m) for m in turn) for turn in turns]
+        total = sum(tokens)
+
+        # Turns that may be folded: not pinned and not among the most recent messages
+        recent_start = max(0, len(kept) - self.keep_recent)
+        position = 0
+        foldable = []
+        for index, turn in enumerate(turns):
+            pinned = turn[0].get("role") in ("system", "user")
+            if not pinned and position < recent_start:
+                foldable.append(index)
+            position += len(turn)
+
+        # Leave room for the summary message itself
+        target = self.max_tokens - self.max_summary_tokens
+        folded = set()
+        summary_lines: List[str] = []
+        for index in foldable:
+            if total <= target:
+                break
+            folded.add(index)
+            summary_lines.extend(self._summarize(turns[index]))
+            total -= tokens[index]
+
+        # Keep the newest summary lines that fit; older ones roll off
+        summary_budget = self.max_summary_tokens
+        rolled = []
+        for line in reversed(summary_lines):
+            summary_budget -= count_tokens(line)
+            if summary_budget < 0:
+                break
+            rolled.append(line)
+        omitted = len(summary_lines) - len(rolled)
+        if omitted:
+            rolled.append(f"- ({omitted} earlier steps omitted)")
+        summary_lines = list(reversed(rolled))
+
+        prompt: List[Dict[str, Any]] = []
+        for index, turn in enumerate(turns):
+            if index in folded:
+                if summary_lines:
+                    summary = {"role": "system", "content": "Summary of earlier steps:\n" + "\n".join(summary_lines)}
+                    prompt.append(summary)
+                    summary_lines = []
+                continue
+            prompt.extend(turn)
+
+        prompt_tokens = sum(message_tokens(m) for m in prompt)
+        stats = {
+            "raw_tokens": raw_tokens,
+            "prompt_tokens": prompt_tokens,
+            "duplicates_dropped": len(history) - len(kept),
+            "turns_folded": len(folded),
+        }
+        self.totals["calls"] += 1
+        self.totals["raw_tokens"] += raw_tokens
+        self.totals["prompt_tokens"] += prompt_tokens
+        span = current_span()
+        for key, value in stats.items():
+            span.set(f"context.{key}", value)
+        if self.verbose:
+            print(self.report(stats))
+        return prompt, stats
+
+    @staticmethod
+    def report(stats: Dict[str, int]) -> str:
+        raw = stats.get("raw_tokens", 0)
+        sent = stats.get("prompt_tokens", 0)
+        saved = 1 - sent / raw if raw else 0.0
+        return f"[CONTEXT] prompt tokens: {sent} (full history {raw}, saved {saved:.0%})"
@@ -0,0 +1,262 @@
+# Local fake LLM client for offline runs, concurrency and throughput checks
+# framework/fake_llm.py
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeFunction:
+    def __init__(self, name: str, arguments: str):
+        self.name = name
+        self.arguments = arguments
+
+
+class FakeToolCall:
+    def __init__(self, id: str, name: str, arguments: Dict[str, Any]):
+        self.id = id
+        self.type = "function"
+        self.function = FakeFunction(name, json.dumps(arguments))
+
+
+class FakeMessage:
+    def __init__(self, content: Optional[str] = None, tool_calls: Optional[List[FakeToolCall]] = None):
+        self.role = "assistant"
+        self.content = content
+        self.tool_calls = tool_calls or None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # The agents inspect messages with .get(), as they do for dict messages
+        return getattr(self, key, default)
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class FakeChoice:
+    def __init__(self, message: FakeMessage):
+        self.index = 0
+        self.message = message
+        self.finish_reason = "tool_calls" if message.tool_calls else "stop"
+
+
+class FakeResponse:
+    def __init__(self, message: FakeMessage, usage: FakeUsage):
+        self.choices = [FakeChoice(message)]
+        self.usage = usage
+
+    def model_dump_json(self) -> str:
+        # Same shape as the SDK's ChatCompletion, so caches can store fake responses as JSON
+        return json.dumps(completion_json(self, "fake-model", "chatcmpl-fake"))
+
+
+def _tool_call_json(tool_call: Any) -> Dict[str, Any]:
+    return {
+        "id": tool_call.id,
+        "type": "function",
+        "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+    }
+
+
+def completion_json(response: Any, model: str, completion_id: str) -> Dict[str, Any]:
+    """A fake response as the API's chat.completion JSON."""
+    message = response.choices[0].message
+    body = {"role": "assistant", "content": message.content}
+    if message.tool_calls:
+        body["tool_calls"] = [_tool_call_json(tc) for tc in message.tool_calls]
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": body, "finish_reason": response.choices[0].finish_reason}],
+        "usage": {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+        },
+    }
+
+
+class FakeToolCallDelta:
+    def __init__(self, index: int, id: Optional[str], name: Optional[str], arguments: Optional[str]):
+        self.index = index
+        self.id = id
+        self.type = "function" if id else None
+        self.function = FakeFunction(name, arguments)
+
+
+class FakeDelta:
+    def __init__(self, content: Optional[str] = None, tool_calls: Optional[List[FakeToolCallDelta]] = None):
+        self.role = None
+        self.content = content
+        self.tool_calls = tool_calls
+
+
+class FakeChunkChoice:
+    def __init__(self, delta: FakeDelta, finish_reason: Optional[str] = None):
+        self.index = 0
+        self.delta = delta
+        self.finish_reason = finish_reason
+
+
+class FakeChunk:
+    def __init__(self, delta: FakeDelta, finish_reason: Optional[str] = None):
+        self.choices = [FakeChunkChoice(delta, finish_reason)]
+
+
+def response_chunks(response: FakeResponse, piece_chars: int = 12) -> List[FakeChunk]:
+    """
+    Splits a response into stream chunks the way the API sends them: content
+    word by word, each tool call as a header delta (id, name) followed by
+    argument fragments, then a final chunk carrying the finish reason.
+    """
+    message = response.choices[0].message
+    chunks = []
+    if message.content:
+        words = message.content.split(" ")
+        for position, word in enumerate(words):
+            chunks.append(FakeChunk(FakeDelta(word if position == len(words) - 1 else word + " ")))
+    for index, tool_call in enumerate(message.tool_calls or []):
+        chunks.append(FakeChunk(FakeDelta(tool_calls=[FakeToolCallDelta(index, tool_call.id, tool_call.function.name, "")])))
+        arguments = tool_call.function.arguments
+        for start in range(0, len(arguments), piece_chars):
+            fragment = arguments[start:start + piece_chars]
+            chunks.append(FakeChunk(FakeDelta(tool_calls=[FakeToolCallDelta(index, None, None, fragment)])))
+    chunks.append(FakeChunk(FakeDelta(), response.choices[0].finish_reason))
+    return chunks
+
+
+def _field(message: Any, key: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(key)
+    return getattr(message, key, None)
+
+
+def _estimate_tokens(messages: List[Any]) -> int:
+    return sum(len(str(_field(m, "content") or "")) for m in messages) // 4 + 1
+
+
+def default_policy(messages: List[Any], tools: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Deterministic stand-in for the model: the planner researches once and then
+    answers with a plan, the executor budgets once and then completes.
+    Calls without tools (itinerary narration) get a short description.
+    Returns {"content": ...} or {"tool_calls": [(name, arguments), ...]}.
+    """
+    tool_names = {t["function"]["name"] for t in tools or []}
+    tool_results = [m for m in messages if _field(m, "role") == "tool"]
+
+    if not tools:
+        # Narration of a locally fitted itinerary
+        return {"content": "A relaxed week in Bali: beaches, temples and rice terraces, all within budget."}
+
+    if "search_flights" in tool_names:
+        if not tool_results:
+            return {"tool_calls": [
+                ("search_internet", {"query": "7-day relaxing trip bali"}),
+                ("search_flights", {"origin": "Delhi", "destination": "Bali", "date": "20 July 2025", "num_travelers": 1}),
+            ]}
+        return {"content": (
+            "Day 1: Arrive, Seminyak beach. Day 2: Ubud culture. Day 3: Tegalalang rice terraces. "
+            "Day 4: Mount Batur sunrise trek. Day 5: Uluwatu temple. Day 6: Nusa Dua. Day 7: Depart."
+        )}
+
+    if not any(_field(m, "name") == "manage_budget" for m in tool_results):
+        return {"tool_calls": [
+            ("manage_budget", {"action": "add_expense", "item": "Accommodation", "cost": 21000}),
+            ("manage_budget", {"action": "add_expense", "item": "Activities", "cost": 12000}),
+            ("manage_budget", {"action": "get_status"}),
+        ]}
+    return {"content": "EXECUTION_COMPLETE: accommodation and activities are budgeted."}
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeLLMClient"):
+        self.owner = owner
+
+    def create(self, model: str = None, messages: List[Any] = None, tools: List[Dict[str, Any]] = None,
+               stream: bool = False, **kwargs):
+        if self.owner.latency:
+            time.sleep(self.owner.latency)
+        response = self.owner._respond(messages or [], tools)
+        if stream:
+            return self._stream(response)
+        return response
+
+    def _stream(self, response: FakeResponse):
+        for chunk in response_chunks(response):
+            if self.owner.token_latency:
+                time.sleep(self.owner.token_latency)
+            yield chunk
+
+
+class _AsyncFakeCompletions(_FakeCompletions):
+    async def create(self, model: str = None, messages: List[Any] = None, tools: List[Dict[str, Any]] = None,
+                     stream: bool = False, **kwargs):
+        if self.owner.latency:
+            await asyncio.sleep(self.owner.latency)
+        response = self.owner._respond(messages or [], tools)
+        if stream:
+            return self._astream(response)
+        return response
+
+    async def _astream(self, response: FakeResponse):
+        for chunk in response_chunks(response):
+            if self.owner.token_latency:
+                await asyncio.sleep(self.owner.token_latency)
+            yield chunk
+
+
+class _FakeChat:
+    def __init__(self, completions: _FakeCompletions):
+        self.completions = completions
+
+
+class FakeLLMClient:
+    """
+    Offline replacement for the OpenAI client, exposing client.chat.completions.create.
+    Replies come from `policy(messages, tools)` (default_policy unless given),
+    after sleeping `latency` seconds to simulate network time. With stream=True
+    the reply arrives as chunks, `token_latency` seconds apart.
+    """
+
+    def __init__(self, policy: Callable[..., Dict[str, Any]] = None, latency: float = 0.0,
+                 token_latency: float = 0.0):
+        self.policy = policy or default_policy
+        self.latency = latency
+        self.token_latency = token_latency
+        self.call_count = 0
+        self.prompt_tokens: List[int] = []
+        self._ids = itertools.count(1)
+        self.chat = _FakeChat(self._completions())
+
+    def _completions(self) -> _FakeCompletions:
+        return _FakeCompletions(self)
+
+    def _respond(self, messages: List[Any], tools: Optional[List[Dict[str, Any]]]) -> FakeResponse:
+        self.call_count += 1
+        prompt_tokens = _estimate_tokens(messages)
+        self.prompt_tokens.append(prompt_tokens)
+
+        reply = self.policy(messages, tools)
+        tool_calls = [
+            FakeToolCall(f"call_{next(self._ids)}", name, arguments)
+            for name, arguments in reply.get("tool_calls", [])
+        ]
+        message = FakeMessage(reply.get("content"), tool_calls)
+        completion_tokens = len(message.content or "") // 4 + 8 * len(tool_calls)
+        return FakeResponse(message, FakeUsage(prompt_tokens, completion_tokens))
+
+
+class FakeAsyncLLMClient(FakeLLMClient):
+    """Async variant: `await client.chat.completions.create(...)` like openai.AsyncOpenAI."""
+
+    def _completions(self) -> _FakeCompletions:
+        return _AsyncFakeCompletions(self)
@@ -0,0 +1,268 @@
+# Structured itinerary: days, activities, lodging and transport with costs and durations
+# framework/itinerary.py
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+THEMES = ("beach", "culture", "nature", "adventure", "relaxation", "food")
+
+# Goal keyword -> theme
+_THEME_KEYWORDS = (
+    ("beach", "beach"), ("surf", "beach"), ("snorkel", "beach"), ("culture", "culture"),
+    ("cultural", "culture"), ("temple", "culture"), ("art", "culture"), ("nature", "nature"),
+    ("rice", "nature"), ("waterfall", "nature"), ("volcano", "nature"), ("trek", "adventure"),
+    ("adventure", "adventure"), ("dive", "adventure"), ("relax", "relaxation"), ("spa", "relaxation"),
+    ("yoga", "relaxation"), ("food", "food"), ("cuisine", "food"), ("culinary", "food"),
+)
+
+
+class Activity:
+    __slots__ = ("name", "area", "themes", "cost", "hours")
+
+    def __init__(self, name: str, area: str, themes: Tuple[str, ...], cost: float, hours: float):
+        self.name = name
+        self.area = area
+        self.themes = themes
+        self.cost = cost    # INR per traveler
+        self.hours = hours
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "area": self.area, "themes": list(self.themes), "cost": self.cost, "hours": self.hours}
+
+
+class Lodging:
+    __slots__ = ("name", "cost_per_night", "comfort")
+
+    def __init__(self, name: str, cost_per_night: float, comfort: float):
+        self.name = name
+        self.cost_per_night = cost_per_night
+        self.comfort = comfort  # 0..1, counts towards the relaxation theme
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "cost_per_night": self.cost_per_night, "comfort": self.comfort}
+
+
+class Transport:
+    __slots__ = ("mode", "description", "cost")
+
+    def __init__(self, mode: str, description: str, cost: float):
+        self.mode = mode
+        self.description = description
+        self.cost = cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "description": self.description, "cost": self.cost}
+
+
+class DayPlan:
+    __slots__ = ("day", "activities", "food_cost", "travelers")
+
+    def __init__(self, day: int, food_cost: float = 0.0, travelers: int = 1):
+        self.day = day
+        self.activities: List[Activity] = []
+        self.food_cost = food_cost  # for the whole group
+        self.travelers = travelers
+
+    @property
+    def hours(self) -> float:
+        return sum(a.hours for a in self.activities)
+
+    @property
+    def areas(self) -> List[str]:
+        return list(dict.fromkeys(a.area for a in self.activities))
+
+    @property
+    def cost(self) -> float:
+        return self.food_cost + sum(a.cost for a in self.activities) * self.travelers
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day": self.day,
+            "areas": self.areas,
+            "activities": [a.to_dict() for a in self.activities],
+            "food_cost": self.food_cost,
+            "hours": self.hours,
+            "cost": self.cost,
+        }
+
+
+class Itinerary:
+    """A costed trip: day plans plus lodging and transport. Costs are in INR."""
+
+    def __init__(self, days: List[DayPlan], lodging: Lodging, nights: int, transport: List[Transport],
+                 themes: Dict[str, float], score: float = 0.0, travelers: int = 1):
+        self.days = days
+        self.lodging = lodging
+        self.nights = nights
+        self.transport = transport
+        self.themes = themes  # requested theme -> weight
+        self.score = score
+        self.travelers = travelers
+
+    @property
+    def rooms(self) -> int:
+        return rooms_for(self.travelers)
+
+    @property
+    def activities(self) -> List[Activity]:
+        return [a for day in self.days for a in day.activities]
+
+    @property
+    def lodging_cost(self) -> float:
+        return self.lodging.cost_per_night * self.nights * self.rooms
+
+    @property
+    def total_cost(self) -> float:
+        return self.lodging_cost + sum(t.cost for t in self.transport) + sum(day.cost for day in self.days)
+
+    def theme_counts(self) -> Dict[str, int]:
+        counts = {theme: 0 for theme in self.themes}
+        for activity in self.activities:
+            for theme in activity.themes:
+                if theme in counts:
+                    counts[theme] += 1
+        return counts
+
+    def expense_lines(self) -> List[Tuple[str, float, str]]:
+        """(item, cost, category) lines for the session's BudgetManager."""
+        rooms = f" x{self.rooms} rooms" if self.rooms > 1 else ""
+        lines = [(f"Lodging: {self.lodging.name} x{self.nights} nights{rooms}", self.lodging_cost, "lodging")]
+        lines += [(f"Transport: {t.description}", t.cost, "transport") for t in self.transport]
+        lines.append(("Food", sum(day.food_cost for day in self.days), "food"))
+        lines += [(f"Activity: {a.name}", a.cost * self.travelers, "activities") for a in self.activities]
+        return [line for line in lines if line[1] > 0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "days": [day.to_dict() for day in self.days],
+            "lodging": self.lodging.to_dict(),
+            "nights": self.nights,
+            "travelers": self.travelers,
+            "rooms": self.rooms,
+            "transport": [t.to_dict() for t in self.transport],
+            "themes": self.themes,
+            "theme_counts": self.theme_counts(),
+            "total_cost": round(self.total_cost, 2),
+            "score": round(self.score, 4),
+        }
+
+    def to_text(self) -> str:
+        lines = []
+        for day in self.days:
+            names = ", ".join(f"{a.name} ({a.area})" for a in day.activities) or "Free day"
+            lines.append(f"Day {day.day}: {names}")
+        rooms = f", {self.rooms} rooms" if self.rooms > 1 else ""
+        lines.append(f"Stay: {self.lodging.name}, {self.nights} nights{rooms} (₹{self.lodging_cost:,.0f})")
+        lines.append(f"Total local cost: ₹{self.total_cost:,.0f}")
+        return "\n".join(lines)
+
+
+def parse_goal(goal: str, default_days: int = 7) -> Tuple[int, Dict[str, float]]:
+    """Reads the trip length and theme weights from the goal text: named themes weigh 1.0, others 0.2."""
+    lowered = (goal or "").lower()
+    match = re.search(r"(\d+)[- ]day", lowered)
+    days = int(match.group(1)) if match else default_days
+    wanted = {theme for keyword, theme in _THEME_KEYWORDS if re.search(r"\b" + keyword, lowered)}
+    themes = {theme: (1.0 if theme in wanted or not wanted else 0.2) for theme in THEMES}
+    return max(1, days), themes
+
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                 "nine": 9, "ten": 10, "solo": 1, "couple": 2}
+_TRAVELERS_RE = re.compile(
+    r"\b(\d+|one|two|three|four|five|six|seven|eight|nine|ten)\s+"
+    r"(?:travell?ers|people|persons|adults|guests|pax|friends)\b"
+    r"|\b(?:family|group|party) of\s+(\d+|two|three|four|five|six|seven|eight|nine|ten)\b"
+    r"|\b(solo|couple)\b"
+)
+
+
+def parse_travelers(goal: str, default: int = 1) -> int:
+    """Reads the group size from the goal text ("for 2 people", "family of four", "couple")."""
+    match = _TRAVELERS_RE.search((goal or "").lower())
+    if not match:
+        return default
+    word = next(group for group in match.groups() if group)
+    return max(1, int(word) if word.isdigit() else _NUMBER_WORDS[word])
+
+
+def rooms_for(travelers: int) -> int:
+    return -(-max(1, travelers) // ROOM_CAPACITY)
+
+
+def catalog_for(goal: str) -> Optional[str]:
+    """
+    Name of the activity catalog for the goal's destination: the catalog a
+    named place belongs to, the default one when no place is named, and None
+    for a destination without a catalog (e.g. "a week in Tokyo").
+    """
+    text = goal or ""
+    lowered = text.lower()
+    for name, places in CATALOG_PLACES.items():
+        if any(re.search(r"\b" + place + r"\b", lowered) for place in places):
+            return name
+    for place in _DESTINATION_RE.findall(text):
+        if place.split()[0].lower() not in _NOT_PLACES:
+            return None
+    return DEFAULT_CATALOG
+
+
+def text_theme_counts(text: str) -> Dict[str, int]:
+    """How often each theme's keywords appear in free text, e.g. a plan written by the LLM."""
+    lowered = (text or "").lower()
+    counts = {theme: 0 for theme in THEMES}
+    for keyword, theme in _THEME_KEYWORDS:
+        counts[theme] += len(re.findall(r"\b" + keyword, lowered))
+    return counts
+
+
+# Candidate activities for Bali (per-traveler INR cost, hours including local travel)
+BALI_ACTIVITIES = [
+    Activity("Seminyak beach afternoon", "Seminyak", ("beach", "relaxation"), 0, 3),
+    Activity("Surf lesson at Kuta", "Kuta", ("beach", "adventure"), 2500, 3),
+    Activity("Nusa Dua water sports", "Nusa Dua", ("beach", "adventure"), 4500, 3),
+    Activity("Jimbaran seafood sunset dinner", "Jimbaran", ("beach", "food"), 3000, 3),
+    Activity("Padang Padang beach", "Uluwatu", ("beach",), 500, 3),
+    Activity("Snorkeling trip to Nusa Penida", "Nusa Penida", ("beach", "nature", "adventure"), 6500, 9),
+    Activity("Uluwatu Temple and Kecak dance", "Uluwatu", ("culture",), 1500, 4),
+    Activity("Tanah Lot sunset temple visit", "Tabanan", ("culture",), 800, 3),
+    Activity("Ubud Monkey Forest", "Ubud", ("nature", "culture"), 700, 2),
+    Activity("Ubud art market and palace", "Ubud", ("culture", "food"), 500, 3),
+    Activity("Besakih mother temple", "Karangasem", ("culture",), 1200, 6),
+    Activity("Balinese cooking class", "Ubud", ("food", "culture"), 3000, 4),
+    Activity("Tegalalang rice terraces", "Ubud", ("nature",), 600, 3),
+    Activity("Mount Batur sunrise trek", "Kintamani", ("nature", "adventure"), 4000, 8),
+    Activity("Tegenungan Waterfall", "Gianyar", ("nature",), 400, 2),
+    Activity("Ubud yoga class", "Ubud", ("relaxation",), 1200, 2),
+    Activity("Balinese spa massage", "Seminyak", ("relaxation",), 2500, 2),
+    Activity("Sidemen valley walk", "Karangasem", ("nature", "relaxation"), 1500, 5),
+    Activity("White water rafting on the Ayung", "Ubud", ("adventure", "nature"), 3500, 4),
+]
+
+BALI_LODGING = [
+    Lodging("Guesthouse (homestay)", 1800, 0.3),
+    Lodging("Mid-range hotel with pool", 4000, 0.7),
+    Lodging("Resort villa", 9000, 1.0),
+]
+
+DAILY_FOOD_COST = 1500.0          # INR per traveler per day
+DAILY_TRANSPORT_COST = 1000.0     # ride-hailing (Gojek/Grab) around the base area
+
+ROOM_CAPACITY = 2                 # travelers per lodging room
+
+# Catalog name -> (activities, lodging) for the local itinerary fit
+CATALOGS = {
+    "bali": (BALI_ACTIVITIES, BALI_LODGING),
+}
+# Catalog name -> places that mean it, for goals that name their destination
+CATALOG_PLACES = {
+    "bali": ("bali", "ubud", "seminyak", "canggu", "kuta", "uluwatu", "nusa dua", "nusa penida", "sanur", "jimbaran"),
+}
+DEFAULT_CATALOG = "bali"
+_DESTINATION_RE = re.compile(r"\b(?:to|in|visit|visiting|around|explore)\s+([A-Z][\w'-]+(?:\s+[A-Z][\w'-]+)*)")
+# Capitalized words after "to"/"in" that are not places
+_NOT_PLACES = {
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "summer", "winter", "spring", "autumn", "the", "a", "an", "my", "our", "inr", "rs",
+}
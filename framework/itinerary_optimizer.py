@@ -0,0 +1,141 @@
+# Local budget fitting: choose lodging and activities that best cover the goal's themes
+# framework/itinerary_optimizer.py
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from framework.itinerary import (
+    Activity, DayPlan, Itinerary, Lodging, Transport, rooms_for,
+    BALI_ACTIVITIES, BALI_LODGING, DAILY_TRANSPORT_COST, DAILY_FOOD_COST,
+)
+
+AREA_SWITCH_HOURS = 1.0  # extra travel when a day spans two areas
+
+
+def coverage(counts: Dict[str, int], themes: Dict[str, float]) -> float:
+    """Theme coverage with diminishing returns: each extra activity for a theme is worth half the previous one."""
+    return sum(weight * (1.0 - 0.5 ** counts.get(theme, 0)) for theme, weight in themes.items())
+
+
+class ItineraryOptimizer:
+    """
+    Budget fitting without the LLM. For each lodging option the remaining money
+    and hours are filled greedily by theme-coverage gain per unit of cost and
+    time, then improved by local search (single adds and 1-for-1 swaps).
+    The selected activities are packed into days, grouping by area.
+    Coverage is submodular, so greedy plus swaps lands close to the optimum
+    for catalogs of this size in well under a millisecond per lodging option.
+    """
+
+    def __init__(self, activities: Sequence[Activity] = BALI_ACTIVITIES, lodging: Sequence[Lodging] = BALI_LODGING,
+                 daily_food: float = DAILY_FOOD_COST, daily_transport: float = DAILY_TRANSPORT_COST,
+                 max_hours_per_day: float = 8.0, reserve_fraction: float = 0.05):
+        self.activities = list(activities)
+        self.lodging = list(lodging)
+        self.daily_food = daily_food
+        self.daily_transport = daily_transport
+        self.max_hours_per_day = max_hours_per_day
+        # Kept back from the budget for tips, visas and surprises
+        self.reserve_fraction = reserve_fraction
+
+    def _value(self, selected: List[Activity], themes: Dict[str, float], lodging: Lodging) -> float:
+        counts: Dict[str, int] = {}
+        for activity in selected:
+            for theme in activity.themes:
+                counts[theme] = counts.get(theme, 0) + 1
+        # Comfortable lodging counts as half an activity towards relaxation
+        value = coverage(counts, themes) + 0.5 * lodging.comfort * themes.get("relaxation", 0.0) * 0.5 ** counts.get("relaxation", 0)
+        # Ties go to the cheaper plan
+        return value - 1e-7 * sum(a.cost for a in selected)
+
+    def _greedy(self, themes: Dict[str, float], lodging: Lodging, money: float, hours: float,
+                travelers: int) -> List[Activity]:
+        selected: List[Activity] = []
+        remaining = [a for a in self.activities if a.hours <= self.max_hours_per_day]
+        spent, used = 0.0, 0.0
+        current = self._value(selected, themes, lodging)
+        while True:
+            best, best_ratio, best_value = None, 0.0, current
+            for activity in remaining:
+                cost = activity.cost * travelers
+                if spent + cost > money or used + activity.hours > hours:
+                    continue
+                value = self._value(selected + [activity], themes, lodging)
+                gain = value - current
+                # Gain per share of both resources consumed
+                ratio = gain / (cost / max(money, 1.0) + activity.hours / max(hours, 1.0) + 1e-9)
+                if gain > 1e-9 and ratio > best_ratio:
+                    best, best_ratio, best_value = activity, ratio, value
+            if best is None:
+                return selected
+            selected.append(best)
+            remaining.remove(best)
+            spent += best.cost * travelers
+            used += best.hours
+            current = best_value
+
+    def _local_search(self, selected: List[Activity], themes: Dict[str, float], lodging: Lodging,
+                      money: float, hours: float, travelers: int, max_rounds: int = 50) -> List[Activity]:
+        def fits(candidate: List[Activity]) -> bool:
+            return (sum(a.cost for a in candidate) * travelers <= money
+                    and sum(a.hours for a in candidate) <= hours)
+
+        current = self._value(selected, themes, lodging)
+        for _ in range(max_rounds):
+            improved = False
+            outside = [a for a in self.activities if a not in selected and a.hours <= self.max_hours_per_day]
+            moves = [selected + [a] for a in outside]
+            moves += [selected[:i] + selected[i + 1:] + [a] for i in range(len(selected)) for a in outside]
+            for candidate in moves:
+                if fits(candidate):
+                    value = self._value(candidate, themes, lodging)
+                    if value > current + 1e-9:
+                        selected, current, improved = candidate, value, True
+                        break
+            if not improved:
+                return selected
+        return selected
+
+    def _pack(self, selected: List[Activity], days: int, travelers: int) -> Tuple[List[DayPlan], List[Activity]]:
+        """First-fit by area, longest first; returns (day plans, activities that did not fit)."""
+        plans = [DayPlan(day + 1, self.daily_food * travelers, travelers) for day in range(days)]
+        leftovers = []
+        for activity in sorted(selected, key=lambda a: (-a.hours, a.area)):
+            def extra(plan: DayPlan) -> float:
+                return 0.0 if not plan.activities or activity.area in plan.areas else AREA_SWITCH_HOURS
+
+            fitting = [p for p in plans if p.hours + extra(p) + activity.hours <= self.max_hours_per_day]
+            if not fitting:
+                leftovers.append(activity)
+                continue
+            # Prefer a day already in this area, then an empty day, then the least busy one
+            target = min(fitting, key=lambda p: (0 if activity.area in p.areas else 1 if not p.activities else 2, p.hours))
+            target.activities.append(activity)
+        return plans, leftovers
+
+    def optimize(self, days: int, budget: float, themes: Dict[str, float], travelers: int = 1) -> Optional[Itinerary]:
+        """
+        Best itinerary for `days` days and `travelers` people within `budget`
+        INR (e.g. the session's remaining budget), or None when not even the
+        cheapest lodging fits. Activities and food are paid per traveler,
+        lodging per room.
+        """
+        nights = max(days - 1, 1)
+        money_total = budget * (1.0 - self.reserve_fraction)
+        transport = [Transport("ride-hailing", f"Local rides x{days} days", self.daily_transport * days)]
+        fixed_daily = self.daily_food * travelers * days + sum(t.cost for t in transport)
+        hours = self.max_hours_per_day * days
+        rooms = rooms_for(travelers)
+
+        best: Optional[Itinerary] = None
+        for lodging in self.lodging:
+            money = money_total - lodging.cost_per_night * nights * rooms - fixed_daily
+            if money < 0:
+                continue
+            selected = self._greedy(themes, lodging, money, hours, travelers)
+            selected = self._local_search(selected, themes, lodging, money, hours, travelers)
+            plans, leftovers = self._pack(selected, days, travelers)
+            placed = [a for a in selected if a not in leftovers]
+            score = self._value(placed, themes, lodging)
+            if best is None or score > best.score:
+                best = Itinerary(plans, lodging, nights, transport, themes, score, travelers)
+        return best
@@ -1,42 +1,116 @@
 # LangGraph logic for AutoGPT loop
 # framework/langgraph_auto_loop.py
 
-from typing import TypedDict, List, Annotated, Dict, Any
+from typing import TypedDict, List, Annotated, Dict, Any, Optional, AsyncIterator
+import asyncio
 import operator
+import uuid
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from agents.planning_agent import PlanningAgent
 from agents.execution_agent import ExecutionAgent
 from agents.memory_agent import MemoryAgent
-from tools.budget_tool import manage_budget, BUDGET_MANAGER # Import the global manager
+from tools.budget_tool import BUDGETS, format_status # Budgets are per session
+from tools.tool_executor import ToolExecutor
+from framework.llm_cache import CompletionCache
+from framework.context_manager import ContextManager
+from framework.checkpoint_store import SQLiteCheckpointStore
+from framework.tracing import TRACER
+from framework.loop_guard import LoopGuard, LoopLimits
+from framework.streaming import print_token
 
 # Define the state for the graph
 class AgentState(TypedDict):
+    session_id: str # Also the checkpoint thread_id
     goal: str
     trip_plan: str
+    itinerary: Dict[str, Any] # Structured, costed itinerary when it was fitted locally
     messages: Annotated[List[Dict[str, Any]], operator.add]
     next_step: str # To control transitions
     error: Annotated[str, operator.add]
+    # Loop guard accounting, summed across nodes
+    llm_calls: Annotated[int, operator.add]
+    llm_tokens: Annotated[int, operator.add]
+    elapsed_s: Annotated[float, operator.add] # Seconds spent in the plan/execute nodes
+    stop_reason: str
+    # Budget total and expense log, checkpointed so resume() restores the session's budget
+    budget_total: float
+    expenses: Annotated[List[Dict[str, Any]], operator.add]
+
+
+def _with_expenses(update: Dict[str, Any], budget, seen: int) -> Dict[str, Any]:
+    """Adds the expenses recorded since `seen` to a node's state update."""
+    added = budget.expenses[seen:]
+    return dict(update, expenses=[dict(expense) for expense in added]) if added else update
+
+
+def expense_node(func):
+    """Wraps a node that may call manage_budget, so its expenses land in the state."""
+    def node(state: Dict[str, Any]) -> Dict[str, Any]:
+        budget = BUDGETS.get(state["session_id"])
+        seen = len(budget.expenses)
+        return _with_expenses(func(state), budget, seen)
+    return node
+
+
+def aexpense_node(afunc):
+    """Async counterpart of expense_node()."""
+    async def node(state: Dict[str, Any]) -> Dict[str, Any]:
+        budget = BUDGETS.get(state["session_id"])
+        seen = len(budget.expenses)
+        return _with_expenses(await afunc(state), budget, seen)
+    return node
 
 
 class BaliTripAgent:
-    def __init__(self):
-        self.planning_agent = PlanningAgent()
-        self.execution_agent = ExecutionAgent()
+    def __init__(self, llm_client=None, async_llm_client=None, completion_cache: CompletionCache = None,
+                 context_manager: ContextManager = None, checkpointer: SQLiteCheckpointStore = None,
+                 stream: bool = False, loop_limits: LoopLimits = None, local_budgeting: bool = True,
+                 plan_fanout: int = 1, on_token=print_token):
+        # One executor (and thread pool) over the shared tool registry for both agents
+        self.tool_executor = ToolExecutor()
+        # Both agents share one completion cache, so identical requests hit it
+        self.completion_cache = completion_cache
+        # Every LLM call goes through one context manager with a bounded token budget
+        self.context_manager = context_manager or ContextManager()
+        # stream=True prints model tokens to the CLI as they arrive
+        self.planning_agent = PlanningAgent(self.tool_executor, llm_client, async_llm_client, completion_cache,
+                                            self.context_manager, stream=stream, on_token=on_token, fanout=plan_fanout)
+        # local_budgeting=True fits activities to the budget locally and uses the LLM only to narrate
+        self.execution_agent = ExecutionAgent(self.tool_executor, llm_client, async_llm_client, completion_cache,
+                                              self.context_manager, stream=stream, on_token=on_token,
+                                              local_budgeting=local_budgeting)
         self.memory_agent = MemoryAgent()
+        # Caps LLM calls, tokens, time spent planning and repeated tool calls per session
+        self.loop_guard = LoopGuard(loop_limits)
+        # With a checkpointer, every completed node is persisted per session
+        self.checkpointer = checkpointer
         self.workflow = self._build_graph()
 
     def _build_graph(self):
         workflow = StateGraph(AgentState)
 
-        # Define nodes
-        workflow.add_node("plan", self.planning_agent.generate_plan)
-        workflow.add_node("execute", self.execution_agent.refine_and_execute)
-        workflow.add_node("memorize", self.memory_agent.process_memory)
+        # Define nodes. Each agent node carries a sync and an async implementation,
+        # so the same compiled graph serves both run() and arun().
+        # Every node is wrapped in a tracing span (free when no trace sink is registered),
+        # and the two looping nodes also go through the loop guard and record their expenses.
+        guard = self.loop_guard
+        workflow.add_node("plan", self._traced_node(
+            "plan",
+            guard.node("plan", expense_node(self.planning_agent.generate_plan)),
+            guard.anode("plan", aexpense_node(self.planning_agent.agenerate_plan)),
+        ))
+        workflow.add_node("execute", self._traced_node(
+            "execute",
+            guard.node("execute", expense_node(self.execution_agent.refine_and_execute)),
+            guard.anode("execute", aexpense_node(self.execution_agent.arefine_and_execute)),
+        ))
+        workflow.add_node("memorize", self._traced_node("memorize", self.memory_agent.process_memory, self.memory_agent.aprocess_memory))
         
         # Add a final step to summarize and check budget
-        workflow.add_node("finalize", self._finalize_trip)
-        workflow.add_node("error_state", self._handle_error)
+        workflow.add_node("finalize", self._traced_node("finalize", self._finalize_trip))
+        workflow.add_node("error_state", self._traced_node("error_state", self._handle_error))
 
         # Define edges (transitions)
         workflow.set_entry_point("plan")
@@ -47,6 +121,7 @@ class BaliTripAgent:
             {
                 "planning": "plan",  # If plan needs more info (e.g., tool calls), loop back to planning
                 "review": "execute", # If plan is generated, move to execution/review
+                "finalize": "finalize", # If the loop guard stopped planning
                 "error": "error_state"
             },
         )
@@ -66,55 +141,156 @@ class BaliTripAgent:
         workflow.add_edge("memorize", END)
         workflow.add_edge("error_state", END) # End if error occurs
 
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
+
+    @staticmethod
+    def _traced_node(name: str, func, afunc=None) -> RunnableLambda:
+        if afunc is None:
+            return RunnableLambda(TRACER.node(name, func))
+        return RunnableLambda(TRACER.node(name, func), afunc=TRACER.anode(name, afunc))
 
     def _finalize_trip(self, state: Dict[str, Any]) -> Dict[str, Any]:
         print("\n[FINALIZING TRIP] Reviewing final plan and budget...")
         final_plan = state.get("trip_plan", "No plan generated.")
-        budget_status = manage_budget("get_status")
+        budget_status = format_status(BUDGETS.get(state["session_id"]).get_status())
+        stop_note = f"Note: planning stopped early ({state['stop_reason']}).\n" if state.get("stop_reason") else ""
         
         final_output = (
             "\n--- BALI TRIP PLAN COMPLETE ---\n"
             f"Here is your 7-day Bali trip plan:\n{final_plan}\n\n"
             f"Final Budget Status:\n{budget_status}\n"
+            f"{stop_note}"
             "Enjoy your relaxing trip to Bali!"
         )
         print(final_output)
-        state["messages"].append({"role": "assistant", "content": final_output})
-        state["next_step"] = "finished" # Signal completion for memory to store
-        return state
+        # Partial update: the messages reducer appends, so only the new message is returned
+        return {
+            "messages": [{"role": "assistant", "content": final_output}],
+            "next_step": "finished", # Signal completion for memory to store
+        }
 
     def _handle_error(self, state: Dict[str, Any]) -> Dict[str, Any]:
         error_message = state.get("error", "An unknown error occurred.")
         print(f"\n[ERROR] The agent encountered an error: {error_message}")
-        state["messages"].append({"role": "system", "content": f"ERROR: {error_message}"})
-        state["next_step"] = "finished" # Force end
-        return state
+        return {
+            "messages": [{"role": "system", "content": f"ERROR: {error_message}"}],
+            "next_step": "finished", # Force end
+        }
 
-    def run(self, user_goal: str):
-        initial_state = {
+    def _initial_state(self, user_goal: str, session_id: str, budget: float = None) -> Dict[str, Any]:
+        return {
+            "session_id": session_id,
             "goal": user_goal,
             "trip_plan": "",
+            "itinerary": {},
             "messages": [],
             "next_step": "plan",
-            "error": ""
+            "error": "",
+            "llm_calls": 0,
+            "llm_tokens": 0,
+            "elapsed_s": 0.0,
+            "stop_reason": "",
+            "budget_total": BUDGETS.initial_budget if budget is None else budget,
+            "expenses": [],
         }
-        print(f"Starting Bali Trip Planner with goal: {user_goal}")
-        
-        # Reset budget for a new run
-        global BUDGET_MANAGER
-        BUDGET_MANAGER = BUDGET_MANAGER.__class__(80000.0) # Re-initialize to original budget
-
-        for s in self.workflow.stream(initial_state):
-            print(f"\n--- Current State ---")
-            for key, value in s.items():
-                if key != "__end__": # Don't print the END signal itself
-                    print(f"{key}: {value}")
-            if "__end__" in s:
-                break
-        
-        final_state = self.workflow.invoke(initial_state)
-        # The stream above already prints, but invoke gives the final state for external use
-        # print("\nFinal State of the Trip Planner:")
-        # print(final_state)
-        return final_state
\ No newline at end of file
+
+    def _config(self, session_id: str) -> Dict[str, Any]:
+        # The loop guard decides when to stop; LangGraph's step limit only backs it up
+        max_calls = self.loop_guard.limits.max_llm_calls
+        recursion_limit = max(25, max_calls + 10) if max_calls is not None else 1000
+        return {"configurable": {"thread_id": session_id}, "recursion_limit": recursion_limit}
+
+    def _print_state(self, state: Dict[str, Any]) -> None:
+        print(f"\n--- Current State ---")
+        for key, value in state.items():
+            print(f"{key}: {value}")
+
+    def _stream(self, graph_input: Optional[Dict[str, Any]], session_id: str, verbose: bool) -> Dict[str, Any]:
+        final_state = graph_input or {}
+        # stream_mode="values" yields the full state after every step, so the last
+        # item is the final state and no second invoke() is needed.
+        for state in self.workflow.stream(graph_input, self._config(session_id), stream_mode="values"):
+            final_state = state
+            if verbose:
+                self._print_state(state)
+        return final_state
+
+    def run(self, user_goal: str, verbose: bool = True, session_id: str = None, budget: float = None) -> Dict[str, Any]:
+        """
+        Runs the workflow once and returns the final state.
+        The final state is taken from the streamed values, so the graph (and every
+        LLM/tool call in it) executes a single time. Pass verbose=False to skip
+        printing the state after every step. With a checkpointer, the session can
+        be continued after a crash with resume(session_id); running an id again
+        starts it over. `budget` overrides the default total budget for this session.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        initial_state = self._initial_state(user_goal, session_id, budget)
+        print(f"Starting Bali Trip Planner with goal: {user_goal} (session {session_id})")
+        # Each session starts with its own fresh budget and checkpoint thread
+        BUDGETS.reset(session_id, budget)
+        self.loop_guard.reset(session_id)
+        self._clear_checkpoints(session_id)
+
+        return self._stream(initial_state, session_id, verbose)
+
+    async def arun(self, user_goal: str, verbose: bool = False, session_id: str = None, budget: float = None) -> Dict[str, Any]:
+        """
+        Async version of run(). The agents await the LLM and tools, so many
+        arun() sessions can share one event loop, e.g. via asyncio.gather.
+        """
+        final_state: Dict[str, Any] = {}
+        async for state in self.astream(user_goal, session_id, budget):
+            final_state = state
+            if verbose:
+                self._print_state(state)
+        return final_state
+
+    async def astream(self, user_goal: str, session_id: str = None, budget: float = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Starts a session like arun() and yields the full state after every
+        step, so a caller can report progress while the graph runs. Like run(),
+        reusing a session id starts it over: its old checkpoints are deleted.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        initial_state = self._initial_state(user_goal, session_id, budget)
+        print(f"Starting Bali Trip Planner with goal: {user_goal} (session {session_id})")
+        BUDGETS.reset(session_id, budget)
+        self.loop_guard.reset(session_id)
+        await asyncio.to_thread(self._clear_checkpoints, session_id)
+        async for state in self.workflow.astream(initial_state, self._config(session_id), stream_mode="values"):
+            yield state
+
+    def _clear_checkpoints(self, session_id: str) -> None:
+        # Otherwise a new run on a used thread would continue from the old checkpoint
+        if self.checkpointer is not None:
+            self.checkpointer.delete_thread(session_id)
+
+    def forget(self, session_id: str) -> None:
+        """
+        Releases everything held for a session: budget, loop guard, memory
+        snapshots, searchable memory records and its checkpoints.
+        """
+        BUDGETS.drop(session_id)
+        self.loop_guard.reset(session_id)
+        self.memory_agent.forget(session_id)
+        self._clear_checkpoints(session_id)
+
+    def resume(self, session_id: str, verbose: bool = True) -> Dict[str, Any]:
+        """
+        Continues a checkpointed session from its last completed node, without
+        repeating the LLM round trips already recorded. The session's budget is
+        rebuilt from the checkpointed total and expense log. Returns the final state.
+        """
+        if self.checkpointer is None:
+            raise ValueError("resume() needs BaliTripAgent(checkpointer=...)")
+        snapshot = self.workflow.get_state(self._config(session_id))
+        if not snapshot.values:
+            raise KeyError(f"No checkpoint found for session '{session_id}'")
+        if not snapshot.next:
+            print(f"Session {session_id} already finished.")
+            return snapshot.values
+        BUDGETS.restore(session_id, snapshot.values.get("budget_total"), snapshot.values.get("expenses", []))
+        print(f"Resuming session {session_id} at node(s): {', '.join(snapshot.next)}")
+        # A None input tells LangGraph to continue from the stored checkpoint
+        return self._stream(None, session_id, verbose) or snapshot.values
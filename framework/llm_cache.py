@@ -0,0 +1,209 @@
+# Response cache for chat completions, keyed on the normalized request
+# framework/llm_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from framework.client_wrapper import ClientWrapper
+from framework.tracing import current_span
+
+
+def _normalize_tool_call(tool_call: Any) -> Dict[str, Any]:
+    # Tool call ids are random per response, so they are left out of the key
+    if isinstance(tool_call, dict):
+        function = tool_call.get("function", {})
+        return {"name": function.get("name"), "arguments": function.get("arguments")}
+    return {"name": tool_call.function.name, "arguments": tool_call.function.arguments}
+
+
+def normalize_message(message: Any) -> Dict[str, Any]:
+    """Reduces a dict or SDK message object to the fields that affect the completion."""
+    get = message.get if isinstance(message, dict) else (lambda key: getattr(message, key, None))
+    normalized = {"role": get("role"), "content": (get("content") or "").strip()}
+    if get("name"):
+        normalized["name"] = get("name")
+    if get("tool_calls"):
+        normalized["tool_calls"] = [_normalize_tool_call(tc) for tc in get("tool_calls")]
+    return normalized
+
+
+def explicit_zero_temperature(request: Dict[str, Any]) -> bool:
+    """True only when the request sets temperature 0; the API's default (1) samples."""
+    temperature = request.get("temperature")
+    return temperature is not None and temperature == 0
+
+
+def dump_response(response: Any) -> str:
+    return response.model_dump_json()
+
+
+def load_response(payload: str) -> Any:
+    """Rebuilds a stored response as the SDK's ChatCompletion (plain JSON, never pickle)."""
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate_json(payload)
+
+
+def completion_key(request: Dict[str, Any]) -> str:
+    """Canonical SHA-256 of model, temperature, tools, tool_choice and messages."""
+    payload = {
+        "model": request.get("model"),
+        "temperature": request.get("temperature"),
+        "tools": request.get("tools"),
+        "tool_choice": request.get("tool_choice"),
+        "messages": [normalize_message(m) for m in request.get("messages", [])],
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Two-tier completion cache: an in-memory LRU with TTL in front of an
+    optional SQLite table of response JSON. Only requests that explicitly set
+    temperature 0 are cached unless allow_nonzero_temperature is set.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 512,
+        ttl: float = 24 * 3600,
+        db_path: Optional[str] = None,
+        allow_nonzero_temperature: bool = False,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.allow_nonzero_temperature = allow_nonzero_temperature
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "skipped": 0}
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS completion_json (key TEXT PRIMARY KEY, created REAL, payload TEXT)"
+            )
+            self._db.commit()
+
+    def is_cacheable(self, request: Dict[str, Any]) -> bool:
+        if request.get("stream"):
+            return False
+        return explicit_zero_temperature(request) or self.allow_nonzero_temperature
+
+    def skip(self) -> None:
+        """Counts a request that bypassed the cache."""
+        with self._lock:
+            self.stats["skipped"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, response = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT created, payload FROM completion_json WHERE key = ?", (key,)).fetchone()
+                response = None
+                if row is not None and now - row[0] <= self.ttl:
+                    try:
+                        response = load_response(row[1])
+                    except ValueError:
+                        response = None  # unreadable row: treated as a miss and overwritten on put()
+                if response is not None:
+                    self._remember(key, row[0], response)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return response
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: Any) -> None:
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO completion_json (key, created, payload) VALUES (?, ?, ?)",
+                    (key, created, dump_response(response)),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, response: Any) -> None:
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM completion_json")
+                self._db.commit()
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+class CachedLLMClient(ClientWrapper):
+    """
+    Wraps an OpenAI-style client so chat.completions.create goes through a
+    CompletionCache. Every other attribute is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client: Any, cache: CompletionCache):
+        super().__init__(client)
+        self.cache = cache
+
+    def _lookup(self, request: Dict[str, Any]) -> tuple:
+        """(key, cached response) for a cacheable request, else (None, None)."""
+        if not self.cache.is_cacheable(request):
+            self.cache.skip()
+            return None, None
+        key = completion_key(request)
+        response = self.cache.get(key)
+        current_span().set("cache.hit", response is not None)
+        return key, response
+
+    def create(self, request: Dict[str, Any]) -> Any:
+        key, response = self._lookup(request)
+        if response is None:
+            response = self.upstream.create(**request)
+            if key is not None:
+                self.cache.put(key, response)
+        return response
+
+    async def acreate(self, request: Dict[str, Any]) -> Any:
+        key, response = self._lookup(request)
+        if response is None:
+            response = await self.upstream.create(**request)
+            if key is not None:
+                self.cache.put(key, response)
+        return response
+
+
+class AsyncCachedLLMClient(CachedLLMClient):
+    """CachedLLMClient for openai.AsyncOpenAI-style clients."""
+
+    is_async = True
+
+
+def with_completion_cache(client: Any, cache: Optional[CompletionCache], is_async: bool = False) -> Any:
+    """Returns `client` wrapped in the cache, or unchanged when no cache is configured."""
+    if cache is None or client is None:
+        return client
+    return (AsyncCachedLLMClient if is_async else CachedLLMClient)(client, cache)
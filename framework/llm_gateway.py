@@ -0,0 +1,401 @@
+# LLM gateway: pooled transport, per-model rate limits, retries, coalescing and priorities
+# framework/llm_gateway.py
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from framework.client_wrapper import ClientWrapper
+from framework.llm_cache import completion_key, explicit_zero_temperature
+from framework.rate_limit import TokenBucket, backoff_delay, is_transient
+
+# Lower runs first: interactive sessions go ahead of batch jobs
+PRIORITIES = {"interactive": 0, "batch": 10}
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "event", "loop", "future", "cancelled")
+
+    def __init__(self, priority: int, seq: int, event: threading.Event = None, loop=None, future=None):
+        self.priority = priority
+        self.seq = seq
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class PriorityLimiter:
+    """
+    At most `max_concurrency` requests in flight. When all slots are taken,
+    a freed slot goes to the waiter with the lowest priority value, then the
+    earliest arrival. Threads and asyncio tasks can wait on the same limiter.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _try_enter(self) -> bool:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def acquire(self, priority: int = 0) -> float:
+        """Blocks until a slot is free; returns the time spent queued."""
+        with self._lock:
+            if self._try_enter():
+                return 0.0
+            waiter = _Waiter(priority, next(self._seq), event=threading.Event())
+            heapq.heappush(self._waiters, waiter)
+        started = time.monotonic()
+        waiter.event.wait()
+        return time.monotonic() - started
+
+    async def aacquire(self, priority: int = 0) -> float:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_enter():
+                return 0.0
+            waiter = _Waiter(priority, next(self._seq), loop=loop, future=loop.create_future())
+            heapq.heappush(self._waiters, waiter)
+        started = time.monotonic()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # the slot was handed over just before the cancel
+            raise
+        return time.monotonic() - started
+
+    def _deliver(self, waiter: _Waiter) -> None:
+        # Runs on the waiter's event loop
+        if waiter.future.done():
+            self.release()  # cancelled while the handover was scheduled: pass the slot on
+        else:
+            waiter.future.set_result(None)
+
+    def _hand_over(self) -> bool:
+        # Called with the lock held: gives one slot to the next live waiter
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.cancelled:
+                continue
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(self._deliver, waiter)
+            return True
+        return False
+
+    def release(self) -> None:
+        with self._lock:
+            # The slot passes straight to a waiter, so `active` is unchanged
+            if not self._hand_over():
+                self.active -= 1
+
+    def resize(self, max_concurrency: int) -> None:
+        """Changes the number of slots; extra slots go to waiters at once, fewer take effect as calls finish."""
+        with self._lock:
+            self.max_concurrency = max_concurrency
+            while self.active < self.max_concurrency and self._hand_over():
+                self.active += 1
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+class _Pending:
+    """An in-flight request that identical concurrent requests wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMGateway:
+    """
+    Single entry point for every LLM request of the process. Each request
+    takes a concurrency slot (by priority), a token from its model's bucket,
+    and is retried on transient failures with jittered exponential backoff.
+    Identical deterministic requests in flight at the same time share one
+    upstream call. The OpenAI SDK clients underneath reuse one pooled HTTP
+    connection set; any OpenAI-style client can be passed in instead.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, client: Any = None, async_client: Any = None,
+                 rate_limits: Dict[str, float] = None, default_rate: float = None, max_concurrency: int = 16,
+                 max_connections: int = 32, max_retries: int = 3, timeout: float = 60.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = client
+        self._async_client = async_client
+        # model -> requests/second; models not listed use default_rate (None: unlimited)
+        self.rate_limits = dict(rate_limits or {})
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.slots = PriorityLimiter(max_concurrency)
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._inflight: Dict[str, _Pending] = {}
+        self._ainflight: Dict[tuple, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "upstream_calls": 0, "coalesced": 0, "wait_timeouts": 0, "retries": 0, "failures": 0,
+            "queued_seconds": 0.0, "throttled_seconds": 0.0,
+        }
+
+    @property
+    def sync_backend(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = self._build_backend(is_async=False)
+        return self._client
+
+    @property
+    def async_backend(self) -> Any:
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = self._build_backend(is_async=True)
+        return self._async_client
+
+    def _build_backend(self, is_async: bool) -> Any:
+        import httpx
+        from openai import AsyncOpenAI, OpenAI
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        http_client = (httpx.AsyncClient if is_async else httpx.Client)(limits=limits, timeout=self.timeout)
+        # Retries happen in the gateway, not in the SDK, so they respect the rate limits
+        return (AsyncOpenAI if is_async else OpenAI)(
+            api_key=self.api_key, base_url=self.base_url, max_retries=0, timeout=self.timeout, http_client=http_client,
+        )
+
+    def bucket(self, model: str) -> Optional[TokenBucket]:
+        with self._lock:
+            if model not in self._buckets:
+                rate = self.rate_limits.get(model, self.default_rate)
+                self._buckets[model] = TokenBucket(rate) if rate else None
+            return self._buckets[model]
+
+    def configure(self, default_rate: float = None, max_retries: int = None, max_concurrency: int = None) -> List[str]:
+        """
+        Applies new settings to a running gateway (None keeps the current one)
+        and returns the names of those that changed. A new default rate takes
+        effect for requests that have not yet taken a token.
+        """
+        changed = []
+        with self._lock:
+            if default_rate is not None and default_rate != self.default_rate:
+                self.default_rate = default_rate
+                # Buckets of models without their own rate are rebuilt on next use
+                self._buckets = {model: bucket for model, bucket in self._buckets.items() if model in self.rate_limits}
+                changed.append("default_rate")
+            if max_retries is not None and max_retries != self.max_retries:
+                self.max_retries = max_retries
+                changed.append("max_retries")
+        if max_concurrency is not None and max_concurrency != self.slots.max_concurrency:
+            self.slots.resize(max_concurrency)
+            changed.append("max_concurrency")
+        return changed
+
+    def client(self, priority: str = "interactive") -> "GatewayClient":
+        """OpenAI-style client whose requests carry `priority`."""
+        return GatewayClient(self, priority)
+
+    def async_client(self, priority: str = "interactive") -> "AsyncGatewayClient":
+        return AsyncGatewayClient(self, priority)
+
+    @staticmethod
+    def _coalescable(kwargs: Dict[str, Any]) -> bool:
+        # Streams cannot be shared, and sampled answers (including the API's default temperature) stay independent
+        return not kwargs.get("stream") and explicit_zero_temperature(kwargs)
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def create(self, kwargs: Dict[str, Any], priority: str = "interactive") -> Any:
+        self._count("requests")
+        if not self._coalescable(kwargs):
+            return self._send(kwargs, priority)
+        key = completion_key(kwargs)
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = _Pending()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            # A hung leader must not hang its followers: after the request timeout they send their own
+            if not pending.event.wait(self.timeout):
+                self._count("wait_timeouts")
+                return self._send(kwargs, priority)
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        try:
+            pending.result = self._send(kwargs, priority)
+            return pending.result
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+
+    def _send(self, kwargs: Dict[str, Any], priority: str) -> Any:
+        bucket = self.bucket(kwargs.get("model"))
+        attempt = 0
+        while True:
+            # The slot is held for the call only, not while backing off
+            self._count("queued_seconds", self.slots.acquire(PRIORITIES.get(priority, 0)))
+            try:
+                if bucket is not None:
+                    self._count("throttled_seconds", bucket.acquire())
+                self._count("upstream_calls")
+                # A stream is returned as soon as it opens; reading it does not hold the slot
+                return self.sync_backend.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    self._count("failures")
+                    raise
+                self._count("retries")
+            finally:
+                self.slots.release()
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    async def acreate(self, kwargs: Dict[str, Any], priority: str = "interactive") -> Any:
+        self._count("requests")
+        if not self._coalescable(kwargs):
+            return await self._asend(kwargs, priority)
+        # Tasks belong to one event loop, so coalescing is per loop
+        key = (id(asyncio.get_running_loop()), completion_key(kwargs))
+        task = self._ainflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+            try:
+                # Shielded: a caller that is cancelled or gives up leaves the shared request running
+                return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            except asyncio.TimeoutError:
+                self._count("wait_timeouts")
+                return await self._asend(kwargs, priority)
+        # The upstream call runs as its own task, so cancelling the caller that started it
+        # does not cancel the callers coalesced onto it
+        task = self._ainflight[key] = asyncio.ensure_future(self._asend(kwargs, priority))
+        task.add_done_callback(lambda done: self._shared_done(key, done))
+        return await asyncio.shield(task)
+
+    def _shared_done(self, key: tuple, task: asyncio.Task) -> None:
+        if self._ainflight.get(key) is task:
+            del self._ainflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here, so a request nobody awaits any more is not reported as lost
+
+    async def _asend(self, kwargs: Dict[str, Any], priority: str) -> Any:
+        bucket = self.bucket(kwargs.get("model"))
+        attempt = 0
+        while True:
+            self._count("queued_seconds", await self.slots.aacquire(PRIORITIES.get(priority, 0)))
+            try:
+                if bucket is not None:
+                    self._count("throttled_seconds", await bucket.aacquire())
+                self._count("upstream_calls")
+                return await self.async_backend.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    self._count("failures")
+                    raise
+                self._count("retries")
+            finally:
+                self.slots.release()
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def report(self) -> str:
+        stats = self.stats
+        return (
+            f"[GATEWAY] {stats['requests']} requests, {stats['upstream_calls']} upstream calls, "
+            f"{stats['coalesced']} coalesced, {stats['retries']} retries, {stats['failures']} failures, "
+            f"queued {stats['queued_seconds']:.2f}s, throttled {stats['throttled_seconds']:.2f}s"
+        )
+
+    def close(self) -> None:
+        """Closes the pooled sync connections (the async pool closes with its event loop)."""
+        if self._client is not None and hasattr(self._client, "close"):
+            self._client.close()
+
+
+class GatewayClient(ClientWrapper):
+    """
+    OpenAI-style client view of an LLMGateway with a fixed priority.
+    Every other attribute is forwarded to the gateway's backend client.
+    """
+
+    def __init__(self, gateway: LLMGateway, priority: str = "interactive"):
+        super().__init__(None)  # the backend is built lazily by the gateway
+        self.gateway = gateway
+        self.priority = priority
+
+    @property
+    def wrapped(self) -> Any:
+        return self.gateway.async_backend if self.is_async else self.gateway.sync_backend
+
+    def create(self, request: Dict[str, Any]) -> Any:
+        return self.gateway.create(request, self.priority)
+
+    async def acreate(self, request: Dict[str, Any]) -> Any:
+        return await self.gateway.acreate(request, self.priority)
+
+
+class AsyncGatewayClient(GatewayClient):
+    """GatewayClient for the async agents."""
+
+    is_async = True
+
+
+def default_gateway(rate_limit: float = None, max_retries: int = None, max_concurrency: int = None) -> LLMGateway:
+    """Gateway to the configured OpenAI endpoint (config.llm_settings), with one rate for every model."""
+    from config.llm_settings import client
+    return LLMGateway(api_key=client.api_key, base_url=str(client.base_url), default_rate=rate_limit,
+                      max_retries=3 if max_retries is None else max_retries,
+                      max_concurrency=16 if max_concurrency is None else max_concurrency)
+
+
+_shared_gateway: Optional[LLMGateway] = None
+_shared_lock = threading.Lock()
+
+
+def shared_gateway(rate_limit: float = None, max_retries: int = None, max_concurrency: int = None) -> LLMGateway:
+    """
+    The process-wide gateway, built by default_gateway() on first use. Every
+    caller shares its connection pool, rate limits and priority queue, so
+    interactive and batch sessions in one process are scheduled together.
+    Settings passed by later calls are applied to the existing gateway
+    (None keeps the current value), and the change is logged.
+    """
+    global _shared_gateway
+    with _shared_lock:
+        if _shared_gateway is None:
+            _shared_gateway = default_gateway(rate_limit, max_retries, max_concurrency)
+            return _shared_gateway
+        changed = _shared_gateway.configure(rate_limit, max_retries, max_concurrency)
+    if changed:
+        print(f"[GATEWAY] shared gateway reconfigured: {', '.join(changed)}")
+    return _shared_gateway
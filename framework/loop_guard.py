@@ -0,0 +1,169 @@
+# Loop guard: caps LLM calls, tokens and time spent planning per session and detects stalled loops
+# framework/loop_guard.py
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from framework.context_manager import message_tokens, message_to_dict
+
+# Steps that would send the graph around the plan/execute loops again
+LOOP_STEPS = ("planning", "review", "execution")
+
+
+class LoopLimits:
+    """Per-session budgets. Any limit set to None is not enforced."""
+
+    def __init__(self, max_llm_calls: Optional[int] = 40, max_tokens: Optional[int] = 250_000,
+                 max_seconds: Optional[float] = 900.0, max_repeated_tool_calls: int = 5,
+                 max_stalled_steps: int = 3):
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.max_repeated_tool_calls = max_repeated_tool_calls
+        self.max_stalled_steps = max_stalled_steps
+
+
+def llm_usage_tokens(response: Any, completion_kwargs: Dict[str, Any], message: Any) -> int:
+    """Total tokens of one LLM call: from the API usage, or estimated when streaming."""
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        return usage.total_tokens
+    return sum(message_tokens(m) for m in completion_kwargs["messages"]) + message_tokens(message_to_dict(message))
+
+
+def _tool_call_key(tool_call: Dict[str, Any]) -> tuple:
+    # Same tool with the same arguments, regardless of the call id or key order
+    function = tool_call.get("function", {})
+    arguments = function.get("arguments") or "{}"
+    try:
+        arguments = json.dumps(json.loads(arguments), sort_keys=True)
+    except (TypeError, ValueError):
+        pass
+    return function.get("name"), arguments
+
+
+def _update_key(update: Dict[str, Any]) -> int:
+    """Fingerprint of what a node step produced, ignoring tool call ids."""
+    parts = []
+    for message in update.get("messages", []):
+        calls = tuple(_tool_call_key(call) for call in message.get("tool_calls") or ())
+        parts.append((message.get("role"), message.get("content"), calls))
+    return hash((update.get("next_step"), update.get("trip_plan"), tuple(parts)))
+
+
+class _SessionGuard:
+    __slots__ = ("tool_call_counts", "last_update", "stalled_steps", "stop_reason")
+
+    def __init__(self):
+        self.tool_call_counts: Dict[tuple, int] = {}
+        self.last_update: Dict[str, int] = {}  # node -> fingerprint of its previous update
+        self.stalled_steps = 0
+        self.stop_reason: Optional[str] = None
+
+
+class LoopGuard:
+    """
+    Governs the plan/execute loops. LLM calls, tokens and the seconds spent
+    in the guarded nodes are summed in the graph state (so they survive
+    checkpoints, and time between a crash and resume() does not count against
+    the session); repeated tool calls and stalls
+    are tracked per session with a dict lookup and one fingerprint comparison,
+    so each step costs O(1) in the length of the history. When a limit is hit
+    the node's next step becomes "finalize", ending the loop with what exists.
+    """
+
+    def __init__(self, limits: LoopLimits = None, max_sessions: int = 10000):
+        self.limits = limits or LoopLimits()
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionGuard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> _SessionGuard:
+        with self._lock:
+            guard = self._sessions.get(session_id)
+            if guard is None:
+                guard = self._sessions[session_id] = _SessionGuard()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return guard
+
+    def reset(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def observe(self, session_id: str, node: str, update: Dict[str, Any]) -> None:
+        """Records one node step: counts its tool calls and compares it with the node's previous step."""
+        guard = self._session(session_id)
+        for message in update.get("messages", []):
+            for tool_call in message.get("tool_calls") or ():
+                key = _tool_call_key(tool_call)
+                count = guard.tool_call_counts[key] = guard.tool_call_counts.get(key, 0) + 1
+                if count > self.limits.max_repeated_tool_calls and guard.stop_reason is None:
+                    guard.stop_reason = f"repeated tool call {key[0]}({key[1]}) {count} times"
+
+        fingerprint = _update_key(update)
+        if guard.last_update.get(node) == fingerprint:
+            guard.stalled_steps += 1
+            if guard.stalled_steps >= self.limits.max_stalled_steps and guard.stop_reason is None:
+                guard.stop_reason = f"no progress for {guard.stalled_steps} steps"
+        else:
+            guard.stalled_steps = 0
+        guard.last_update[node] = fingerprint
+
+    def check(self, state: Dict[str, Any], update: Dict[str, Any] = None) -> Optional[str]:
+        """Returns why the session must stop, or None. `update` is counted as already applied."""
+        update = update or {}
+        limits = self.limits
+        calls = state.get("llm_calls", 0) + update.get("llm_calls", 0)
+        if limits.max_llm_calls is not None and calls >= limits.max_llm_calls:
+            return f"LLM call budget reached ({calls}/{limits.max_llm_calls})"
+        tokens = state.get("llm_tokens", 0) + update.get("llm_tokens", 0)
+        if limits.max_tokens is not None and tokens >= limits.max_tokens:
+            return f"token budget reached ({tokens}/{limits.max_tokens})"
+        elapsed = state.get("elapsed_s", 0.0) + update.get("elapsed_s", 0.0)
+        if limits.max_seconds is not None and elapsed >= limits.max_seconds:
+            return f"time budget reached ({limits.max_seconds:g}s)"
+        return self._session(state.get("session_id", "default")).stop_reason
+
+    def _stop(self, node: str, reason: str, update: Dict[str, Any] = None) -> Dict[str, Any]:
+        print(f"\n[LOOP GUARD] Stopping the {node} loop: {reason}. Finalizing with the current plan.")
+        update = dict(update or {})
+        update["next_step"] = "finalize"
+        update["stop_reason"] = reason
+        return update
+
+    @staticmethod
+    def _timed(update: Dict[str, Any], started: float) -> Dict[str, Any]:
+        if not isinstance(update, dict):
+            return update
+        return dict(update, elapsed_s=time.monotonic() - started)
+
+    def _after(self, node: str, state: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(update, dict) or update.get("next_step") not in LOOP_STEPS:
+            return update  # errors and completed executions route as usual
+        self.observe(state.get("session_id", "default"), node, update)
+        reason = self.check(state, update)
+        return self._stop(node, reason, update) if reason else update
+
+    def node(self, name: str, func):
+        """Wraps a plan/execute node: refuses to call the LLM once a budget is spent."""
+        def guarded(state: Dict[str, Any]) -> Dict[str, Any]:
+            reason = self.check(state)
+            if reason:
+                return self._stop(name, reason)
+            started = time.monotonic()
+            return self._after(name, state, self._timed(func(state), started))
+        return guarded
+
+    def anode(self, name: str, afunc):
+        """Async counterpart of node()."""
+        async def guarded(state: Dict[str, Any]) -> Dict[str, Any]:
+            reason = self.check(state)
+            if reason:
+                return self._stop(name, reason)
+            started = time.monotonic()
+            return self._after(name, state, self._timed(await afunc(state), started))
+        return guarded
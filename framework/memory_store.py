@@ -1 +1,260 @@
-# Optional FAISS/Chroma memory (not implemented)
+# Retrieval memory: chunked records with a BM25 keyword index and an optional vector index
+# framework/memory_store.py
+
+import hashlib
+import heapq
+import itertools
+import math
+import re
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the vector index falls back to pure Python
+    np = None
+
+_TOKEN_RE = re.compile(r"[a-z0-9₹]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "this", "to", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class MemoryRecord:
+    """One compact, searchable chunk of a stored state."""
+
+    __slots__ = ("id", "session_id", "state_index", "kind", "text")
+
+    def __init__(self, id: int, session_id: str, state_index: int, kind: str, text: str):
+        self.id = id
+        self.session_id = session_id
+        self.state_index = state_index
+        self.kind = kind
+        self.text = text
+
+    def to_dict(self, score: float = None) -> Dict[str, Any]:
+        record = {
+            "session_id": self.session_id,
+            "state_index": self.state_index,
+            "kind": self.kind,
+            "text": self.text,
+        }
+        if score is not None:
+            record["score"] = round(score, 4)
+        return record
+
+
+class BM25Index:
+    """
+    Inverted index with incremental adds and removals and Okapi BM25 scoring.
+    A query scans at most `max_postings` postings per term, newest first, so
+    lookups stay bounded as the index grows; IDF still uses the full counts.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_postings: int = 2000):
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> {doc_id: tf}, oldest first
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: int, tokens: List[str]) -> None:
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            self.postings[token][doc_id] = tf
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: int, tokens: List[str]) -> None:
+        """Removes a document; `tokens` are the ones it was added with."""
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[token]
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def search(self, tokens: Iterable[str], k: int) -> List[Tuple[float, int]]:
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs
+        k1, doc_lengths = self.k1, self.doc_lengths
+        # norm = k1 * (1 - b + b * length / avg_length), split so the loop does one multiply-add
+        base, per_token = k1 * (1 - self.b), k1 * self.b / avg_length
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokens):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            df = len(postings)
+            weight = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (k1 + 1)
+            for doc_id in itertools.islice(reversed(postings), self.max_postings):
+                tf = postings[doc_id]
+                scores[doc_id] += weight * tf / (tf + base + per_token * doc_lengths[doc_id])
+        return heapq.nlargest(k, ((score, doc_id) for doc_id, score in scores.items()))
+
+
+def hashed_embedding(tokens: List[str], dim: int) -> List[float]:
+    """Local stand-in for a sentence embedding: L2-normalized feature-hashed bag of words."""
+    vector = [0.0] * dim
+    for token in tokens:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class VectorIndex:
+    """Brute-force cosine top-k over hashed embeddings; uses NumPy when available."""
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+        self.doc_ids: List[int] = []
+        self._rows: List[List[float]] = []
+        self._matrix = None  # NumPy matrix, rebuilt lazily after adds
+
+    def add(self, doc_id: int, tokens: List[str]) -> None:
+        self.doc_ids.append(doc_id)
+        self._rows.append(hashed_embedding(tokens, self.dim))
+        self._matrix = None
+
+    def remove(self, doc_ids: set) -> None:
+        kept = [(doc_id, row) for doc_id, row in zip(self.doc_ids, self._rows) if doc_id not in doc_ids]
+        self.doc_ids = [doc_id for doc_id, _ in kept]
+        self._rows = [row for _, row in kept]
+        self._matrix = None
+
+    def search(self, tokens: List[str], k: int) -> List[Tuple[float, int]]:
+        if not self.doc_ids:
+            return []
+        query = hashed_embedding(tokens, self.dim)
+        if np is not None:
+            if self._matrix is None or len(self._matrix) != len(self._rows):
+                self._matrix = np.asarray(self._rows, dtype=np.float32)
+            scores = self._matrix @ np.asarray(query, dtype=np.float32)
+            top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+            hits = sorted(((float(scores[i]), self.doc_ids[i]) for i in top), reverse=True)
+        else:
+            scored = ((sum(a * b for a, b in zip(row, query)), doc_id) for row, doc_id in zip(self._rows, self.doc_ids))
+            hits = heapq.nlargest(k, scored)
+        # Records sharing no hashed features with the query are not matches
+        return [(score, doc_id) for score, doc_id in hits if score > 0]
+
+
+class MemoryIndex:
+    """
+    Retrieval store for MemoryAgent. Each stored state is chunked into compact
+    MemoryRecords (goal, plan, and only the messages added since the session's
+    previous state), identical chunks are stored once, and records are indexed
+    incrementally as states arrive. Records are kept for the `max_sessions`
+    most recently updated sessions; forget() drops one session's records.
+    """
+
+    def __init__(self, chunk_chars: int = 600, use_vectors: bool = False, vector_dim: int = 128,
+                 max_sessions: Optional[int] = 1000, max_postings: int = 2000):
+        self.chunk_chars = chunk_chars
+        self.max_sessions = max_sessions
+        self.records: Dict[int, MemoryRecord] = {}
+        self.keywords = BM25Index(max_postings=max_postings)
+        self.vectors = VectorIndex(vector_dim) if use_vectors else None
+        # session_id -> its record ids, least recently updated session first
+        self._session_records: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._seen: Dict[str, set] = {}  # session_id -> chunk fingerprints
+        self._message_offsets: Dict[str, int] = {}
+        self._ids = itertools.count()
+        self._state_count = 0
+        self.evicted_sessions = 0
+
+    def _chunks(self, text: str) -> List[str]:
+        text = " ".join(text.split())
+        return [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def _add_record(self, session_id: str, state_index: int, kind: str, text: str) -> None:
+        seen = self._seen.setdefault(session_id, set())
+        for chunk in self._chunks(text):
+            fingerprint = (kind, hash(chunk))
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            record = MemoryRecord(next(self._ids), session_id, state_index, kind, chunk)
+            self.records[record.id] = record
+            self._session_records[session_id].append(record.id)
+            tokens = tokenize(chunk)
+            self.keywords.add(record.id, tokens)
+            if self.vectors is not None:
+                self.vectors.add(record.id, tokens)
+
+    def forget(self, session_id: str) -> int:
+        """Drops every record of a session; returns how many were removed."""
+        record_ids = self._session_records.pop(session_id, [])
+        for record_id in record_ids:
+            record = self.records.pop(record_id)
+            self.keywords.remove(record_id, tokenize(record.text))
+        if self.vectors is not None and record_ids:
+            self.vectors.remove(set(record_ids))
+        self._seen.pop(session_id, None)
+        self._message_offsets.pop(session_id, None)
+        return len(record_ids)
+
+    def add_state(self, state: Dict[str, Any]) -> int:
+        """Indexes what is new in `state`; returns its state index."""
+        state_index = self._state_count
+        self._state_count += 1
+        session_id = state.get("session_id", "default")
+        if session_id not in self._session_records:
+            self._session_records[session_id] = []
+            while self.max_sessions is not None and len(self._session_records) > self.max_sessions:
+                self.forget(next(iter(self._session_records)))
+                self.evicted_sessions += 1
+        self._session_records.move_to_end(session_id)
+
+        if state.get("goal"):
+            self._add_record(session_id, state_index, "goal", state["goal"])
+        if state.get("trip_plan"):
+            self._add_record(session_id, state_index, "plan", state["trip_plan"])
+
+        messages = state.get("messages") or []
+        offset = self._message_offsets.get(session_id, 0)
+        if offset > len(messages):  # a new run reusing the session id
+            offset = 0
+        for message in messages[offset:]:
+            get = message.get if isinstance(message, dict) else (lambda key: getattr(message, key, None))
+            content = get("content")
+            if content:
+                kind = get("name") or get("role") or "message"
+                self._add_record(session_id, state_index, kind, content)
+        self._message_offsets[session_id] = len(messages)
+        return state_index
+
+    def search(self, query: str, k: int = 5, mode: str = "bm25") -> List[Dict[str, Any]]:
+        """Top-k records for `query`; mode is 'bm25', 'vector' or 'hybrid'."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        if mode == "bm25" or self.vectors is None:
+            hits = self.keywords.search(tokens, k)
+        elif mode == "vector":
+            hits = self.vectors.search(tokens, k)
+        else:
+            # Reciprocal rank fusion of both result lists
+            fused: Dict[int, float] = defaultdict(float)
+            for ranked in (self.keywords.search(tokens, k * 4), self.vectors.search(tokens, k * 4)):
+                for rank, (_, doc_id) in enumerate(ranked):
+                    fused[doc_id] += 1.0 / (60 + rank)
+            hits = heapq.nlargest(k, ((score, doc_id) for doc_id, score in fused.items()))
+        return [self.records[doc_id].to_dict(score) for score, doc_id in hits]
+
+    def __len__(self) -> int:
+        return len(self.records)
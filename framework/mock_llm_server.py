@@ -0,0 +1,171 @@
+# Local mock of the chat completions HTTP API, for gateway and load testing
+# framework/mock_llm_server.py
+#
+# Usage (from the repository root):
+#   python -m framework.mock_llm_server --port 8089 --latency 0.2 --failure-rate 0.05
+# then point the agents at it with OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from framework.fake_llm import FakeLLMClient, completion_json, default_policy, response_chunks
+
+
+def chunk_json(chunk: Any, model: str, completion_id: str) -> Dict[str, Any]:
+    """A fake stream chunk as the API's chat.completion.chunk JSON."""
+    choice = chunk.choices[0]
+    delta: Dict[str, Any] = {}
+    if choice.delta.content is not None:
+        delta["content"] = choice.delta.content
+    if choice.delta.tool_calls:
+        delta["tool_calls"] = []
+        for tc in choice.delta.tool_calls:
+            call: Dict[str, Any] = {"index": tc.index, "function": {}}
+            if tc.id:
+                call.update(id=tc.id, type="function")
+            if tc.function.name:
+                call["function"]["name"] = tc.function.name
+            if tc.function.arguments is not None:
+                call["function"]["arguments"] = tc.function.arguments
+            delta["tool_calls"].append(call)
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": choice.finish_reason}],
+    }
+
+
+class MockLLMServer:
+    """
+    Serves POST /v1/chat/completions (plain and streamed) from a fake LLM
+    policy, with configurable latency and a share of injected 429/503
+    failures. Tracks the number of requests and the peak concurrency, which
+    is what a gateway's limits should bound.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 policy: Callable[[List[Any], Optional[List[Dict[str, Any]]]], Dict[str, Any]] = default_policy,
+                 latency: float = 0.05, failure_rate: float = 0.0, seed: int = None):
+        self.fake = FakeLLMClient(policy=policy)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "active": 0, "peak_active": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _enter(self) -> bool:
+        """Counts a request in; returns False when it should fail."""
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["active"] += 1
+            self.stats["peak_active"] = max(self.stats["peak_active"], self.stats["active"])
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.stats["failures"] += 1
+            return not fail
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.stats["active"] -= 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # one line per request would drown a load test
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                ok = server._enter()
+                try:
+                    time.sleep(server.latency)
+                    if not ok:
+                        status = server._random.choice((429, 503))
+                        self._send_json(status, {"error": {"message": "Injected failure", "type": "mock_error"}})
+                        return
+                    model = request.get("model", "mock")
+                    completion_id = f"chatcmpl-mock-{next(server._ids)}"
+                    response = server.fake._respond(request.get("messages", []), request.get("tools"))
+                    if request.get("stream"):
+                        self._stream(response, model, completion_id)
+                    else:
+                        self._send_json(200, completion_json(response, model, completion_id))
+                finally:
+                    server._leave()
+
+            def _stream(self, response: Any, model: str, completion_id: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [json.dumps(chunk_json(c, model, completion_id)) for c in response_chunks(response)]
+                for data in events + ["[DONE]"]:
+                    payload = f"data: {data}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+    def start(self) -> str:
+        """Serves on a background thread; returns the base URL."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock chat completions server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 429/503.")
+    args = parser.parse_args()
+    server = MockLLMServer(args.host, args.port, latency=args.latency, failure_rate=args.failure_rate)
+    print(f"[MOCK LLM] Serving {server.base_url}/chat/completions (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(f"[MOCK LLM] {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Speculative planning: the final plan request written K ways at once, scored locally, first good one wins
+# framework/plan_fanout.py
+
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from framework.itinerary import THEMES, parse_goal, text_theme_counts
+from framework.itinerary_optimizer import coverage
+from framework.streaming import StreamAssembler
+from framework.tracing import TRACER
+
+# Tools the planner is asked to use before it writes the plan
+RESEARCH_TOOLS = ("search_internet", "search_flights")
+
+_DAY_RE = re.compile(r"\bday\s*(\d+)", re.IGNORECASE)
+_TOTAL_RE = re.compile(r"total[^₹\d\n]{0,40}(?:₹|inr|rs\.?)\s*([\d,]+)", re.IGNORECASE)
+
+
+class PlanScorer:
+    """
+    Cheap local score in [0, 1] for a written plan: theme coverage of the
+    goal (weighted like the itinerary optimizer), how many of the goal's days
+    it covers, and whether a stated total stays within the remaining budget.
+    """
+
+    def __init__(self, theme_weight: float = 0.5, day_weight: float = 0.3, budget_weight: float = 0.2):
+        self.theme_weight = theme_weight
+        self.day_weight = day_weight
+        self.budget_weight = budget_weight
+
+    def score(self, plan: str, goal: str, remaining_budget: Optional[float] = None) -> float:
+        if not plan:
+            return 0.0
+        days, themes = parse_goal(goal)
+        theme_score = coverage(text_theme_counts(plan), themes) / (sum(themes.values()) or 1.0)
+
+        mentioned = {int(day) for day in _DAY_RE.findall(plan)}
+        day_score = len({day for day in mentioned if 1 <= day <= days}) / days
+
+        budget_score = 1.0
+        totals = [float(amount.replace(",", "")) for amount in _TOTAL_RE.findall(plan) if amount.replace(",", "")]
+        if totals and remaining_budget is not None and max(totals) > remaining_budget:
+            budget_score = max(0.0, 1.0 - (max(totals) - remaining_budget) / max(remaining_budget, 1.0))
+        return self.theme_weight * theme_score + self.day_weight * day_score + self.budget_weight * budget_score
+
+
+def emphases(goal: str, k: int) -> List[Optional[str]]:
+    """
+    The K candidate emphases: None (the plain request) first, then the goal's
+    own themes, then the remaining ones.
+    """
+    _, themes = parse_goal(goal)
+    ordered = sorted(THEMES, key=lambda theme: -themes[theme])
+    return ([None] + ordered)[:max(1, k)]
+
+
+def emphasis_message(theme: str) -> Dict[str, Any]:
+    return {
+        "role": "system",
+        "content": (
+            "Write the complete day-by-day plan now without calling tools. "
+            f"Give extra emphasis to {theme} activities while still covering every part of the goal and staying within budget."
+        ),
+    }
+
+
+def research_done(messages: List[Any]) -> bool:
+    """
+    True once the history holds results of every RESEARCH_TOOLS call, which
+    the planner's prompt asks for before the plan: the next reply is then
+    most likely the plan itself, so it is worth writing it several ways.
+    """
+    called = {m.get("name") for m in messages if isinstance(m, dict) and m.get("role") == "tool"}
+    return all(tool in called for tool in RESEARCH_TOOLS)
+
+
+class Candidate:
+    __slots__ = ("index", "emphasis", "response", "message", "score", "status", "sent")
+
+    def __init__(self, index: int, emphasis: Optional[str]):
+        self.index = index
+        self.emphasis = emphasis
+        self.response = None
+        self.message = None
+        self.score: Optional[float] = None
+        self.status = "pending"  # pending -> plan | tool_calls | failed | cancelled
+        self.sent = False
+
+    @property
+    def label(self) -> str:
+        return self.emphasis or "balanced"
+
+
+def _settle(candidate: Candidate, message: Any, scorer: PlanScorer, goal: str, remaining_budget: Optional[float],
+            response: Any = None) -> None:
+    candidate.response = response
+    candidate.message = message
+    if message.tool_calls:
+        candidate.status = "tool_calls"
+    else:
+        candidate.status = "plan"
+        candidate.score = scorer.score(message.content or "", goal, remaining_budget)
+
+
+def _decide(candidates: List[Candidate], done: bool, threshold: float) -> Optional[Candidate]:
+    """
+    The winner so far, or None to keep waiting. The plain request (first)
+    wins at once if it asks for tools, since the plan is not ready to be
+    written; a plan at or above the threshold also wins at once. Once every
+    candidate is settled, the best plan wins.
+    """
+    if candidates[0].status == "tool_calls":
+        return candidates[0]
+    for candidate in candidates:
+        if candidate.status == "plan" and candidate.score >= threshold:
+            return candidate
+    if not done:
+        return None
+    plans = [c for c in candidates if c.status == "plan"]
+    return max(plans, key=lambda c: (c.score, -c.index)) if plans else None
+
+
+def report(candidates: List[Candidate], winner: Optional[Candidate]) -> str:
+    parts = []
+    for c in candidates:
+        detail = f"{c.score:.2f}" if c.score is not None else c.status
+        parts.append(f"{c.label} {detail}{' (chosen)' if c is winner else ''}")
+    return f"[PLAN FANOUT] {len(candidates)} candidates: " + ", ".join(parts)
+
+
+class PlanFanout:
+    """
+    Speculative plan writing for the final plan step (see research_done()).
+    The plain request (with tools) and K-1 emphasis variants (beach, culture,
+    nature, ..., without tools) are sent at once. A tool-call reply to the
+    plain request wins and cancels the others; otherwise each plan is scored
+    locally as it arrives, the first one that meets `threshold` wins, and the
+    requests still in flight are cancelled. If none does, the best plan wins.
+    """
+
+    def __init__(self, k: int = 3, threshold: float = 0.8, scorer: PlanScorer = None):
+        self.k = k
+        self.threshold = threshold
+        self.scorer = scorer or PlanScorer()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, k), thread_name_prefix="plan")
+
+    def _requests(self, completion_kwargs: Dict[str, Any], goal: str) -> List[Tuple[Candidate, Dict[str, Any]]]:
+        """Every candidate: the plain request as given, then the emphases, which get no tools."""
+        plain = {key: value for key, value in completion_kwargs.items() if key not in ("tools", "tool_choice")}
+        requests = []
+        for index, emphasis in enumerate(emphases(goal, self.k)):
+            if emphasis is None:
+                requests.append((Candidate(index, None), completion_kwargs))
+            else:
+                kwargs = dict(plain, messages=completion_kwargs["messages"] + [emphasis_message(emphasis)])
+                requests.append((Candidate(index, emphasis), kwargs))
+        return requests
+
+    @staticmethod
+    def _stream(create: Callable[..., Any], kwargs: Dict[str, Any], candidate: Candidate,
+                stop: threading.Event) -> Optional[Any]:
+        # Streamed, so a losing request can be dropped mid-answer: closing the stream
+        # ends the upstream generation instead of letting it run to the end
+        if stop.is_set():
+            return None
+        candidate.sent = True
+        with TRACER.span("chat.completions.stream", "llm", **{"llm.model": kwargs.get("model")}):
+            stream = create(stream=True, **kwargs)
+            assembler = StreamAssembler()
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        return None
+                    assembler.feed(chunk)
+            finally:
+                close = getattr(stream, "close", None)
+                if close is not None:
+                    close()
+        return assembler.finish()
+
+    def run(self, create: Callable[..., Any], completion_kwargs: Dict[str, Any], goal: str,
+            remaining_budget: Optional[float] = None) -> Tuple[Optional[Candidate], List[Candidate]]:
+        """Streams every candidate on its own thread; returns (winner, all candidates)."""
+        requests = self._requests(completion_kwargs, goal)
+        candidates = [candidate for candidate, _ in requests]
+        stop = threading.Event()
+        # Each thread gets the caller's context, so LLM spans nest under the plan node
+        futures = {
+            self.pool.submit(contextvars.copy_context().run, self._stream, create, kwargs, candidate, stop): candidate
+            for candidate, kwargs in requests
+        }
+        pending = set(futures)
+        winner = None
+        while pending and winner is None:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                candidate = futures[future]
+                try:
+                    _settle(candidate, future.result(), self.scorer, goal, remaining_budget)
+                except Exception as e:
+                    print(f"[PLAN FANOUT] {candidate.label} candidate failed: {e}")
+                    candidate.status = "failed"
+            winner = _decide(candidates, not pending, self.threshold)
+        # Queued requests are never sent, and streams in flight close at their next chunk
+        stop.set()
+        for future in pending:
+            future.cancel()
+            futures[future].status = "cancelled"
+        return winner, candidates
+
+    async def arun(self, create: Callable[..., Any], completion_kwargs: Dict[str, Any], goal: str,
+                   remaining_budget: Optional[float] = None) -> Tuple[Optional[Candidate], List[Candidate]]:
+        """Async counterpart of run(): losing requests are cancelled in flight."""
+        requests = self._requests(completion_kwargs, goal)
+        candidates = [candidate for candidate, _ in requests]
+        tasks = {}
+        for candidate, kwargs in requests:
+            candidate.sent = True
+            tasks[asyncio.ensure_future(create(**kwargs))] = candidate
+        pending = set(tasks)
+        winner = None
+        try:
+            while pending and winner is None:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    candidate = tasks[task]
+                    try:
+                        response = task.result()
+                        _settle(candidate, response.choices[0].message, self.scorer, goal, remaining_budget, response)
+                    except Exception as e:
+                        print(f"[PLAN FANOUT] {candidate.label} candidate failed: {e}")
+                        candidate.status = "failed"
+                winner = _decide(candidates, not pending, self.threshold)
+        finally:
+            for task in pending:
+                task.cancel()
+                tasks[task].status = "cancelled"
+        return winner, candidates
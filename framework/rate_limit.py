@@ -0,0 +1,63 @@
+# Rate limiting and transient-failure helpers used by the LLM gateway
+# framework/rate_limit.py
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+# Status codes and SDK error names worth retrying (openai is not imported here)
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for timeouts, connection drops, rate limits and 5xx responses."""
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    return getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts up to `capacity`.
+    Callers reserve a token under a lock and then sleep outside it, so waiting
+    callers are served in arrival order and the check itself is O(1).
+    Usable from threads (acquire) and from asyncio (aacquire).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens  # may go negative: that is the queue of reservations
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocks until a token is available; returns the time waited."""
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: float = 1.0) -> float:
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,141 @@
+# Compact state snapshots: append-only message log per session plus per-step field deltas
+# framework/snapshot_store.py
+
+import copy
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from framework.context_manager import message_to_dict
+
+# Scalar AgentState fields tracked as deltas; messages are tracked by offset
+SNAPSHOT_FIELDS = ("goal", "trip_plan", "next_step", "error")
+
+
+class Snapshot:
+    """
+    One stored step. Holds only the fields that changed since the previous
+    snapshot of the session, plus the end offset into the session's message log.
+    """
+
+    __slots__ = ("index", "created", "message_end", "changes")
+
+    def __init__(self, index: int, created: float, message_end: int, changes: Optional[Dict[str, Any]]):
+        self.index = index
+        self.created = created
+        self.message_end = message_end
+        self.changes = changes
+
+
+class SessionHistory:
+    """
+    Message log and bounded list of snapshots for one session. Messages older
+    than every retained snapshot are trimmed from the front; `message_base`
+    is how many were trimmed, so offsets stay absolute.
+    """
+
+    __slots__ = ("messages", "message_base", "snapshots", "last_fields", "next_index")
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.message_base = 0
+        self.snapshots: deque = deque()
+        self.last_fields: Dict[str, Any] = {}
+        self.next_index = 0
+
+
+class SnapshotStore:
+    """
+    Stores AgentState snapshots as deltas with structural sharing:
+    - each new message is deep-copied once into the session's log, so later
+      mutation of the live state cannot change stored history;
+    - a snapshot records only changed fields and a message offset;
+    - retention keeps the newest max_snapshots per session and the
+      max_sessions most recently updated sessions; messages from before the
+      retained snapshots are trimmed, so a rebuilt state holds the messages
+      of the retained window only.
+    """
+
+    def __init__(self, max_snapshots: Optional[int] = 200, max_sessions: Optional[int] = 1000):
+        self.max_snapshots = max_snapshots
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, SessionHistory]" = OrderedDict()
+        self.evicted_snapshots = 0
+        self.evicted_sessions = 0
+
+    def add(self, state: Dict[str, Any]) -> Snapshot:
+        session_id = state.get("session_id", "default")
+        history = self.sessions.get(session_id)
+        if history is None:
+            history = self.sessions[session_id] = SessionHistory()
+        self.sessions.move_to_end(session_id)
+
+        messages = state.get("messages") or []
+        if len(messages) < history.message_base + len(history.messages):
+            # The session id was reused for a new run: start a fresh history
+            history = self.sessions[session_id] = SessionHistory()
+        for message in messages[history.message_base + len(history.messages):]:
+            history.messages.append(copy.deepcopy(message_to_dict(message)))
+
+        changes = {}
+        for field in SNAPSHOT_FIELDS:
+            value = state.get(field)
+            if history.last_fields.get(field) != value:
+                changes[field] = value
+                history.last_fields[field] = value
+
+        snapshot = Snapshot(history.next_index, time.time(), history.message_base + len(history.messages), changes or None)
+        history.next_index += 1
+        history.snapshots.append(snapshot)
+        self._evict(history)
+        return snapshot
+
+    def _evict(self, history: SessionHistory) -> None:
+        if self.max_snapshots is not None:
+            trim_to = history.message_base
+            while len(history.snapshots) > self.max_snapshots:
+                dropped = history.snapshots.popleft()
+                # Fold the dropped deltas into the new oldest snapshot so it stays a full base
+                if dropped.changes:
+                    base = history.snapshots[0]
+                    base.changes = {**dropped.changes, **(base.changes or {})}
+                trim_to = dropped.message_end
+                self.evicted_snapshots += 1
+            if trim_to > history.message_base:
+                # No retained snapshot starts before the dropped one ended
+                del history.messages[:trim_to - history.message_base]
+                history.message_base = trim_to
+        if self.max_sessions is not None:
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted_sessions += 1
+
+    def drop(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+
+    def materialize(self, session_id: str = "default", index: int = -1) -> Optional[Dict[str, Any]]:
+        """Rebuilds the full state for one retained snapshot (default: the latest)."""
+        history = self.sessions.get(session_id)
+        if history is None or not history.snapshots:
+            return None
+        position = index if index >= 0 else len(history.snapshots) + index
+        if not 0 <= position < len(history.snapshots):
+            return None
+        state: Dict[str, Any] = {"session_id": session_id}
+        for snapshot in list(history.snapshots)[:position + 1]:
+            if snapshot.changes:
+                state.update(snapshot.changes)
+        target = history.snapshots[position]
+        state["messages"] = copy.deepcopy(history.messages[:target.message_end - history.message_base])
+        return state
+
+    def recent(self, n: int = 5) -> List[Dict[str, Any]]:
+        """Latest n snapshots of the most recently updated session, as full states."""
+        if not self.sessions:
+            return []
+        session_id = next(reversed(self.sessions))
+        count = len(self.sessions[session_id].snapshots)
+        return [self.materialize(session_id, i) for i in range(max(0, count - n), count)]
+
+    def __len__(self) -> int:
+        return sum(len(history.snapshots) for history in self.sessions.values())
@@ -0,0 +1,160 @@
+# Streaming support: assemble chat completion chunks into a message as they arrive
+# framework/streaming.py
+
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from framework.tracing import TRACER
+
+
+def print_token(token: str) -> None:
+    """Default token sink for the CLI: write tokens as they arrive."""
+    sys.stdout.write(token)
+    sys.stdout.flush()
+
+
+class StreamedFunction:
+    def __init__(self):
+        self.name = ""
+        self.arguments = ""
+
+
+class StreamedToolCall:
+    def __init__(self, index: int):
+        self.index = index
+        self.id = None
+        self.type = "function"
+        self.function = StreamedFunction()
+
+
+class StreamedMessage:
+    """Same shape as an SDK response message: .role, .content, .tool_calls."""
+
+    def __init__(self, content: Optional[str], tool_calls: List[StreamedToolCall]):
+        self.role = "assistant"
+        self.content = content
+        self.tool_calls = tool_calls or None
+
+
+class StreamAssembler:
+    """
+    Consumes streamed chunks (choices[0].delta) and rebuilds the full message.
+    Content tokens go to `on_token` immediately. Tool call deltas are merged by
+    index; a tool call is complete as soon as the next one starts (or the
+    stream ends), and is handed to `on_tool_call` right away so it can start
+    executing while the rest of the response is still streaming.
+    """
+
+    def __init__(self, on_token: Optional[Callable[[str], None]] = None,
+                 on_tool_call: Optional[Callable[[StreamedToolCall], None]] = None):
+        self.on_token = on_token
+        self.on_tool_call = on_tool_call
+        self.content_parts: List[str] = []
+        self.tool_calls: Dict[int, StreamedToolCall] = {}
+        self._open_index: Optional[int] = None
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+
+    def _close_open_call(self) -> None:
+        if self._open_index is not None and self.on_tool_call is not None:
+            self.on_tool_call(self.tool_calls[self._open_index])
+        self._open_index = None
+
+    def feed(self, chunk: Any) -> None:
+        if not getattr(chunk, "choices", None):
+            return  # e.g. a trailing usage-only chunk
+        delta = chunk.choices[0].delta
+        self.chunks += 1
+        if self.first_token_at is None and (getattr(delta, "content", None) or getattr(delta, "tool_calls", None)):
+            self.first_token_at = time.perf_counter()
+
+        if getattr(delta, "content", None):
+            self.content_parts.append(delta.content)
+            if self.on_token is not None:
+                self.on_token(delta.content)
+
+        for tool_delta in getattr(delta, "tool_calls", None) or []:
+            if tool_delta.index != self._open_index:
+                self._close_open_call()
+                self._open_index = tool_delta.index
+            call = self.tool_calls.get(tool_delta.index)
+            if call is None:
+                call = self.tool_calls[tool_delta.index] = StreamedToolCall(tool_delta.index)
+            if tool_delta.id:
+                call.id = tool_delta.id
+            function = getattr(tool_delta, "function", None)
+            if function is not None:
+                if function.name:
+                    call.function.name += function.name
+                if function.arguments:
+                    call.function.arguments += function.arguments
+
+    def finish(self) -> StreamedMessage:
+        self._close_open_call()
+        content = "".join(self.content_parts) or None
+        ordered = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        return StreamedMessage(content, ordered)
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started) * 1000
+
+    def report(self) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        ttft = f"{self.ttft_ms:.0f} ms" if self.ttft_ms is not None else "n/a"
+        return f"[STREAM] time to first token: {ttft}, total: {total_ms:.0f} ms, chunks: {self.chunks}"
+
+
+def _early_start(tool_executor, context, calls: List[Any], started: Dict[int, Any], start: Callable):
+    def on_tool_call(tool_call: StreamedToolCall) -> None:
+        call = tool_executor.parse([tool_call])[0]
+        handle = start(call, context)
+        if handle is not None:
+            started[len(calls)] = handle
+        calls.append(call)
+    return on_tool_call
+
+
+def stream_completion(client, completion_kwargs: Dict[str, Any], tool_executor, context: Dict[str, Any],
+                      on_token: Optional[Callable[[str], None]] = print_token):
+    """
+    Runs one streamed completion. Tokens go to `on_token` as they arrive, and
+    each tool call is submitted to `tool_executor` as soon as its arguments are
+    complete. Returns (response_message, tool_results) like the blocking path.
+    """
+    calls: List[Any] = []
+    started: Dict[int, Any] = {}
+    assembler = StreamAssembler(on_token, _early_start(tool_executor, context, calls, started, tool_executor.start))
+    with TRACER.span("chat.completions.stream", "llm", **{"llm.model": completion_kwargs.get("model")}) as span:
+        for chunk in client.chat.completions.create(stream=True, **completion_kwargs):
+            assembler.feed(chunk)
+        message = assembler.finish()
+        span.set("llm.ttft_ms", round(assembler.ttft_ms or 0.0, 3))
+    if message.content and on_token is not None:
+        on_token("\n")
+    print(assembler.report())
+    tool_results = tool_executor.execute(calls, context, started) if calls else []
+    return message, tool_results
+
+
+async def astream_completion(client, completion_kwargs: Dict[str, Any], tool_executor, context: Dict[str, Any],
+                             on_token: Optional[Callable[[str], None]] = print_token):
+    """Async counterpart of stream_completion(), for the async clients."""
+    calls: List[Any] = []
+    started: Dict[int, Any] = {}
+    assembler = StreamAssembler(on_token, _early_start(tool_executor, context, calls, started, tool_executor.astart))
+    with TRACER.span("chat.completions.stream", "llm", **{"llm.model": completion_kwargs.get("model")}) as span:
+        stream = await client.chat.completions.create(stream=True, **completion_kwargs)
+        async for chunk in stream:
+            assembler.feed(chunk)
+        message = assembler.finish()
+        span.set("llm.ttft_ms", round(assembler.ttft_ms or 0.0, 3))
+    if message.content and on_token is not None:
+        on_token("\n")
+    print(assembler.report())
+    tool_results = await tool_executor.aexecute(calls, context, started) if calls else []
+    return message, tool_results
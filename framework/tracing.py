@@ -0,0 +1,367 @@
+# Tracing: spans for graph nodes, tool calls and LLM calls, with pluggable sinks
+# framework/tracing.py
+
+import contextlib
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from framework.client_wrapper import ClientWrapper
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind  # "node", "tool" or "llm"
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Handed out when no sink is registered, so instrumented code costs almost nothing."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def current_span():
+    """The innermost open span in this context (a no-op span outside of any)."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def trace_id_for(session_id: str) -> str:
+    """Sessions map to stable 32-hex trace ids, so one session is one trace."""
+    return hashlib.md5(session_id.encode("utf-8")).hexdigest()
+
+
+def record_usage(span, response: Any) -> None:
+    """Copies token usage from an API response onto the span."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        span.set("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        span.set("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to every registered sink. Parent
+    links follow contextvars, so they survive awaits; ToolExecutor copies the
+    context into its pool threads. With no sinks, spans are not created at all.
+    """
+
+    def __init__(self):
+        self.sinks: List[Any] = []
+
+    def add_sink(self, sink) -> Any:
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink) -> None:
+        self.sinks.remove(sink)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    @contextlib.contextmanager
+    def span(self, name: str, kind: str, session_id: str = None, **attributes):
+        if not self.sinks:
+            yield _NOOP_SPAN
+            return
+        parent = _current_span.get()
+        if session_id is not None:
+            trace_id = trace_id_for(session_id)
+            attributes["session.id"] = session_id
+        else:
+            trace_id = parent.trace_id if parent is not None else trace_id_for("untraced")
+        span = Span(name, kind, trace_id, parent.span_id if parent is not None else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            for sink in self.sinks:
+                sink.record(span)
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            flush = getattr(sink, "flush", None)
+            if flush is not None:
+                flush()
+
+    def node(self, name: str, func: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable:
+        """Wraps a sync graph node so each run is a span in the session's trace."""
+        @functools.wraps(func)
+        def traced(state: Dict[str, Any]) -> Dict[str, Any]:
+            with self.span(name, "node", session_id=state.get("session_id")) as span:
+                update = func(state)
+                if isinstance(update, dict) and update.get("next_step"):
+                    span.set("graph.next_step", update["next_step"])
+                return update
+        return traced
+
+    def anode(self, name: str, afunc: Callable) -> Callable:
+        """Async counterpart of node()."""
+        @functools.wraps(afunc)
+        async def traced(state: Dict[str, Any]) -> Dict[str, Any]:
+            with self.span(name, "node", session_id=state.get("session_id")) as span:
+                update = await afunc(state)
+                if isinstance(update, dict) and update.get("next_step"):
+                    span.set("graph.next_step", update["next_step"])
+                return update
+        return traced
+
+
+# Process-wide tracer; sinks are registered by the entry point (e.g. main.py --profile)
+TRACER = Tracer()
+
+
+class MetricsAggregator:
+    """
+    In-process sink: count, total/max duration, errors, tokens and cache hits
+    per (kind, name). Cheap enough to leave on for every run.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[tuple, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        duration = span.duration_ms
+        attributes = span.attributes
+        with self._lock:
+            entry = self.metrics.get((span.kind, span.name))
+            if entry is None:
+                entry = self.metrics[(span.kind, span.name)] = {
+                    "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "cache_hits": 0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration
+            entry["max_ms"] = max(entry["max_ms"], duration)
+            entry["errors"] += span.error is not None
+            entry["prompt_tokens"] += attributes.get("llm.prompt_tokens", 0)
+            entry["completion_tokens"] += attributes.get("llm.completion_tokens", 0)
+            entry["cache_hits"] += bool(attributes.get("cache.hit"))
+
+    def hot_paths(self, kind: str = None) -> List[tuple]:
+        """(kind, name, metrics) sorted by total time, slowest first."""
+        with self._lock:
+            rows = [(k, n, dict(m)) for (k, n), m in self.metrics.items() if kind is None or k == kind]
+        return sorted(rows, key=lambda row: row[2]["total_ms"], reverse=True)
+
+    def report(self) -> str:
+        """Hot-path breakdown; node shares are of total node time (tools and LLM calls run inside nodes)."""
+        node_total = sum(m["total_ms"] for _, _, m in self.hot_paths("node")) or 1.0
+        lines = ["[PROFILE] kind   name                      calls    total ms   mean ms    max ms  share  tokens(p/c)   cache hits"]
+        for kind, name, m in self.hot_paths():
+            lines.append(
+                f"[PROFILE] {kind:<6} {name:<24} {m['count']:>6} {m['total_ms']:>10.1f} "
+                f"{m['total_ms'] / m['count']:>9.2f} {m['max_ms']:>9.2f} {m['total_ms'] / node_total:>6.0%} "
+                f"{int(m['prompt_tokens']):>6}/{int(m['completion_tokens']):<6} {int(m['cache_hits']):>6}"
+            )
+        return "\n".join(lines)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusSink(MetricsAggregator):
+    """Aggregates like MetricsAggregator and writes Prometheus text exposition to `path` on flush()."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+
+    def exposition(self) -> str:
+        series = (
+            ("agent_span_duration_seconds_sum", "counter", "Total time spent in spans.", "total_ms", 1e-3),
+            ("agent_span_duration_seconds_max", "gauge", "Slowest single span.", "max_ms", 1e-3),
+            ("agent_span_total", "counter", "Spans recorded.", "count", 1),
+            ("agent_span_errors_total", "counter", "Spans that raised.", "errors", 1),
+            ("agent_llm_prompt_tokens_total", "counter", "Prompt tokens reported by the API.", "prompt_tokens", 1),
+            ("agent_llm_completion_tokens_total", "counter", "Completion tokens reported by the API.", "completion_tokens", 1),
+            ("agent_cache_hits_total", "counter", "Spans served from a cache.", "cache_hits", 1),
+        )
+        rows = self.hot_paths()
+        lines = []
+        for metric, metric_type, help_text, field, scale in series:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for kind, name, m in rows:
+                lines.append(f'{metric}{{kind="{_label(kind)}",name="{_label(name)}"}} {m[field] * scale:g}')
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        # Write then rename, so a scraper never reads a half-written file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.exposition())
+        os.replace(tmp_path, self.path)
+
+
+def _otel_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTelJSONSink:
+    """
+    Appends spans to `path` as OTLP/JSON ExportTraceServiceRequest lines,
+    readable by OpenTelemetry collectors. Spans are buffered and written in
+    batches: as soon as `max_buffer` are waiting, every `flush_interval`
+    seconds from a background thread, and on flush(). A failed write drops
+    its batch (counted in `dropped`), so the buffer stays bounded.
+    """
+
+    SPAN_KINDS = {"node": 1, "tool": 1, "llm": 3}  # INTERNAL, CLIENT
+
+    def __init__(self, path: str, service_name: str = "bali-trip-planner", max_buffer: int = 512,
+                 flush_interval: Optional[float] = 5.0):
+        self.path = path
+        self.service_name = service_name
+        self.max_buffer = max_buffer
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # keeps concurrent batches on separate lines
+        self._closed = threading.Event()
+        if flush_interval:
+            threading.Thread(target=self._flush_periodically, args=(flush_interval,),
+                             name="otel-flush", daemon=True).start()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+            full = len(self.spans) >= self.max_buffer
+        if full:
+            self._flush_quietly()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self._flush_quietly()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"[TRACE] Could not write spans to {self.path}: {e}")
+
+    def _span_json(self, span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.SPAN_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": "span.kind", "value": {"stringValue": span.kind}}]
+            + [{"key": key, "value": _otel_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "framework.tracing"}, "spans": [self._span_json(s) for s in spans]}],
+        }]}
+        try:
+            with self._write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request) + "\n")
+        except OSError:
+            self.dropped += len(spans)
+            raise
+
+    def close(self) -> None:
+        """Stops the background flushes and writes what is left."""
+        self._closed.set()
+        self.flush()
+
+
+class TracedLLMClient(ClientWrapper):
+    """
+    Wraps an OpenAI-style client so every chat.completions.create is an "llm"
+    span with token usage; the completion cache underneath marks cache hits.
+    Every other attribute is forwarded to the wrapped client.
+    """
+
+    def __init__(self, client: Any, agent: str, tracer: Tracer = TRACER):
+        super().__init__(client)
+        self._tracer = tracer
+        self._agent = agent
+
+    def _span(self, request: Dict[str, Any]):
+        return self._tracer.span("chat.completions", "llm", **{"llm.model": request.get("model"), "agent": self._agent})
+
+    def create(self, request: Dict[str, Any]) -> Any:
+        if request.get("stream") or not self._tracer.enabled:
+            # Streams are traced by framework.streaming, which sees the whole response
+            return self.upstream.create(**request)
+        with self._span(request) as span:
+            response = self.upstream.create(**request)
+            if not span.attributes.get("cache.hit"):
+                record_usage(span, response)  # a cached reply spent no tokens
+            return response
+
+    async def acreate(self, request: Dict[str, Any]) -> Any:
+        if request.get("stream") or not self._tracer.enabled:
+            return await self.upstream.create(**request)
+        with self._span(request) as span:
+            response = await self.upstream.create(**request)
+            if not span.attributes.get("cache.hit"):
+                record_usage(span, response)
+            return response
+
+
+class AsyncTracedLLMClient(TracedLLMClient):
+    """TracedLLMClient for openai.AsyncOpenAI-style clients."""
+
+    is_async = True
+
+
+def with_tracing(client: Any, agent: str, is_async: bool = False) -> Any:
+    """Returns `client` wrapped for tracing (unchanged if client is None)."""
+    if client is None:
+        return client
+    return (AsyncTracedLLMClient if is_async else TracedLLMClient)(client, agent)
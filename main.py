@@ -1,13 +1,54 @@
 # main.py
 
+import argparse
 import os
+import sys
 from dotenv import load_dotenv
 from framework.langgraph_auto_loop import BaliTripAgent
+from framework.llm_cache import CompletionCache
+from framework.checkpoint_store import SQLiteCheckpointStore
+from framework.context_manager import ContextManager
+from framework.batch_runner import build_agent, run_batch
+from framework.llm_gateway import shared_gateway
+from framework.cli_interface import TripService, serve_http, serve_stdio, session_token
+from framework.streaming import print_token
+from framework.tracing import TRACER, MetricsAggregator, OTelJSONSink, PrometheusSink
+from tools.tool_cache import tool_cache_stats
+from tools.knowledge_base import knowledge_base
 
 # Load environment variables from .env file
 load_dotenv()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bali Trip Planner CLI Agent")
+    parser.add_argument("--resume", metavar="SESSION_ID", help="Continue a checkpointed session from its last completed node.")
+    parser.add_argument("--quiet", action="store_true", help="Do not print the state after every step.")
+    parser.add_argument("--stream", action="store_true", help="Print model tokens as they arrive and report time to first token.")
+    parser.add_argument("--batch", metavar="GOALS_JSONL", help="Plan every goal in a JSONL file (one session per goal).")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Where --batch appends one JSON result per goal.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions in flight at once in --batch and --serve modes.")
+    parser.add_argument("--processes", type=int, default=0, help="Run --batch across this many worker processes instead of one event loop.")
+    parser.add_argument("--rate", type=float, default=float(os.getenv("LLM_RATE_LIMIT", "0")) or None,
+                        help="Maximum LLM requests per second (default: unlimited).")
+    parser.add_argument("--retries", type=int, default=1, help="Retries for a --batch goal whose session ends in an error.")
+    parser.add_argument("--llm-budgeting", action="store_true",
+                        help="Let the LLM budget the plan item by item instead of fitting it locally.")
+    parser.add_argument("--plan-fanout", type=int, default=1, metavar="K",
+                        help="At the final plan step, write K-1 emphasis variants alongside the plain plan and keep the best (default: 1).")
+    parser.add_argument("--serve", choices=("stdio", "http"),
+                        help="Run as a long-lived service: JSON lines on stdin/stdout, or an HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address for --serve http.")
+    parser.add_argument("--port", type=int, default=8080, help="Port for --serve http.")
+    parser.add_argument("--max-queued", type=int, default=32, help="Sessions allowed to wait beyond --concurrency before --serve rejects new ones.")
+    parser.add_argument("--idle-timeout", type=float, default=900.0, help="Seconds before --serve releases an idle finished session.")
+    parser.add_argument("--profile", action="store_true", help="Trace nodes, tools and LLM calls and print a hot-path breakdown at the end.")
+    parser.add_argument("--trace-otel", metavar="PATH", help="Append the run's spans to PATH as OpenTelemetry (OTLP/JSON) lines.")
+    parser.add_argument("--metrics-prom", metavar="PATH", help="Write span metrics to PATH in Prometheus text format.")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+
     # Ensure OpenAI API key is set
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY environment variable not set.")
@@ -15,11 +56,75 @@ def main():
         return
 
     print("--- Bali Trip Planner CLI Agent ---")
-    user_goal = "Plan a 7-day relaxing trip to Bali with beach, culture, nature under ₹80,000 from Delhi."
-    print(f"Goal: {user_goal}")
 
-    agent = BaliTripAgent()
-    final_result = agent.run(user_goal)
+    profiler = TRACER.add_sink(MetricsAggregator()) if args.profile else None
+    if args.trace_otel:
+        TRACER.add_sink(OTelJSONSink(args.trace_otel))
+    if args.metrics_prom:
+        TRACER.add_sink(PrometheusSink(args.metrics_prom))
+    try:
+        run(args)
+    finally:
+        TRACER.flush()
+        if profiler is not None:
+            print("\n" + profiler.report())
+
+def run(args):
+    """Runs the batch, resume or single-goal mode selected on the command line."""
+    # Identical temperature-0 requests (e.g. the stock goal) are answered from disk
+    cache_db = os.getenv("LLM_CACHE_DB", ".llm_cache.sqlite")
+    completion_cache = CompletionCache(db_path=cache_db)
+    # The destination index is loaded (or built and saved next to the data) once, before the first search
+    knowledge_base()
+
+    if args.batch:
+        agent = None
+        if args.processes <= 0:
+            agent = build_agent(args.rate, completion_cache=completion_cache)
+        run_batch(args.batch, args.output, args.concurrency, args.processes, args.rate, args.retries, agent, cache_db)
+        print(f"[LLM CACHE] {completion_cache.stats} (hit rate {completion_cache.hit_rate():.0%})")
+        return
+
+    # Every completed node is checkpointed, so a crashed run can be resumed
+    checkpointer = SQLiteCheckpointStore(os.getenv("CHECKPOINT_DB", ".checkpoints.sqlite"))
+    # LLM calls go through the gateway: pooled connections, rate limit and retries
+    gateway = shared_gateway(args.rate, max_retries=3)
+    # In service mode one warm agent serves every session, and tokens go to the session's own client
+    # Per-call context sizes are printed for a single interactive run only; a service would flood its logs
+    context_manager = ContextManager(verbose=not (args.quiet or args.serve))
+    agent = BaliTripAgent(llm_client=gateway.client("interactive"), async_llm_client=gateway.async_client("interactive"),
+                          completion_cache=completion_cache, context_manager=context_manager,
+                          checkpointer=checkpointer, stream=args.stream,
+                          local_budgeting=not args.llm_budgeting, plan_fanout=args.plan_fanout,
+                          on_token=session_token if args.serve else print_token)
+
+    if args.serve:
+        service = TripService(agent, max_active=args.concurrency, max_queued=args.max_queued,
+                              idle_timeout=args.idle_timeout).start()
+        try:
+            if args.serve == "stdio":
+                serve_stdio(service)
+            else:
+                serve_http(service, args.host, args.port)
+        finally:
+            service.stop()
+        # stdout may be the protocol channel, so the summary goes to stderr
+        print(f"[SERVICE] {service.report()}", file=sys.stderr)
+        print(gateway.report(), file=sys.stderr)
+        return
+
+    if args.resume:
+        final_result = agent.resume(args.resume, verbose=not args.quiet)
+    else:
+        user_goal = "Plan a 7-day relaxing trip to Bali with beach, culture, nature under ₹80,000 from Delhi."
+        print(f"Goal: {user_goal}")
+        final_result = agent.run(user_goal, verbose=not args.quiet)
+    print(f"\n[LLM CACHE] {completion_cache.stats} (hit rate {completion_cache.hit_rate():.0%})")
+    print(f"[CONTEXT] {context_manager.totals}")
+    print(f"[CHECKPOINTS] write latency: {checkpointer.latency_stats()}")
+    print(gateway.report())
+    for tool_name, stats in tool_cache_stats().items():
+        print(f"[TOOL CACHE] {tool_name}: {stats}")
     
     # You can access the final state here if needed
     # print("\nFinal result from agent.run():")
@@ -0,0 +1,89 @@
+# Tests: batch planning over a JSONL file of goals
+# tests/test_batch_runner.py
+
+import asyncio
+import json
+
+import pytest
+
+from framework.batch_runner import BatchRunner, goal_text, load_goals, percentile
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient, default_policy
+from framework.langgraph_loop import BaliTripAgent
+from tools.budget_checker import BUDGETS
+
+
+def _agent(checkpointer, policy=None) -> BaliTripAgent:
+    return BaliTripAgent(llm_client=FakeLLMClient(policy), async_llm_client=FakeAsyncLLMClient(policy),
+                         checkpointer=checkpointer, on_token=lambda token: None)
+
+
+def _failing_once():
+    failed = set()
+
+    def policy(messages, tools):
+        goal = next(m["content"] for m in messages if m["role"] == "user")
+        if "Mumbai" in goal and goal not in failed:
+            failed.add(goal)
+            raise RuntimeError("upstream 503")
+        return default_policy(messages, tools)
+    return policy
+
+
+def test_load_goals_numbers_records_without_an_id(tmp_path):
+    path = tmp_path / "goals.jsonl"
+    path.write_text('{"id": "c1", "origin": "Mumbai"}\n\n{"goal": "Plan a Bali trip"}\n', encoding="utf-8")
+    records = load_goals(str(path))
+    assert [r["id"] for r in records] == ["c1", "3"]
+    assert "from Mumbai" in goal_text(records[0])
+    assert goal_text(records[1]) == "Plan a Bali trip"
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 0.5) == 2.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 0.95) == 4.0
+
+
+def test_batch_writes_one_result_per_goal_and_releases_sessions(tmp_path, checkpointer):
+    agent = _agent(checkpointer, _failing_once())
+    output = tmp_path / "results.jsonl"
+    runner = BatchRunner(str(output), concurrency=3, session_retries=1, agent=agent)
+    records = [{"id": "delhi", "budget": 90000}, {"id": "mumbai", "origin": "Mumbai"}, {"id": "chennai", "origin": "Chennai"}]
+    summary = asyncio.run(runner.arun(records))
+
+    results = {r["id"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert summary["goals"] == 3 and summary["failed"] == 0
+    assert results["delhi"]["budget"]["total_budget"] == 90000
+    assert results["mumbai"]["attempts"] == 2
+    assert all(r["status"] == "ok" and r["trip_plan"] for r in results.values())
+
+    # Every attempt, failed or finished, was released
+    session_ids = [f"{runner.batch_id}-{r['id']}-1" for r in records] + [results["mumbai"]["session_id"]]
+    assert not any(session_id in BUDGETS._budgets for session_id in session_ids)
+    assert len(agent.memory_agent.index) == 0
+    assert not agent.memory_agent.memory_store.sessions
+    assert checkpointer.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 0
+
+
+def test_session_that_keeps_failing_is_reported(tmp_path):
+    def broken(messages, tools):
+        raise RuntimeError("model unavailable")
+
+    output = tmp_path / "results.jsonl"
+    runner = BatchRunner(str(output), session_retries=1, agent=_agent(None, broken))
+    summary = asyncio.run(runner.arun([{"id": "x"}]))
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert summary["failed"] == 1
+    assert result["status"] == "error" and "model unavailable" in result["error"]
+    assert result["attempts"] == 2
+    assert BatchRunner.report(summary).endswith("1 failed")
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_concurrency_does_not_change_results(tmp_path, concurrency):
+    output = tmp_path / f"results-{concurrency}.jsonl"
+    runner = BatchRunner(str(output), concurrency=concurrency, agent=_agent(None))
+    asyncio.run(runner.arun([{"id": str(i), "days": 5} for i in range(4)]))
+    results = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(r["id"] for r in results) == ["0", "1", "2", "3"]
+    assert len({r["budget"]["total_spent"] for r in results}) == 1
@@ -0,0 +1,89 @@
+# Tests: per-session budgets, the manage_budget tool and budget restore on resume
+# tests/test_budget.py
+
+import json
+import threading
+
+from tools.budget_checker import BudgetRegistry, manage_budget, BUDGETS
+
+
+def test_sessions_have_separate_budgets():
+    registry = BudgetRegistry(1000.0)
+    registry.get("a").add_expense("Flight", 600.0)
+    assert registry.get("a").remaining_budget == 400.0
+    assert registry.get("b").remaining_budget == 1000.0
+
+
+def test_expense_over_remaining_budget_is_refused():
+    manager = BudgetRegistry(500.0).get("a")
+    message = manager.add_expense("Resort villa", 900.0)
+    assert message.startswith("Cannot add expense")
+    assert manager.get_status()["expense_count"] == 0
+
+
+def test_status_totals_by_inferred_category():
+    manager = BudgetRegistry(10000.0).get("a")
+    manager.add_expense("Hotel in Ubud", 3000.0)
+    manager.add_expense("Airport taxi", 500.0)
+    manager.add_expense("Temple ticket", 200.0, "activities")
+    status = manager.get_status()
+    assert status["total_spent"] == 3700.0
+    assert status["by_category"] == {"lodging": 3000.0, "transport": 500.0, "activities": 200.0}
+
+
+def test_restore_replays_the_expense_log():
+    registry = BudgetRegistry(80000.0)
+    manager = registry.restore("a", 50000.0, [{"item": "Flights", "cost": 30030.0, "category": "transport"}])
+    assert manager.total_budget == 50000.0
+    assert manager.remaining_budget == 19970.0
+
+
+def test_concurrent_expenses_keep_exact_totals():
+    manager = BudgetRegistry(100000.0).get("a")
+
+    def spend():
+        for _ in range(200):
+            manager.add_expense("Snack", 10.0, "food")
+
+    threads = [threading.Thread(target=spend) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    status = manager.get_status()
+    assert status["total_spent"] == 16000.0
+    assert status["remaining_budget"] == 84000.0
+    assert status["by_category"] == {"food": 16000.0}
+
+
+def test_registry_keeps_most_recent_sessions():
+    registry = BudgetRegistry(100.0, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        registry.get(session_id)
+    assert len(registry) == 2
+
+
+def test_manage_budget_tool_reports_json_status():
+    BUDGETS.reset("tool-test", 2000.0)
+    manage_budget("add_expense", item="Dinner", cost=500.0, session_id="tool-test")
+    status = json.loads(manage_budget("get_status", session_id="tool-test"))
+    assert status["remaining_budget"] == 1500.0
+    BUDGETS.drop("tool-test")
+
+
+def test_resume_restores_the_budget(agent, goal):
+    session_id = "resume-budget"
+    BUDGETS.reset(session_id)
+    for state in agent.workflow.stream(agent._initial_state(goal, session_id), agent._config(session_id),
+                                       stream_mode="values"):
+        if state.get("expenses"):
+            break  # simulate a crash after the first recorded expense
+    recorded = sum(expense["cost"] for expense in state["expenses"])
+    BUDGETS.drop(session_id)
+
+    final_state = agent.resume(session_id, verbose=False)
+    status = BUDGETS.get(session_id).get_status()
+    assert final_state["next_step"] == "finished"
+    assert status["by_category"]["transport"] >= recorded
+    assert status["total_spent"] == sum(expense["cost"] for expense in final_state["expenses"])
+    agent.forget(session_id)
@@ -0,0 +1,64 @@
+# Tests: content-addressed checkpoints, forks and resuming a session with its budget
+# tests/test_checkpoints.py
+
+import asyncio
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from framework.checkpoint_store import LATENCY_SAMPLES
+from tools.budget_checker import BUDGETS
+
+
+def _put(store, parent_config, messages):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": messages, "next_step": "plan"}
+    return store.put(parent_config, checkpoint, {"step": len(messages)}, {})
+
+
+def test_forks_keep_their_own_messages(checkpointer):
+    root = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    first = _put(checkpointer, root, ["a", "b"])
+    branch_one = _put(checkpointer, first, ["a", "b", "c"])
+    branch_two = _put(checkpointer, first, ["a", "b", "X", "Y"])
+    assert checkpointer.get_tuple(branch_one).checkpoint["channel_values"]["messages"] == ["a", "b", "c"]
+    assert checkpointer.get_tuple(branch_two).checkpoint["channel_values"]["messages"] == ["a", "b", "X", "Y"]
+    assert checkpointer.get_tuple(first).checkpoint["channel_values"]["messages"] == ["a", "b"]
+    # Shared messages are stored once
+    blobs = checkpointer.conn.execute("SELECT COUNT(*) FROM message_blobs").fetchone()[0]
+    assert blobs == 5
+
+
+def test_write_latencies_are_bounded(checkpointer):
+    config = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    for step in range(3):
+        config = _put(checkpointer, config, ["a"] * step)
+    assert checkpointer.write_latencies.maxlen == LATENCY_SAMPLES
+    assert checkpointer.latency_stats()["writes"] == 3
+
+
+def test_async_api_matches_sync(checkpointer):
+    root = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    config = _put(checkpointer, root, ["a"])
+
+    async def read():
+        latest = await checkpointer.aget_tuple(root)
+        listed = [item async for item in checkpointer.alist(root)]
+        return latest, listed
+
+    latest, listed = asyncio.run(read())
+    assert latest.config == config
+    assert [item.config for item in listed] == [config]
+
+
+def test_reused_session_id_starts_over(agent, goal):
+    first = agent.run(goal, verbose=False, session_id="again")
+    second = agent.run(goal, verbose=False, session_id="again")
+    assert len(second["messages"]) == len(first["messages"])
+    assert BUDGETS.get("again").get_status()["total_spent"] == sum(e["cost"] for e in second["expenses"])
+
+
+def test_forget_deletes_the_checkpoints(agent, goal):
+    agent.run(goal, verbose=False, session_id="gone")
+    agent.forget("gone")
+    for table in ("checkpoints", "message_blobs", "writes"):
+        assert agent.checkpointer.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
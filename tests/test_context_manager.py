@@ -0,0 +1,59 @@
+# Tests: bounded prompts with folding of old tool turns
+# tests/test_context_manager.py
+
+from framework.context_manager import ContextManager, message_tokens
+
+
+def _history(steps: int):
+    messages = [
+        {"role": "system", "content": "You are a travel planner."},
+        {"role": "user", "content": "Plan a 7-day Bali trip."},
+    ]
+    for step in range(steps):
+        messages.append({"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"c{step}", "type": "function",
+             "function": {"name": "search_internet", "arguments": f'{{"query": "bali {step}"}}'}}]})
+        messages.append({"role": "tool", "tool_call_id": f"c{step}", "name": "search_internet",
+                         "content": f"Result {step}: " + "beaches and temples " * 40})
+    return messages
+
+
+def test_short_history_is_sent_unchanged():
+    messages = _history(1)
+    prompt, stats = ContextManager(max_tokens=6000).prepare(messages)
+    assert prompt == messages
+    assert stats["turns_folded"] == 0
+
+
+def test_long_history_is_folded_under_the_budget():
+    manager = ContextManager(max_tokens=1500, keep_recent=4)
+    prompt, stats = manager.prepare(_history(30))
+    assert stats["turns_folded"] > 0
+    assert stats["prompt_tokens"] <= 1500
+    assert sum(message_tokens(m) for m in prompt) == stats["prompt_tokens"]
+    # System prompt and goal stay pinned at the front, followed by the summary
+    assert prompt[0]["role"] == "system" and prompt[1]["role"] == "user"
+    assert prompt[2]["content"].startswith("Summary of earlier steps:")
+
+
+def test_recent_tool_results_stay_with_their_calls():
+    prompt, _ = ContextManager(max_tokens=1500, keep_recent=4).prepare(_history(30))
+    call_ids = {call["id"] for m in prompt if m.get("tool_calls") for call in m["tool_calls"]}
+    results = [m for m in prompt if m["role"] == "tool"]
+    assert results
+    assert all(m["tool_call_id"] in call_ids for m in results)
+
+
+def test_repeated_messages_are_sent_once():
+    messages = _history(1) + [{"role": "user", "content": "Plan a 7-day Bali trip."}]
+    prompt, stats = ContextManager().prepare(messages)
+    assert stats["duplicates_dropped"] == 1
+    assert len(prompt) == len(messages) - 1
+
+
+def test_totals_accumulate_across_calls():
+    manager = ContextManager()
+    manager.prepare(_history(1))
+    manager.prepare(_history(2))
+    assert manager.totals["calls"] == 2
+    assert manager.totals["prompt_tokens"] <= manager.totals["raw_tokens"]
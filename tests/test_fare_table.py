@@ -0,0 +1,58 @@
+# Tests: fare table queries and the search_flights tool
+# tests/test_fare_table.py
+
+import datetime
+import json
+
+import pytest
+
+from tools.fare_table import FareTable, city_codes, parse_date_window
+from tools.flight_finder import cheapest_flight, search_flights
+
+
+def _row(origin, destination, date, fare, seats, airline="AirAsia", stops=1):
+    return {"origin": origin, "destination": destination, "date": date, "airline": airline,
+            "stops": str(stops), "fare": str(fare), "seats": str(seats)}
+
+
+FARES = FareTable([
+    _row("DEL", "DPS", "2025-07-01", 30000, 9),
+    _row("DEL", "DPS", "2025-07-02", 25000, 1),
+    _row("DEL", "DPS", "2025-07-03", 27000, 4),
+    _row("BOM", "DPS", "2025-07-02", 26000, 6, stops=0),
+    _row("DEL", "HKT", "2025-07-02", 18000, 9),
+    _row("DEL", "DPS", "2025-08-01", 20000, 9),
+])
+
+
+def test_search_is_cheapest_first_within_the_window_and_seats():
+    start, end = parse_date_window("July 2025")
+    result = FARES.search(["DEL", "BOM"], ["DPS"], start, end, num_travelers=2)
+    fares = [option["fare_per_person"] for option in result["options"]]
+    assert fares == [26000.0, 27000.0, 30000.0]  # 25,000 has one seat, 20,000 is in August
+    assert result["cheapest"]["total_cost"] == 52000.0
+    # One option per route, cheapest route first
+    assert [(o["origin"], o["fare_per_person"]) for o in result["by_route"]] == [("BOM", 26000.0), ("DEL", 27000.0)]
+
+
+def test_search_filters_stops_and_unknown_airports():
+    start = end = datetime.date(2025, 7, 2)
+    assert FARES.search(["DEL", "BOM"], ["DPS"], start, end, max_stops=0)["fares_matched"] == 1
+    assert FARES.search(["XXX"], ["DPS"], start, end)["cheapest"] is None
+
+
+def test_date_window_parsing():
+    assert parse_date_window("20 July 2025") == (datetime.date(2025, 7, 20),) * 2
+    assert parse_date_window("2025-07-20", "2025-07-25")[1] == datetime.date(2025, 7, 25)
+    assert parse_date_window("February 2024")[1] == datetime.date(2024, 2, 29)
+    with pytest.raises(ValueError):
+        parse_date_window("next week")
+    assert city_codes("Delhi, bom") == ["DEL", "BOM"]
+
+
+def test_search_flights_tool_returns_json():
+    result = json.loads(search_flights("Delhi", "Bali", "July 2025", num_travelers=2, max_results=3))
+    assert len(result["options"]) <= 3
+    assert all(option["seats_left"] >= 2 for option in result["options"])
+    assert cheapest_flight(json.dumps(result)) == result["cheapest"]
+    assert "error" in json.loads(search_flights("Delhi", "Bali", "someday"))
@@ -0,0 +1,171 @@
+# Tests: LLM gateway coalescing, retries, priorities and shared settings
+# tests/test_gateway.py
+
+import asyncio
+import threading
+
+import pytest
+
+import framework.llm_gateway as llm_gateway
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient
+from framework.llm_gateway import LLMGateway, PriorityLimiter
+
+REQUEST = {"model": "fake-model", "messages": [{"role": "user", "content": "beaches in Bali"}], "temperature": 0}
+
+
+class _Overloaded(Exception):
+    status_code = 503
+
+
+class _FlakyCompletions:
+    def __init__(self, failures: int, error: Exception):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+        self.fake = FakeLLMClient()
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return self.fake.chat.completions.create(**kwargs)
+
+
+class _FlakyClient:
+    def __init__(self, failures: int, error: Exception):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _FlakyCompletions(failures, error)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "backoff_delay", lambda attempt: 0.0)
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    upstream = FakeLLMClient(latency=0.2)
+    gateway = LLMGateway(client=upstream)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.create(dict(REQUEST)))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert upstream.call_count == 1
+    assert len({id(result) for result in results}) == 1
+    assert gateway.stats["coalesced"] == 3 and gateway.stats["upstream_calls"] == 1
+
+
+def test_sampled_requests_are_not_coalesced():
+    upstream = FakeLLMClient(latency=0.1)
+    gateway = LLMGateway(client=upstream)
+    sampled = dict(REQUEST, temperature=0.7)
+    threads = [threading.Thread(target=gateway.create, args=(dict(sampled),)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert upstream.call_count == 3 and gateway.stats["coalesced"] == 0
+
+
+def test_async_requests_coalesce_on_one_loop():
+    upstream = FakeAsyncLLMClient(latency=0.1)
+    gateway = LLMGateway(async_client=upstream)
+
+    async def burst():
+        return await asyncio.gather(*(gateway.acreate(dict(REQUEST)) for _ in range(3)))
+
+    results = asyncio.run(burst())
+    assert upstream.call_count == 1 and len({id(result) for result in results}) == 1
+
+
+def test_transient_failures_are_retried():
+    client = _FlakyClient(failures=2, error=_Overloaded("busy"))
+    gateway = LLMGateway(client=client, max_retries=3)
+    assert gateway.create(dict(REQUEST)).choices[0].message.content
+    assert client.chat.completions.calls == 3
+    assert gateway.stats["retries"] == 2 and gateway.stats["failures"] == 0
+    assert gateway.slots.active == 0
+
+
+def test_permanent_failures_and_exhausted_retries_raise():
+    client = _FlakyClient(failures=1, error=ValueError("bad request"))
+    gateway = LLMGateway(client=client, max_retries=3)
+    with pytest.raises(ValueError):
+        gateway.create(dict(REQUEST))
+    assert client.chat.completions.calls == 1
+
+    client = _FlakyClient(failures=5, error=_Overloaded("busy"))
+    gateway = LLMGateway(client=client, max_retries=2)
+    with pytest.raises(_Overloaded):
+        gateway.create(dict(REQUEST))
+    assert client.chat.completions.calls == 3 and gateway.stats["failures"] == 1
+
+
+def test_freed_slot_goes_to_the_highest_priority_waiter():
+    limiter = PriorityLimiter(1)
+    limiter.acquire()
+    order = []
+
+    def wait(priority: int, name: str):
+        limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    batch = threading.Thread(target=wait, args=(10, "batch"))
+    batch.start()
+    while limiter.queued < 1:
+        pass
+    interactive = threading.Thread(target=wait, args=(0, "interactive"))
+    interactive.start()
+    while limiter.queued < 2:
+        pass
+    limiter.release()
+    batch.join()
+    interactive.join()
+    assert order == ["interactive", "batch"]
+    assert limiter.active == 0
+
+
+def test_resize_hands_new_slots_to_waiters():
+    limiter = PriorityLimiter(1)
+    limiter.acquire()
+    entered = threading.Event()
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), entered.set()))
+    waiter.start()
+    assert not entered.wait(0.05)
+    limiter.resize(2)
+    assert entered.wait(1)
+    waiter.join()
+    assert limiter.active == 2
+
+
+def test_shared_gateway_applies_later_settings(monkeypatch):
+    gateway = LLMGateway(client=FakeLLMClient(), default_rate=None, max_retries=3, max_concurrency=16)
+    monkeypatch.setattr(llm_gateway, "_shared_gateway", gateway)
+    assert gateway.bucket("fake-model") is None
+    assert llm_gateway.shared_gateway(rate_limit=5.0, max_retries=1, max_concurrency=4) is gateway
+    assert gateway.bucket("fake-model").rate == 5.0
+    assert gateway.max_retries == 1 and gateway.slots.max_concurrency == 4
+    # Unspecified settings keep their current values
+    assert llm_gateway.shared_gateway() is gateway
+    assert gateway.default_rate == 5.0 and gateway.max_retries == 1
+
+
+def test_build_agent_retries_explicit_clients_through_a_gateway(checkpointer, goal):
+    from framework.batch_runner import build_agent
+    from framework.fake_llm import default_policy
+    failures = []
+
+    def overloaded_once(messages, tools):
+        if not failures:
+            failures.append(1)
+            raise _Overloaded("busy")
+        return default_policy(messages, tools)
+
+    upstream = FakeLLMClient(overloaded_once)
+    agent = build_agent(rate_limit=100.0, llm_client=upstream, async_llm_client=FakeAsyncLLMClient(),
+                        checkpointer=checkpointer)
+    state = agent.run(goal, verbose=False, session_id="gw-1")
+    assert state["next_step"] == "finished" and failures == [1]
+    agent.forget("gw-1")
@@ -0,0 +1,81 @@
+# Tests: local itinerary fitting against the budget and group size
+# tests/test_itinerary.py
+
+import pytest
+
+from framework.itinerary import catalog_for, parse_goal, parse_travelers, rooms_for
+from framework.itinerary_optimizer import ItineraryOptimizer
+from tools.budget_checker import BUDGETS
+
+THEMES = parse_goal("beach, culture, nature")[1]
+
+
+@pytest.mark.parametrize("budget", [30000.0, 50000.0, 80000.0, 120000.0])
+def test_itinerary_fits_the_budget(budget):
+    itinerary = ItineraryOptimizer().optimize(7, budget, THEMES)
+    assert itinerary is not None
+    assert itinerary.total_cost <= budget
+    assert all(day.hours <= 8.0 for day in itinerary.days)
+    assert sum(cost for _, cost, _ in itinerary.expense_lines()) == pytest.approx(itinerary.total_cost)
+
+
+def test_budget_too_small_for_any_lodging():
+    assert ItineraryOptimizer().optimize(7, 2000.0, THEMES) is None
+
+
+def test_more_money_never_scores_lower():
+    optimizer = ItineraryOptimizer()
+    scores = [optimizer.optimize(7, budget, THEMES).score for budget in (30000.0, 40000.0, 80000.0)]
+    assert scores == sorted(scores)
+
+
+def test_group_pays_per_traveler_and_per_room():
+    optimizer = ItineraryOptimizer()
+    solo = optimizer.optimize(5, 60000.0, THEMES, travelers=1)
+    group = optimizer.optimize(5, 60000.0, THEMES, travelers=3)
+    assert group.rooms == 2
+    assert group.lodging_cost == group.lodging.cost_per_night * group.nights * 2
+    assert group.total_cost <= 60000.0
+    assert sum(day.food_cost for day in group.days) == 3 * sum(day.food_cost for day in solo.days)
+    assert group.to_dict()["travelers"] == 3
+
+
+@pytest.mark.parametrize("goal, travelers", [
+    ("Plan a Bali trip", 1),
+    ("A trip for 2 people", 2),
+    ("Bali with four friends", 4),
+    ("We are a family of 5", 5),
+    ("Honeymoon for a couple", 2),
+    ("Solo backpacking in Ubud", 1),
+])
+def test_parse_travelers(goal, travelers):
+    assert parse_travelers(goal) == travelers
+
+
+def test_rooms_for():
+    assert [rooms_for(n) for n in (0, 1, 2, 3, 4, 5)] == [1, 1, 1, 2, 2, 3]
+
+
+@pytest.mark.parametrize("goal, catalog", [
+    ("Plan a 7-day relaxing trip to Bali", "bali"),
+    ("A week of yoga in Ubud", "bali"),
+    ("Plan a relaxing beach week under ₹80,000", "bali"),
+    ("Plan a trip in July", "bali"),
+    ("Plan a 5-day trip to Tokyo", None),
+])
+def test_catalog_for(goal, catalog):
+    assert catalog_for(goal) == catalog
+
+
+def test_agent_fits_the_itinerary_locally(agent, goal):
+    final_state = agent.run(goal, verbose=False, session_id="local")
+    itinerary = final_state["itinerary"]
+    assert itinerary["total_cost"] <= BUDGETS.get("local").total_budget
+    assert BUDGETS.get("local").get_status()["by_category"]["lodging"] > 0
+
+
+def test_goal_without_a_catalog_keeps_the_llm_plan(agent):
+    final_state = agent.run("Plan a 5-day trip to Tokyo under ₹80,000 from Delhi.", verbose=False, session_id="tokyo")
+    assert not final_state["itinerary"]
+    assert final_state["trip_plan"].startswith("Day 1:")
+    assert final_state["next_step"] == "finished"
@@ -0,0 +1,80 @@
+# Tests: knowledge-base retrieval and its saved JSON index
+# tests/test_knowledge_base.py
+
+import json
+
+from tools.knowledge_base import INDEX_FILE_NAME, KnowledgeBase, default_index_path, source_hash
+from tools.web_search import search_internet
+
+RECORDS = [
+    {"name": "Bali", "country": "Indonesia", "region": "Southeast Asia", "tags": "beach, culture",
+     "snippets": ["Seminyak and Nusa Dua have calm beaches for swimming.",
+                  "Ubud is the centre of temples, dance and crafts."]},
+    {"name": "Phuket", "country": "Thailand", "region": "Southeast Asia", "tags": ["beach"],
+     "snippets": ["Patong beach is lively at night.", "Old Phuket Town has Sino-Portuguese shophouses."]},
+]
+
+
+def _write(tmp_path, records):
+    path = tmp_path / "destinations.json"
+    path.write_text(json.dumps({"destinations": records}), encoding="utf-8")
+    return str(path)
+
+
+def test_destination_name_boosts_its_snippets():
+    knowledge_base = KnowledgeBase()
+    assert knowledge_base.add_many(RECORDS) == 4
+    results = knowledge_base.search("beaches in Bali", k=2)
+    assert results[0]["destination"] == "Bali"
+    assert "beaches" in results[0]["text"]
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_misspelled_terms_match_within_one_edit():
+    knowledge_base = KnowledgeBase()
+    knowledge_base.add_many(RECORDS)
+    results = knowledge_base.search("shophuses", k=1)
+    assert results and "shophouses" in results[0]["text"]
+    assert knowledge_base.search("zzzz") == []
+
+
+def test_posting_lists_are_capped():
+    knowledge_base = KnowledgeBase(max_postings=1)
+    knowledge_base.add_many(RECORDS)
+    knowledge_base.build()
+    assert all(len(postings) <= 1 for postings in knowledge_base.postings.values())
+
+
+def test_saved_index_is_reused_while_the_data_is_unchanged(tmp_path):
+    data = _write(tmp_path, RECORDS)
+    index = str(tmp_path / "index.json")
+    built = KnowledgeBase.open([data], index)
+    reused = KnowledgeBase.open([data], index)
+    assert reused.signature == built.signature
+    assert reused.search("temples in Ubud") == built.search("temples in Ubud")
+
+    # Changed data: the stored hash no longer matches, so the index is rebuilt
+    _write(tmp_path, RECORDS[:1])
+    rebuilt = KnowledgeBase.open([data], index)
+    assert rebuilt.signature != built.signature
+    assert len(rebuilt) == 2
+    assert KnowledgeBase.load(index).signature == rebuilt.signature
+
+
+def test_unreadable_index_is_ignored(tmp_path):
+    index = tmp_path / "index.json"
+    index.write_text("not json", encoding="utf-8")
+    assert KnowledgeBase.load(str(index)) is None
+    assert len(KnowledgeBase.open([_write(tmp_path, RECORDS)], str(index))) == 4
+
+
+def test_index_lives_next_to_the_data(tmp_path):
+    data = _write(tmp_path, RECORDS)
+    assert default_index_path([data]) == str(tmp_path / INDEX_FILE_NAME)
+    assert default_index_path([]) is None
+    assert source_hash([data]) == source_hash([data])
+
+
+def test_search_internet_answers_from_the_knowledge_base():
+    result = search_internet("temples in Ubud")
+    assert "Ubud" in result
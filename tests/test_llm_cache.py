@@ -0,0 +1,88 @@
+# Tests: completion cache hits, misses and what is cacheable
+# tests/test_llm_cache.py
+
+import asyncio
+import sqlite3
+import time
+
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient
+from framework.llm_cache import CompletionCache, completion_key, with_completion_cache
+
+REQUEST = {"model": "fake-model", "temperature": 0, "messages": [{"role": "user", "content": "Beaches in Bali?"}]}
+
+
+def test_repeated_request_is_served_from_the_cache():
+    llm = FakeLLMClient()
+    cache = CompletionCache()
+    client = with_completion_cache(llm, cache)
+    first = client.chat.completions.create(**REQUEST)
+    second = client.chat.completions.create(**REQUEST)
+    assert llm.call_count == 1
+    assert second is first
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_key_ignores_whitespace_and_tool_call_ids():
+    a = dict(REQUEST, messages=[{"role": "user", "content": "  Beaches in Bali?  "}])
+    assert completion_key(a) == completion_key(REQUEST)
+    calls = lambda call_id: [{"role": "assistant", "content": None, "tool_calls": [
+        {"id": call_id, "type": "function", "function": {"name": "search_internet", "arguments": "{}"}}]}]
+    assert completion_key(dict(REQUEST, messages=calls("a"))) == completion_key(dict(REQUEST, messages=calls("b")))
+
+
+def test_only_explicit_zero_temperature_is_cached():
+    llm = FakeLLMClient()
+    cache = CompletionCache()
+    client = with_completion_cache(llm, cache)
+    default_temperature = {k: v for k, v in REQUEST.items() if k != "temperature"}
+    for request in (default_temperature, dict(REQUEST, temperature=0.7), dict(REQUEST, stream=True)):
+        assert not cache.is_cacheable(request)
+    client.chat.completions.create(**default_temperature)
+    client.chat.completions.create(**default_temperature)
+    assert llm.call_count == 2
+    assert cache.stats["skipped"] == 2
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite")
+    client = with_completion_cache(FakeLLMClient(), CompletionCache(db_path=db_path))
+    stored = client.chat.completions.create(**REQUEST)
+
+    llm = FakeLLMClient()
+    cache = CompletionCache(db_path=db_path)
+    loaded = with_completion_cache(llm, cache).chat.completions.create(**REQUEST)
+    assert llm.call_count == 0
+    assert cache.stats["disk_hits"] == 1
+    assert loaded.choices[0].message.content == stored.choices[0].message.content
+
+
+def test_expired_entries_are_misses():
+    llm = FakeLLMClient()
+    client = with_completion_cache(llm, CompletionCache(ttl=0.0))
+    client.chat.completions.create(**REQUEST)
+    time.sleep(0.01)
+    client.chat.completions.create(**REQUEST)
+    assert llm.call_count == 2
+
+
+def test_other_tables_in_the_database_are_left_alone(tmp_path):
+    db_path = str(tmp_path / "shared.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE completions (id INTEGER)")
+    conn.execute("INSERT INTO completions VALUES (1)")
+    conn.commit()
+    CompletionCache(db_path=db_path)
+    assert conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0] == 1
+    conn.close()
+
+
+def test_async_client_shares_the_cache():
+    llm = FakeAsyncLLMClient()
+    client = with_completion_cache(llm, CompletionCache(), is_async=True)
+
+    async def twice():
+        return [await client.chat.completions.create(**REQUEST) for _ in range(2)]
+
+    first, second = asyncio.run(twice())
+    assert second is first
+    assert llm.call_count == 1
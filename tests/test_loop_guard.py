@@ -0,0 +1,103 @@
+# Tests: loop guard stop reasons, alone and inside the graph
+# tests/test_loop_guard.py
+
+import time
+
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient, default_policy
+from framework.langgraph_loop import BaliTripAgent
+from framework.loop_guard import LoopGuard, LoopLimits
+
+
+def _search_forever(messages, tools):
+    # A planner that never stops researching the same thing
+    if tools and any(t["function"]["name"] == "search_flights" for t in tools):
+        return {"tool_calls": [("search_internet", {"query": "bali beaches"})]}
+    return default_policy(messages, tools)
+
+
+def _agent(policy=None, latency=0.0, checkpointer=None, **limits) -> BaliTripAgent:
+    return BaliTripAgent(llm_client=FakeLLMClient(policy, latency), async_llm_client=FakeAsyncLLMClient(policy, latency),
+                         loop_limits=LoopLimits(**limits), checkpointer=checkpointer, on_token=lambda token: None)
+
+
+def _search_update(query: str = "bali beaches"):
+    return {"next_step": "planning", "messages": [{"role": "assistant", "content": None, "tool_calls": [
+        {"id": query, "type": "function",
+         "function": {"name": "search_internet", "arguments": f'{{"query": "{query}"}}'}}]}]}
+
+
+def test_call_and_token_budgets():
+    guard = LoopGuard(LoopLimits(max_llm_calls=3, max_tokens=1000))
+    assert guard.check({"session_id": "a", "llm_calls": 2, "llm_tokens": 10}) is None
+    assert guard.check({"session_id": "a", "llm_calls": 2}, {"llm_calls": 1}).startswith("LLM call budget")
+    assert guard.check({"session_id": "a", "llm_tokens": 1000}).startswith("token budget")
+
+
+def test_time_budget_counts_only_time_spent_in_nodes():
+    guard = LoopGuard(LoopLimits(max_seconds=60))
+    assert guard.check({"session_id": "a", "elapsed_s": 59.0}) is None
+    assert guard.check({"session_id": "a", "elapsed_s": 59.0}, {"elapsed_s": 1.5}).startswith("time budget")
+
+
+def test_repeated_tool_call_ignores_call_ids():
+    guard = LoopGuard(LoopLimits(max_repeated_tool_calls=2))
+    for step in range(3):
+        update = _search_update()
+        update["messages"][0]["tool_calls"][0]["id"] = f"call-{step}"
+        update["messages"].append({"role": "tool", "content": f"step {step}"})  # keeps it from stalling
+        guard.observe("a", "plan", update)
+    assert guard.check({"session_id": "a"}).startswith("repeated tool call search_internet")
+    assert guard.check({"session_id": "b"}) is None
+
+
+def test_identical_steps_count_as_stalled():
+    guard = LoopGuard(LoopLimits(max_stalled_steps=2, max_repeated_tool_calls=100))
+    for _ in range(3):
+        guard.observe("a", "plan", _search_update())
+    assert guard.check({"session_id": "a"}) == "no progress for 2 steps"
+    guard.reset("a")
+    assert guard.check({"session_id": "a"}) is None
+
+
+def test_repeated_search_stops_the_graph(goal):
+    agent = _agent(_search_forever, max_llm_calls=None, max_stalled_steps=100)
+    final_state = agent.run(goal, verbose=False, session_id="repeat")
+    assert final_state["next_step"] == "finished"
+    assert final_state["stop_reason"].startswith("repeated tool call search_internet")
+    assert "planning stopped early" in final_state["messages"][-1]["content"]
+
+
+def test_call_budget_stops_the_graph(goal):
+    agent = _agent(_search_forever, max_llm_calls=3, max_repeated_tool_calls=100, max_stalled_steps=100)
+    final_state = agent.run(goal, verbose=False, session_id="budget")
+    assert final_state["stop_reason"] == "LLM call budget reached (3/3)"
+    assert final_state["llm_calls"] == 3
+
+
+def test_normal_run_has_no_stop_reason(goal):
+    final_state = _agent().run(goal, verbose=False, session_id="normal")
+    assert final_state["next_step"] == "finished"
+    assert final_state["stop_reason"] == ""
+
+
+def test_slow_nodes_stop_on_the_time_budget(goal):
+    agent = _agent(_search_forever, latency=0.05, max_seconds=0.12, max_llm_calls=None,
+                   max_repeated_tool_calls=100, max_stalled_steps=100)
+    final_state = agent.run(goal, verbose=False, session_id="slow")
+    assert final_state["stop_reason"] == "time budget reached (0.12s)"
+    assert final_state["elapsed_s"] >= 0.12
+
+
+def test_resuming_an_old_checkpoint_does_not_count_the_downtime(goal, checkpointer):
+    agent = _agent(latency=0.02, max_seconds=1.0, checkpointer=checkpointer)
+    session_id = "old"
+    for state in agent.workflow.stream(agent._initial_state(goal, session_id), agent._config(session_id),
+                                       stream_mode="values"):
+        if state.get("trip_plan"):
+            break  # crash once the plan is written
+    time.sleep(1.1)  # the session sits longer than its whole time budget
+
+    final_state = agent.resume(session_id, verbose=False)
+    assert final_state["next_step"] == "finished"
+    assert final_state["stop_reason"] == ""
+    assert 0 < final_state["elapsed_s"] < 1.0
@@ -0,0 +1,80 @@
+# Tests: chunked memory records behind BM25 and vector retrieval
+# tests/test_memory_store.py
+
+from framework.memory_store import BM25Index, MemoryIndex, tokenize
+from agents.memory_agent import MemoryAgent
+
+
+def _state(session_id, *contents, goal="Plan a 7-day Bali trip", trip_plan=""):
+    return {"session_id": session_id, "goal": goal, "trip_plan": trip_plan,
+            "messages": [{"role": "tool", "name": "search_internet", "content": c} for c in contents]}
+
+
+def test_tokenize_drops_stopwords_and_keeps_rupees():
+    assert tokenize("The hotel in Ubud costs ₹4000") == ["hotel", "ubud", "costs", "₹4000"]
+
+
+def test_search_finds_the_matching_record():
+    index = MemoryIndex()
+    index.add_state(_state("a", "Snorkeling at Amed costs ₹900.", "Ubud yoga retreat for a week."))
+    index.add_state(_state("b", "Uluwatu temple kecak dance at sunset."))
+    results = index.search("kecak dance uluwatu", k=1)
+    assert results[0]["session_id"] == "b"
+    assert results[0]["kind"] == "search_internet"
+    assert index.search("the and of") == []
+
+
+def test_only_new_messages_are_indexed():
+    index = MemoryIndex()
+    first = _state("a", "Seminyak beach clubs.")
+    index.add_state(first)
+    size = len(index)
+    second = _state("a", "Seminyak beach clubs.", "Nusa Penida day trip.")
+    index.add_state(second)
+    assert len(index) == size + 1
+    # Same goal again is not a new record either
+    assert sum(1 for r in index.records.values() if r.kind == "goal") == 1
+
+
+def test_reused_session_id_reindexes_from_the_start():
+    index = MemoryIndex()
+    index.add_state(_state("a", "one", "two", "three"))
+    index.add_state(_state("a", "Canggu surf camp."))
+    assert index.search("canggu surf")[0]["text"] == "Canggu surf camp."
+
+
+def test_forget_and_session_cap_release_records():
+    index = MemoryIndex(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        index.add_state(_state(session_id, f"Notes for {session_id} about Jimbaran seafood."))
+    assert index.evicted_sessions == 1
+    assert {r["session_id"] for r in index.search("jimbaran seafood", k=10)} == {"b", "c"}
+    removed = index.forget("b")
+    assert removed > 0
+    assert {r["session_id"] for r in index.search("jimbaran seafood", k=10)} == {"c"}
+    assert all(len(postings) for postings in index.keywords.postings.values())
+
+
+def test_posting_scan_is_capped_newest_first():
+    bm25 = BM25Index(max_postings=2)
+    for doc_id in range(5):
+        bm25.add(doc_id, ["temple", f"doc{doc_id}"])
+    assert {doc_id for _, doc_id in bm25.search(["temple"], k=5)} == {3, 4}
+
+
+def test_vector_and_hybrid_modes():
+    index = MemoryIndex(use_vectors=True)
+    index.add_state(_state("a", "Mount Batur sunrise trek with breakfast."))
+    index.add_state(_state("b", "Spa and massage in Seminyak."))
+    for mode in ("vector", "hybrid"):
+        assert index.search("batur sunrise trek", k=1, mode=mode)[0]["session_id"] == "a"
+
+
+def test_memory_agent_forgets_a_session():
+    agent = MemoryAgent()
+    agent.process_memory(_state("a", "Tirta Empul water temple.", trip_plan="Day 1: Tirta Empul"))
+    assert agent.retrieve_info("tirta empul")
+    assert agent.retrieve_info()[0]["session_id"] == "a"
+    agent.forget("a")
+    assert agent.retrieve_info("tirta empul") == []
+    assert agent.retrieve_info() == []
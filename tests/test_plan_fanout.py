@@ -0,0 +1,128 @@
+# Tests: plan scoring, candidate selection and the speculative plan fan-out
+# tests/test_plan_fanout.py
+
+import asyncio
+import threading
+import time
+
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient, default_policy
+from framework.langgraph_loop import BaliTripAgent
+from framework.plan_fanout import Candidate, PlanFanout, PlanScorer, _decide, emphases, research_done
+
+GOAL = "Plan a 7-day relaxing trip to Bali with beach, culture, nature under ₹80,000 from Delhi."
+REQUEST = {
+    "model": "fake-model",
+    "messages": [{"role": "user", "content": GOAL}],
+    "tools": [{"type": "function", "function": {"name": "search_flights", "parameters": {}}}],
+    "tool_choice": "auto",
+    "temperature": 0,
+}
+FULL_PLAN = (
+    "Day 1: Seminyak beach. Day 2: Ubud temple and culture. Day 3: Tegalalang rice terraces nature walk. "
+    "Day 4: Uluwatu temple. Day 5: Nusa Dua beach. Day 6: Mount Batur trek. Day 7: Depart. Total: ₹60,000"
+)
+
+
+def _candidate(index: int, status: str, score: float = None) -> Candidate:
+    candidate = Candidate(index, None if index == 0 else f"theme{index}")
+    candidate.status = status
+    candidate.score = score
+    return candidate
+
+
+def test_scorer_rewards_themes_days_and_budget():
+    scorer = PlanScorer()
+    assert scorer.score("", GOAL) == 0.0
+    full = scorer.score(FULL_PLAN, GOAL, remaining_budget=70000)
+    assert full > scorer.score("Day 1: Seminyak beach.", GOAL, remaining_budget=70000)
+    assert full > scorer.score(FULL_PLAN, GOAL, remaining_budget=30000)
+
+
+def test_emphases_start_with_the_plain_request_and_the_goals_themes():
+    themes = emphases(GOAL, 4)
+    assert themes[0] is None and len(themes) == 4
+    assert set(themes[1:]) == {"beach", "culture", "nature"}
+    assert emphases(GOAL, 0) == [None]
+
+
+def test_research_done_needs_every_research_tool():
+    searched = [{"role": "tool", "name": "search_internet", "content": "..."}]
+    assert not research_done(searched)
+    assert research_done(searched + [{"role": "tool", "name": "search_flights", "content": "..."}])
+
+
+def test_decide():
+    # A tool-call reply to the plain request wins over any plan
+    assert _decide([_candidate(0, "tool_calls"), _candidate(1, "plan", 0.9)], False, 0.8).index == 0
+    # A plan over the threshold wins before the rest settle
+    assert _decide([_candidate(0, "pending"), _candidate(1, "plan", 0.85)], False, 0.8).index == 1
+    # Weaker plans wait for everyone, then the best wins (the earlier one on ties)
+    weak = [_candidate(0, "plan", 0.5), _candidate(1, "plan", 0.6), _candidate(2, "pending")]
+    assert _decide(weak, False, 0.8) is None
+    weak[2].status, weak[2].score = "plan", 0.6
+    assert _decide(weak, True, 0.8).index == 1
+    assert _decide([_candidate(0, "failed"), _candidate(1, "failed")], True, 0.8) is None
+
+
+def _plain_asks_for_tools(release: threading.Event):
+    def policy(messages, tools):
+        if tools:
+            return {"tool_calls": [("search_flights", {"origin": "Delhi", "destination": "Bali", "date": "20 July 2025"})]}
+        release.wait(2)
+        return {"content": FULL_PLAN}
+    return policy
+
+
+def test_plain_tool_calls_cancel_the_emphasis_streams():
+    release = threading.Event()
+    client = FakeLLMClient(_plain_asks_for_tools(release))
+    fanout = PlanFanout(k=3)
+    winner, candidates = fanout.run(client.chat.completions.create, REQUEST, GOAL, 70000)
+    release.set()
+    assert winner is candidates[0] and winner.status == "tool_calls"
+    assert [c.status for c in candidates[1:]] == ["cancelled", "cancelled"]
+
+
+def test_a_good_emphasis_plan_wins_over_a_weak_plain_one():
+    def policy(messages, tools):
+        return {"content": "Day 1: beach." if tools else FULL_PLAN}
+
+    fanout = PlanFanout(k=3, threshold=0.75)
+    winner, candidates = fanout.run(FakeLLMClient(policy).chat.completions.create, REQUEST, GOAL, 70000)
+    assert winner.emphasis is not None and winner.score >= 0.75
+    assert all(c.sent for c in candidates)
+
+
+def test_async_fanout_cancels_losers_in_flight():
+    def policy(messages, tools):
+        return {"content": FULL_PLAN if tools else "Day 1: beach."}
+
+    client = FakeAsyncLLMClient(policy)
+
+    async def create(**kwargs):
+        if not kwargs.get("tools"):
+            await asyncio.sleep(5)  # the emphases are still in flight when the plain plan arrives
+        return await client.chat.completions.create(**kwargs)
+
+    started = time.monotonic()
+    winner, candidates = asyncio.run(PlanFanout(k=3, threshold=0.75).arun(create, REQUEST, GOAL, 70000))
+    assert time.monotonic() - started < 1
+    assert winner is candidates[0] and winner.response is not None
+    assert [c.status for c in candidates[1:]] == ["cancelled", "cancelled"]
+
+
+def test_agent_fans_out_only_at_the_final_plan_step(checkpointer, goal):
+    requests = []
+
+    def policy(messages, tools):
+        requests.append(messages[-1].get("content", "") if isinstance(messages[-1], dict) else "")
+        return default_policy(messages, tools)
+
+    agent = BaliTripAgent(llm_client=FakeLLMClient(policy), async_llm_client=FakeAsyncLLMClient(policy),
+                          checkpointer=checkpointer, plan_fanout=3, on_token=lambda token: None)
+    state = agent.run(goal, verbose=False, session_id="fanout-1")
+    assert state["next_step"] == "finished" and state["trip_plan"]
+    # The research step is a single request; only the plan step adds the two emphases
+    assert not requests[0].startswith("Write the complete")
+    assert sum(1 for content in requests if content.startswith("Write the complete")) == 2
+    agent.forget("fanout-1")
@@ -0,0 +1,128 @@
+# Tests: the long-lived trip service over one shared agent
+# tests/test_service.py
+
+import threading
+import time
+
+import pytest
+
+from framework.cli_interface import ServiceBusy, TripService, session_token
+from framework.fake_llm import FakeAsyncLLMClient, FakeLLMClient
+from framework.langgraph_loop import BaliTripAgent
+from tools.budget_checker import BUDGETS
+
+
+@pytest.fixture
+def service(agent):
+    service = TripService(agent, max_active=4, max_queued=4, sweep_interval=3600).start()
+    yield service
+    service.stop()
+
+
+def _slow_service(checkpointer) -> TripService:
+    # One slot, no queue, and every async LLM call takes 0.3 s
+    agent = BaliTripAgent(llm_client=FakeLLMClient(), async_llm_client=FakeAsyncLLMClient(latency=0.3),
+                          checkpointer=checkpointer, on_token=session_token)
+    return TripService(agent, max_active=1, max_queued=0, sweep_interval=3600).start()
+
+
+@pytest.fixture
+def slow_service(checkpointer):
+    service = _slow_service(checkpointer)
+    yield service
+    service.stop()
+
+
+def test_sessions_run_concurrently_with_their_own_budgets(service, goal):
+    events = []
+    futures = [service.submit(goal, events.append, session_id=f"s{i}", budget=budget)
+               for i, budget in enumerate((80000.0, 120000.0))]
+    summaries = [future.result(timeout=30) for future in futures]
+    assert [s["status"] for s in summaries] == ["done", "done"]
+    assert [s["budget"]["total_budget"] for s in summaries] == [80000.0, 120000.0]
+    assert all(s["budget"]["total_spent"] <= s["budget"]["total_budget"] for s in summaries)
+    kinds = {event["event"] for event in events}
+    assert {"started", "step", "plan", "done"} <= kinds
+    assert service.report()["completed"] == 2
+
+
+def test_running_session_and_full_queue_are_refused(slow_service, goal):
+    future = slow_service.submit(goal, lambda event: None, session_id="busy")
+    with pytest.raises(ServiceBusy):
+        slow_service.submit(goal, lambda event: None, session_id="busy")
+    with pytest.raises(ServiceBusy):
+        slow_service.submit(goal, lambda event: None, session_id="other")
+    assert slow_service.report()["rejected"] == 2
+    assert future.result(timeout=30)["status"] == "done"
+    # Once finished, the id can be reused and starts over
+    assert slow_service.submit(goal, lambda event: None, session_id="busy").result(timeout=30)["status"] == "done"
+
+
+def test_close_releases_the_session(service, goal):
+    service.submit(goal, lambda event: None, session_id="closing").result(timeout=30)
+    assert service.status("closing")["status"] == "done"
+    assert service.close("closing")
+    assert service.status("closing") is None
+    assert not service.close("closing")
+    assert BUDGETS.find("closing") is None
+    assert service.agent.checkpointer.get_tuple({"configurable": {"thread_id": "closing"}}) is None
+
+
+def _wait_until(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_close_of_a_running_session_releases_it_after_the_run_unwinds(slow_service, goal):
+    started = threading.Event()
+    future = slow_service.submit(goal, lambda event: event["event"] == "started" and started.set(), session_id="live")
+    assert started.wait(10) and _wait_until(lambda: BUDGETS.find("live") is not None)
+    assert slow_service.close("live")
+    assert future.cancelled()
+    assert _wait_until(lambda: slow_service.report()["cancelled"] == 1)
+    time.sleep(0.4)  # longer than one LLM call: nothing may recreate the session's state
+    assert BUDGETS.find("live") is None
+    assert slow_service.agent.checkpointer.get_tuple({"configurable": {"thread_id": "live"}}) is None
+    assert "live" not in slow_service.agent.loop_guard._sessions
+
+
+def test_close_before_the_task_starts_frees_its_queue_place(slow_service, goal):
+    # Keep the service loop busy so the submitted task cannot start before close()
+    slow_service.loop.call_soon_threadsafe(time.sleep, 0.3)
+    future = slow_service.submit(goal, lambda event: None, session_id="never")
+    assert slow_service.close("never")
+    assert future.cancelled()
+    assert slow_service.report()["queued"] == 0
+    # The queue place is free again
+    assert slow_service.submit(goal, lambda event: None, session_id="next").result(timeout=30)["status"] == "done"
+    assert BUDGETS.find("never") is None
+
+
+def test_summary_of_a_released_session_has_no_budget(service, goal):
+    service.submit(goal, lambda event: None, session_id="dropped").result(timeout=30)
+    BUDGETS.drop("dropped")
+    assert service.status("dropped")["budget"] is None
+    assert BUDGETS.find("dropped") is None
+
+
+def test_idle_sessions_are_evicted(service, goal):
+    for i in range(3):
+        service.submit(goal, lambda event: None, session_id=f"idle{i}").result(timeout=30)
+    service.max_sessions = 2
+    assert service.evict_idle() == 1
+    assert service.status("idle0") is None
+    assert service.evict_idle(now=service.sessions["idle2"].last_active + service.idle_timeout + 1) == 2
+    assert service.report()["evicted"] == 3
+
+
+def test_stop_cancels_running_sessions(checkpointer, goal):
+    service = _slow_service(checkpointer)
+    future = service.submit(goal, lambda event: None, session_id="cancelled")
+    service.stop()
+    assert future.cancelled()
+    assert service.sessions["cancelled"].status == "cancelled"
+    assert service.report()["cancelled"] == 1
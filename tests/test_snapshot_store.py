@@ -0,0 +1,76 @@
+# Tests: delta snapshots over a per-session message log
+# tests/test_snapshot_store.py
+
+from framework.snapshot_store import SnapshotStore
+
+
+def _step(state, text, **fields):
+    state = dict(state, **fields)
+    state["messages"] = state["messages"] + [{"role": "assistant", "content": text}]
+    return state
+
+
+def _session(store, session_id, steps):
+    state = {"session_id": session_id, "goal": "Bali", "trip_plan": "", "next_step": "plan", "error": "",
+             "messages": []}
+    for step in range(steps):
+        state = _step(state, f"step {step}", trip_plan=f"plan v{step // 2}")
+        store.add(state)
+    return state
+
+
+def test_materialize_rebuilds_every_step():
+    store = SnapshotStore()
+    final = _session(store, "a", 5)
+    assert store.materialize("a") == {**{k: final[k] for k in ("goal", "trip_plan", "next_step", "error")},
+                                       "session_id": "a", "messages": final["messages"]}
+    second = store.materialize("a", 1)
+    assert second["trip_plan"] == "plan v0"
+    assert [m["content"] for m in second["messages"]] == ["step 0", "step 1"]
+    assert store.materialize("a", 9) is None and store.materialize("missing") is None
+
+
+def test_snapshots_store_only_changes():
+    store = SnapshotStore()
+    _session(store, "a", 4)
+    changes = [snapshot.changes for snapshot in store.sessions["a"].snapshots]
+    assert changes[1] is None  # same plan as step 0
+    assert changes[2] == {"trip_plan": "plan v1"}
+
+
+def test_stored_history_is_isolated_from_the_live_state():
+    store = SnapshotStore()
+    state = _session(store, "a", 2)
+    state["messages"][0]["content"] = "mutated"
+    assert store.materialize("a")["messages"][0]["content"] == "step 0"
+
+
+def test_retention_trims_the_message_log():
+    store = SnapshotStore(max_snapshots=3)
+    _session(store, "a", 10)
+    history = store.sessions["a"]
+    assert len(history.snapshots) == 3
+    assert history.message_base == 7
+    assert len(history.messages) == 3
+    oldest = store.materialize("a", 0)
+    assert oldest["trip_plan"] == "plan v3"  # folded deltas keep the oldest snapshot complete
+    assert [m["content"] for m in oldest["messages"]] == ["step 7"]
+    assert store.evicted_snapshots == 7
+
+
+def test_session_cap_and_drop():
+    store = SnapshotStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        _session(store, session_id, 1)
+    assert list(store.sessions) == ["b", "c"]
+    assert store.evicted_sessions == 1
+    store.drop("b")
+    assert [state["session_id"] for state in store.recent()] == ["c"]
+
+
+def test_reused_session_id_starts_a_fresh_history():
+    store = SnapshotStore()
+    _session(store, "a", 4)
+    _session(store, "a", 1)
+    assert len(store.sessions["a"].snapshots) == 1
+    assert [m["content"] for m in store.materialize("a")["messages"]] == ["step 0"]
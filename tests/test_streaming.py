@@ -0,0 +1,93 @@
+# Tests: assembling streamed chunks and starting tool calls before the stream ends
+# tests/test_streaming.py
+
+import asyncio
+import json
+
+from framework.fake_llm import (FakeAsyncLLMClient, FakeLLMClient, FakeMessage, FakeResponse, FakeToolCall, FakeUsage,
+                                response_chunks)
+from framework.langgraph_loop import BaliTripAgent
+from framework.streaming import StreamAssembler, astream_completion, stream_completion
+from tools.tool_executor import ToolExecutor
+
+TOOLS_REQUEST = {"model": "fake-model", "messages": [{"role": "user", "content": "Plan Bali"}]}
+
+
+def _response(content=None, tool_calls=None):
+    return FakeResponse(FakeMessage(content, tool_calls), FakeUsage(10, 5))
+
+
+def test_content_is_rebuilt_and_streamed_token_by_token():
+    tokens = []
+    assembler = StreamAssembler(on_token=tokens.append)
+    for chunk in response_chunks(_response("Day 1: Seminyak beach. Day 2: Ubud.")):
+        assembler.feed(chunk)
+    message = assembler.finish()
+    assert message.content == "Day 1: Seminyak beach. Day 2: Ubud."
+    assert "".join(tokens) == message.content
+    assert len(tokens) > 1
+    assert message.tool_calls is None
+    assert assembler.ttft_ms is not None
+
+
+def test_each_tool_call_is_handed_over_as_soon_as_it_is_complete():
+    calls = [FakeToolCall("c1", "search_internet", {"query": "ubud temples"}),
+             FakeToolCall("c2", "manage_budget", {"action": "get_status"})]
+    completed = []
+    assembler = StreamAssembler(on_tool_call=lambda call: completed.append(call.id))
+    chunks = response_chunks(_response(tool_calls=calls), piece_chars=5)
+    second_header = next(i for i, c in enumerate(chunks) if c.choices[0].delta.tool_calls
+                         and c.choices[0].delta.tool_calls[0].index == 1)
+    for chunk in chunks[:second_header + 1]:
+        assembler.feed(chunk)
+    assert completed == ["c1"]  # before the stream ends
+    for chunk in chunks[second_header + 1:]:
+        assembler.feed(chunk)
+    message = assembler.finish()
+    assert completed == ["c1", "c2"]
+    assert [json.loads(c.function.arguments) for c in message.tool_calls] == [
+        {"query": "ubud temples"}, {"action": "get_status"}]
+
+
+def test_usage_only_chunks_are_ignored():
+    class UsageChunk:
+        choices = []
+
+    assembler = StreamAssembler()
+    assembler.feed(UsageChunk())
+    assert assembler.chunks == 0
+    assert assembler.finish().content is None
+
+
+def _research_policy(messages, tools):
+    return {"tool_calls": [("search_internet", {"query": "bali beaches"}),
+                           ("search_internet", {"query": "ubud culture"})]}
+
+
+def test_stream_completion_runs_the_tools():
+    message, results = stream_completion(FakeLLMClient(_research_policy), TOOLS_REQUEST, ToolExecutor(),
+                                         {"session_id": "s"}, on_token=None)
+    assert [call.function.name for call in message.tool_calls] == ["search_internet"] * 2
+    assert [tool_call.id for tool_call, _, _ in results] == [call.id for call in message.tool_calls]
+    assert all(response for _, _, response in results)
+
+
+def test_async_stream_matches_sync():
+    sync_message, sync_results = stream_completion(FakeLLMClient(_research_policy), TOOLS_REQUEST, ToolExecutor(),
+                                                   {"session_id": "s"}, on_token=None)
+    async_message, async_results = asyncio.run(astream_completion(
+        FakeAsyncLLMClient(_research_policy), TOOLS_REQUEST, ToolExecutor(), {"session_id": "s"}, on_token=None))
+    assert [r for _, _, r in async_results] == [r for _, _, r in sync_results]
+    assert [c.function.arguments for c in async_message.tool_calls] == \
+        [c.function.arguments for c in sync_message.tool_calls]
+
+
+def test_streamed_run_matches_the_blocking_run(goal):
+    tokens = []
+    streamed = BaliTripAgent(llm_client=FakeLLMClient(), async_llm_client=FakeAsyncLLMClient(), stream=True,
+                             on_token=tokens.append).run(goal, verbose=False, session_id="streamed")
+    blocking = BaliTripAgent(llm_client=FakeLLMClient(), async_llm_client=FakeAsyncLLMClient(),
+                             on_token=None).run(goal, verbose=False, session_id="blocking")
+    assert streamed["trip_plan"] == blocking["trip_plan"]
+    assert len(streamed["messages"]) == len(blocking["messages"])
+    assert tokens
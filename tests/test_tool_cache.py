@@ -0,0 +1,68 @@
+# Tests: tool result cache hits, misses and coalescing
+# tests/test_tool_cache.py
+
+import threading
+import time
+
+from tools.tool_cache import ToolCache
+
+
+def _counting_tool(delay: float = 0.0):
+    calls = []
+
+    def search_internet(query: str, max_results: int = 3) -> str:
+        calls.append(query)
+        time.sleep(delay)
+        return f"results for {query}"
+    return search_internet, calls
+
+
+def test_tool_cache_normalizes_arguments():
+    func, calls = _counting_tool()
+    cache = ToolCache(func, ttl=60, maxsize=8)
+    assert cache("Bali  Beaches") == cache("bali beaches", max_results=3)
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_concurrent_identical_calls_run_the_tool_once():
+    func, calls = _counting_tool(delay=0.2)
+    cache = ToolCache(func, ttl=60, maxsize=8)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache("ubud temples"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ["results for ubud temples"] * 4
+    assert cache.stats["coalesced"] == 3
+
+
+def test_follower_stops_waiting_for_a_hung_call():
+    func, calls = _counting_tool(delay=0.5)
+    cache = ToolCache(func, ttl=60, maxsize=8, wait_timeout=0.05)
+    leader = threading.Thread(target=cache, args=("slow query",))
+    leader.start()
+    time.sleep(0.02)
+    started = time.perf_counter()
+    assert cache("slow query") == "results for slow query"
+    leader.join()
+    assert cache.stats["wait_timeouts"] == 1
+    assert len(calls) == 2
+    assert time.perf_counter() - started < 0.9
+
+
+def test_search_tools_wait_as_long_as_their_call_timeout():
+    from tools.tool_registry import TOOL_REGISTRY
+    for name in ("search_internet", "search_flights"):
+        spec = TOOL_REGISTRY.get(name)
+        assert spec.func.cache.wait_timeout == spec.timeout
+
+
+def test_persisted_results_survive_a_new_cache(tmp_path):
+    path = str(tmp_path / "tools.sqlite")
+    func, calls = _counting_tool()
+    ToolCache(func, ttl=60, maxsize=8, persist_path=path)("kuta surf")
+    assert ToolCache(func, ttl=60, maxsize=8, persist_path=path)("Kuta Surf") == "results for kuta surf"
+    assert len(calls) == 1
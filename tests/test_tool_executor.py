@@ -0,0 +1,104 @@
+# Tests: concurrent tool dispatch with per-session serial lanes
+# tests/test_tool_executor.py
+
+import asyncio
+import threading
+import time
+
+from framework.fake_llm import FakeToolCall
+from tools.tool_executor import ToolExecutor
+from tools.tool_registry import ToolRegistry
+
+
+def _registry(log):
+    registry = ToolRegistry()
+    active = {"serial": 0}
+    lock = threading.Lock()
+
+    def record(name: str, delay: float) -> str:
+        with lock:
+            active["serial"] += 1
+            log.append(("start", name, active["serial"]))
+        time.sleep(delay)
+        with lock:
+            active["serial"] -= 1
+        return name
+
+    def slow_serial(tag: str, session_id: str = None) -> str:
+        return record(tag, 0.05)
+
+    def lookup(tag: str) -> str:
+        time.sleep(0.05)
+        return f"looked up {tag}"
+
+    def hang(tag: str) -> str:
+        time.sleep(0.3)
+        return record(tag, 0.0)
+
+    properties = {"tag": {"type": "string"}}
+    registry.register(slow_serial, "serial tool", properties, ["tag"], serial=True, context_args=["session_id"])
+    registry.register(hang, "serial tool that outlives its timeout", properties, ["tag"], serial=True, timeout=0.1)
+    registry.register(lookup, "parallel tool", properties, ["tag"])
+    return registry
+
+
+def _calls(*pairs):
+    return [FakeToolCall(f"call_{i}", name, {"tag": tag}) for i, (name, tag) in enumerate(pairs)]
+
+
+def test_results_keep_call_order_and_serial_calls_never_overlap():
+    log = []
+    executor = ToolExecutor(_registry(log))
+    calls = _calls(("slow_serial", "a"), ("lookup", "x"), ("slow_serial", "b"), ("lookup", "y"), ("slow_serial", "c"))
+    results = executor.run_tool_calls(calls)
+    assert [response for _, _, response in results] == ["a", "looked up x", "b", "looked up y", "c"]
+    assert [entry[1] for entry in log] == ["a", "b", "c"]
+    assert all(depth == 1 for _, _, depth in log)
+
+
+def test_timed_out_serial_call_does_not_overlap_the_next():
+    log = []
+    executor = ToolExecutor(_registry(log))
+    results = executor.run_tool_calls(_calls(("hang", "first"), ("slow_serial", "second")))
+    assert "timed out" in results[0][2]
+    assert results[1][2] == "second"
+    # The hung call finished in its worker before the next serial call started
+    assert [entry[1] for entry in log] == ["first", "second"]
+
+
+def test_invalid_arguments_still_get_a_result():
+    executor = ToolExecutor(_registry([]))
+    bad = FakeToolCall("call_0", "lookup", {"tag": "x"})
+    bad.function.arguments = "{not json"
+    results = executor.run_tool_calls([bad])
+    assert results[0][2].startswith("Error:")
+
+
+def test_a_hung_serial_call_only_delays_its_own_session():
+    log = []
+    executor = ToolExecutor(_registry(log))
+    hung = threading.Thread(target=executor.run_tool_calls, args=(_calls(("hang", "stuck")), {"session_id": "a"}))
+    hung.start()
+    time.sleep(0.02)
+    started = time.perf_counter()
+    results = executor.run_tool_calls(_calls(("slow_serial", "other")), {"session_id": "b"})
+    assert results[0][2] == "other"
+    assert time.perf_counter() - started < 0.25
+    hung.join()
+
+
+def test_idle_lanes_are_released():
+    executor = ToolExecutor(_registry([]))
+    for session_id in ("a", "b", "c"):
+        executor.run_tool_calls(_calls(("slow_serial", session_id)), {"session_id": session_id})
+    time.sleep(0.01)
+    assert executor.lanes == {}
+
+
+def test_async_execution_keeps_order():
+    log = []
+    executor = ToolExecutor(_registry(log))
+    calls = _calls(("slow_serial", "a"), ("lookup", "x"), ("slow_serial", "b"))
+    results = asyncio.run(executor.arun_tool_calls(calls, {"session_id": "s"}))
+    assert [response for _, _, response in results] == ["a", "looked up x", "b"]
+    assert [entry[1] for entry in log] == ["a", "b"]
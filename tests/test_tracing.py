@@ -0,0 +1,160 @@
+# Tests: spans, metrics and the Prometheus and OTLP/JSON sinks
+# tests/test_tracing.py
+
+import json
+import threading
+
+import pytest
+
+from framework.fake_llm import FakeLLMClient
+from framework.tracing import (TRACER, MetricsAggregator, OTelJSONSink, PrometheusSink, Tracer, current_span,
+                               trace_id_for, with_tracing)
+
+
+class ListSink:
+    def __init__(self):
+        self.spans = []
+
+    def record(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def traced():
+    """The process-wide tracer with a list sink, removed afterwards."""
+    sink = TRACER.add_sink(ListSink())
+    yield sink
+    TRACER.remove_sink(sink)
+
+
+def test_without_sinks_spans_are_free():
+    tracer = Tracer()
+    with tracer.span("plan", "node") as span:
+        span.set("ignored", 1)
+        assert current_span() is span
+    assert not tracer.enabled
+
+
+def test_children_link_to_their_parent_and_session_trace():
+    tracer = Tracer()
+    sink = tracer.add_sink(ListSink())
+    with tracer.span("plan", "node", session_id="s1") as parent:
+        with tracer.span("search_internet", "tool") as child:
+            child.set("tool.query", "ubud")
+    assert [s.name for s in sink.spans] == ["search_internet", "plan"]
+    assert child.parent_id == parent.span_id
+    assert child.trace_id == parent.trace_id == trace_id_for("s1")
+    assert parent.attributes["session.id"] == "s1"
+
+
+def test_errors_are_recorded_and_reraised():
+    tracer = Tracer()
+    sink = tracer.add_sink(ListSink())
+    with pytest.raises(ValueError):
+        with tracer.span("execute", "node"):
+            raise ValueError("boom")
+    assert sink.spans[0].error == "ValueError: boom"
+
+
+def test_metrics_aggregate_per_kind_and_name():
+    tracer = Tracer()
+    metrics = tracer.add_sink(MetricsAggregator())
+    for hit in (False, True):
+        with tracer.span("chat.completions", "llm") as span:
+            span.set("llm.prompt_tokens", 10)
+            span.set("cache.hit", hit)
+    with tracer.span("plan", "node"):
+        pass
+    (kind, name, llm), = metrics.hot_paths("llm")
+    assert (kind, name) == ("llm", "chat.completions")
+    assert llm["count"] == 2 and llm["prompt_tokens"] == 20 and llm["cache_hits"] == 1
+    assert "chat.completions" in metrics.report()
+
+
+def test_prometheus_exposition_is_written_atomically(tmp_path):
+    path = tmp_path / "metrics.prom"
+    tracer = Tracer()
+    sink = tracer.add_sink(PrometheusSink(str(path)))
+    with tracer.span('say "hi"', "tool"):
+        pass
+    tracer.flush()
+    text = path.read_text(encoding="utf-8")
+    assert '# TYPE agent_span_total counter' in text
+    assert 'agent_span_total{kind="tool",name="say \\"hi\\""} 1' in text
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+
+def test_otel_sink_batches_at_the_buffer_limit(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer()
+    sink = tracer.add_sink(OTelJSONSink(str(path), max_buffer=3, flush_interval=None))
+    for i in range(4):
+        with tracer.span(f"step{i}", "node", session_id="s"):
+            pass
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1 and len(sink.spans) == 1
+    sink.close()
+    batches = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    spans = [s for b in batches for s in b["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert [s["name"] for s in spans] == ["step0", "step1", "step2", "step3"]
+    assert spans[0]["traceId"] == trace_id_for("s")
+
+
+def test_otel_sink_flushes_on_its_interval(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer()
+    sink = tracer.add_sink(OTelJSONSink(str(path), flush_interval=0.05))
+    with tracer.span("plan", "node"):
+        pass
+    threading.Event().wait(0.2)
+    assert path.exists() and not sink.spans
+    sink.close()
+
+
+def test_failed_writes_are_dropped_and_counted(tmp_path):
+    tracer = Tracer()
+    sink = tracer.add_sink(OTelJSONSink(str(tmp_path), max_buffer=2, flush_interval=None))  # a directory
+    for _ in range(2):
+        with tracer.span("plan", "node"):
+            pass
+    assert sink.dropped == 2 and sink.spans == []
+
+
+def test_concurrent_flushes_write_whole_lines(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer()
+    sink = tracer.add_sink(OTelJSONSink(str(path), max_buffer=5, flush_interval=None))
+
+    def work():
+        for _ in range(50):
+            with tracer.span("tool", "tool"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+    batches = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert sum(len(b["resourceSpans"][0]["scopeSpans"][0]["spans"]) for b in batches) == 200
+
+
+def test_llm_calls_record_token_usage(traced):
+    client = with_tracing(FakeLLMClient(), "planner")
+    client.chat.completions.create(model="fake-model", messages=[{"role": "user", "content": "Bali?"}])
+    span, = traced.spans
+    assert span.kind == "llm" and span.attributes["agent"] == "planner"
+    assert span.attributes["llm.prompt_tokens"] > 0
+    assert client.call_count == 1  # other attributes reach the wrapped client
+
+
+def test_graph_nodes_and_tools_form_one_trace(agent, goal, traced):
+    agent.run(goal, verbose=False, session_id="traced")
+    nodes = {s.name: s for s in traced.spans if s.kind == "node"}
+    assert {"plan", "execute", "finalize", "memorize"} <= set(nodes)
+    tools = [s for s in traced.spans if s.kind == "tool"]
+    assert tools
+    node_ids = {s.span_id for s in traced.spans if s.kind == "node"}
+    assert all(s.parent_id in node_ids for s in tools)
+    assert {s.trace_id for s in traced.spans} == {trace_id_for("traced")}
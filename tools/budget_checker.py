@@ -1,45 +1,145 @@
 # Tool: Check budget constraints
 # tools/budget_tool.py
 
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_BUDGET = 80000.0
+DEFAULT_SESSION = "default"
+
+# Keyword -> category, used when the caller does not give a category
+_CATEGORY_KEYWORDS = (
+    ("flight", "transport"), ("transfer", "transport"), ("driver", "transport"), ("taxi", "transport"),
+    ("scooter", "transport"), ("hotel", "lodging"), ("villa", "lodging"), ("resort", "lodging"),
+    ("accommodation", "lodging"), ("stay", "lodging"), ("food", "food"), ("meal", "food"),
+    ("dinner", "food"), ("lunch", "food"), ("breakfast", "food"), ("tour", "activities"),
+    ("trek", "activities"), ("ticket", "activities"), ("temple", "activities"), ("activit", "activities"),
+)
+
+
+def infer_category(item: str) -> str:
+    lowered = item.lower()
+    for keyword, category in _CATEGORY_KEYWORDS:
+        if keyword in lowered:
+            return category
+    return "other"
+
+
 class BudgetManager:
+    """
+    Budget for one session. Updates hold a lock, and totals (overall and per
+    category) are kept incrementally, so status checks are O(categories)
+    no matter how many expenses were added.
+    """
+
     def __init__(self, initial_budget: float):
         self.total_budget = initial_budget
         self.remaining_budget = initial_budget
         self.expenses = []
+        self.category_totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
 
-    def add_expense(self, item: str, cost: float) -> str:
-        if cost <= self.remaining_budget:
-            self.remaining_budget -= cost
-            self.expenses.append({"item": item, "cost": cost})
-            return f"Added expense: {item} - ₹{cost:.2f}. Remaining budget: ₹{self.remaining_budget:.2f}."
-        else:
-            return f"Cannot add expense '{item}' (₹{cost:.2f}). Exceeds remaining budget of ₹{self.remaining_budget:.2f}."
-
-    def get_status(self) -> str:
-        total_spent = self.total_budget - self.remaining_budget
-        return (
-            f"Total Budget: ₹{self.total_budget:.2f}\n"
-            f"Total Spent: ₹{total_spent:.2f}\n"
-            f"Remaining Budget: ₹{self.remaining_budget:.2f}\n"
-            f"Current Expenses: {self.expenses}"
-        )
-
-# Initialize a global budget manager for simplicity in this example
-# In a real app, this might be passed through the graph state or managed differently
-BUDGET_MANAGER = BudgetManager(80000.0)
-
-def manage_budget(action: str, item: str = None, cost: float = None) -> str:
+    def add_expense(self, item: str, cost: float, category: Optional[str] = None) -> str:
+        category = category or infer_category(item)
+        with self._lock:
+            if cost <= self.remaining_budget:
+                self.remaining_budget -= cost
+                self.expenses.append({"item": item, "cost": cost, "category": category})
+                self.category_totals[category] = self.category_totals.get(category, 0.0) + cost
+                return f"Added expense: {item} - ₹{cost:.2f}. Remaining budget: ₹{self.remaining_budget:.2f}."
+            else:
+                return f"Cannot add expense '{item}' (₹{cost:.2f}). Exceeds remaining budget of ₹{self.remaining_budget:.2f}."
+
+    def get_status(self) -> Dict[str, Any]:
+        """Structured summary; the expense list itself is not repeated."""
+        with self._lock:
+            return {
+                "total_budget": round(self.total_budget, 2),
+                "total_spent": round(self.total_budget - self.remaining_budget, 2),
+                "remaining_budget": round(self.remaining_budget, 2),
+                "expense_count": len(self.expenses),
+                "by_category": {name: round(total, 2) for name, total in self.category_totals.items()},
+            }
+
+
+class BudgetRegistry:
+    """Thread-safe map of session id -> BudgetManager, keeping the most recent max_sessions."""
+
+    def __init__(self, initial_budget: float = DEFAULT_BUDGET, max_sessions: int = 10000):
+        self.initial_budget = initial_budget
+        self.max_sessions = max_sessions
+        self._budgets: "OrderedDict[str, BudgetManager]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str = DEFAULT_SESSION) -> BudgetManager:
+        with self._lock:
+            manager = self._budgets.get(session_id)
+            if manager is None:
+                manager = self._budgets[session_id] = BudgetManager(self.initial_budget)
+                while len(self._budgets) > self.max_sessions:
+                    self._budgets.popitem(last=False)
+            else:
+                self._budgets.move_to_end(session_id)
+            return manager
+
+    def find(self, session_id: str) -> Optional[BudgetManager]:
+        """The session's budget if it has one; unlike get(), never creates one."""
+        with self._lock:
+            return self._budgets.get(session_id)
+
+    def reset(self, session_id: str, initial_budget: Optional[float] = None) -> BudgetManager:
+        """Starts the session with a fresh budget (the configured default unless given)."""
+        manager = BudgetManager(self.initial_budget if initial_budget is None else initial_budget)
+        with self._lock:
+            self._budgets[session_id] = manager
+            self._budgets.move_to_end(session_id)
+            while len(self._budgets) > self.max_sessions:
+                self._budgets.popitem(last=False)
+        return manager
+
+    def restore(self, session_id: str, initial_budget: Optional[float], expenses) -> BudgetManager:
+        """Rebuilds a session's budget from a recorded total and expense log, e.g. a checkpoint."""
+        manager = self.reset(session_id, initial_budget)
+        for expense in expenses:
+            manager.add_expense(expense["item"], expense["cost"], expense.get("category"))
+        return manager
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._budgets.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._budgets)
+
+
+# Budgets are scoped per session; tools receive the session id from the agents
+BUDGETS = BudgetRegistry(DEFAULT_BUDGET)
+
+def format_status(status: Dict[str, Any]) -> str:
+    categories = ", ".join(f"{name}: ₹{total:.2f}" for name, total in status["by_category"].items()) or "none"
+    return (
+        f"Total Budget: ₹{status['total_budget']:.2f}\n"
+        f"Total Spent: ₹{status['total_spent']:.2f}\n"
+        f"Remaining Budget: ₹{status['remaining_budget']:.2f}\n"
+        f"Expenses: {status['expense_count']} ({categories})"
+    )
+
+def manage_budget(action: str, item: str = None, cost: float = None, category: str = None,
+                  session_id: str = DEFAULT_SESSION) -> str:
     """
-    Manages the trip budget.
-    Actions: 'add_expense', 'get_status'.
+    Manages the trip budget of one session.
+    Actions: 'add_expense', 'get_status' (returns the status summary as JSON).
     """
     print(f"\n[TOOL CALL] Budget action: {action}")
+    budget = BUDGETS.get(session_id)
     if action == "add_expense":
         if item and cost is not None:
-            return BUDGET_MANAGER.add_expense(item, cost)
+            return budget.add_expense(item, float(cost), category)
         else:
             return "Error: 'item' and 'cost' are required for 'add_expense'."
     elif action == "get_status":
-        return BUDGET_MANAGER.get_status()
+        return json.dumps(budget.get_status(), ensure_ascii=False)
     else:
-        return "Invalid budget action. Use 'add_expense' or 'get_status'."
\ No newline at end of file
+        return "Invalid budget action. Use 'add_expense' or 'get_status'."
@@ -0,0 +1,166 @@
+# Local fare table: vectorized date-window and multi-route flight search over NumPy arrays
+# tools/fare_table.py
+
+import csv
+import datetime
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+FARES_PATH = os.getenv("FARES_PATH", os.path.join(DATA_DIR, "fares.csv"))
+
+# City name or alias -> airport code used in the fare table
+CITY_CODES = {
+    "delhi": "DEL", "new delhi": "DEL", "mumbai": "BOM", "bombay": "BOM", "bengaluru": "BLR",
+    "bangalore": "BLR", "chennai": "MAA", "kolkata": "CCU", "bali": "DPS", "denpasar": "DPS",
+    "phuket": "HKT", "singapore": "SIN",
+}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%B %d %Y", "%b %d, %Y", "%d/%m/%Y")
+_MONTH_FORMATS = ("%B %Y", "%b %Y", "%Y-%m")
+
+
+def city_codes(cities: str) -> List[str]:
+    """Comma-separated city names or airport codes -> airport codes."""
+    codes = []
+    for city in cities.split(","):
+        city = city.strip()
+        if city:
+            codes.append(CITY_CODES.get(city.lower(), city.upper()))
+    return codes
+
+
+def parse_date_window(date: str, date_to: Optional[str] = None) -> Tuple[datetime.date, datetime.date]:
+    """
+    (first, last) departure day for a date ("2025-07-20", "20 July 2025") or a
+    whole month ("July 2025"). `date_to` extends the window to that day.
+    Raises ValueError for anything else.
+    """
+    text = " ".join(date.replace(",", ", ").split()).strip()
+    start = end = None
+    for fmt in _DATE_FORMATS:
+        try:
+            start = end = datetime.datetime.strptime(text, fmt).date()
+            break
+        except ValueError:
+            continue
+    if start is None:
+        for fmt in _MONTH_FORMATS:
+            try:
+                start = datetime.datetime.strptime(text, fmt).date()
+                next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+                end = next_month - datetime.timedelta(days=1)
+                break
+            except ValueError:
+                continue
+    if start is None:
+        raise ValueError(f"Unrecognized date '{date}'. Use YYYY-MM-DD, '20 July 2025' or 'July 2025'.")
+    if date_to:
+        end = parse_date_window(date_to)[1]
+        if end < start:
+            raise ValueError(f"date_to '{date_to}' is before date '{date}'.")
+    return start, end
+
+
+class FareTable:
+    """
+    Round-trip fares per person, one row per route, departure day and airline,
+    held as parallel NumPy arrays. A query is a single boolean mask over all
+    rows (routes, window, seats) followed by an argsort of the survivors, so
+    a month across every route costs about the same as one date.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, str]]):
+        rows = list(rows)
+        self.airports = sorted({r["origin"] for r in rows} | {r["destination"] for r in rows})
+        self._airport_ids = {code: i for i, code in enumerate(self.airports)}
+        self.airlines = sorted({r["airline"] for r in rows})
+        airline_ids = {name: i for i, name in enumerate(self.airlines)}
+
+        self.origin = np.array([self._airport_ids[r["origin"]] for r in rows], dtype=np.int16)
+        self.destination = np.array([self._airport_ids[r["destination"]] for r in rows], dtype=np.int16)
+        self.date = np.array([r["date"] for r in rows], dtype="datetime64[D]")
+        self.airline = np.array([airline_ids[r["airline"]] for r in rows], dtype=np.int16)
+        self.stops = np.array([int(r["stops"]) for r in rows], dtype=np.int8)
+        self.fare = np.array([float(r["fare"]) for r in rows], dtype=np.float64)
+        self.seats = np.array([int(r["seats"]) for r in rows], dtype=np.int16)
+        # One integer per route, for grouping the cheapest fare by route
+        self.route = self.origin.astype(np.int32) * len(self.airports) + self.destination
+
+    def __len__(self) -> int:
+        return len(self.fare)
+
+    @classmethod
+    def load_csv(cls, path: str) -> "FareTable":
+        """Loads a CSV with columns origin, destination, date, airline, stops, fare, seats."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    def _option(self, row: int, num_travelers: int) -> Dict[str, Any]:
+        fare = float(self.fare[row])
+        return {
+            "origin": self.airports[self.origin[row]],
+            "destination": self.airports[self.destination[row]],
+            "date": str(self.date[row]),
+            "airline": self.airlines[self.airline[row]],
+            "stops": int(self.stops[row]),
+            "fare_per_person": fare,
+            "total_cost": fare * num_travelers,
+            "seats_left": int(self.seats[row]),
+        }
+
+    def search(self, origins: List[str], destinations: List[str], start: datetime.date, end: datetime.date,
+               num_travelers: int = 1, max_results: int = 5, max_stops: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Cheapest departures for every origin/destination pair in the window with
+        at least `num_travelers` seats: the overall best `max_results` options
+        and the cheapest option per route.
+        """
+        origin_ids = [self._airport_ids[code] for code in origins if code in self._airport_ids]
+        destination_ids = [self._airport_ids[code] for code in destinations if code in self._airport_ids]
+        mask = (
+            np.isin(self.origin, origin_ids)
+            & np.isin(self.destination, destination_ids)
+            & (self.date >= np.datetime64(start, "D"))
+            & (self.date <= np.datetime64(end, "D"))
+            & (self.seats >= num_travelers)
+        )
+        if max_stops is not None:
+            mask &= self.stops <= max_stops
+        rows = np.flatnonzero(mask)
+        # Cheapest first; ties go to the earlier departure
+        rows = rows[np.lexsort((self.date[rows], self.fare[rows]))]
+        # The first row of each route in fare order is that route's cheapest
+        _, first = np.unique(self.route[rows], return_index=True)
+        by_route = rows[np.sort(first)]
+        options = [self._option(row, num_travelers) for row in rows[:max_results]]
+        return {
+            "origins": origins,
+            "destinations": destinations,
+            "date_from": start.isoformat(),
+            "date_to": end.isoformat(),
+            "num_travelers": num_travelers,
+            "currency": "INR",
+            "fare_basis": "round trip per person, returning 7 days after departure",
+            "fares_matched": int(rows.size),
+            "cheapest": options[0] if options else None,
+            "options": options,
+            "by_route": [self._option(row, num_travelers) for row in by_route],
+        }
+
+
+_fare_table: Optional[FareTable] = None
+_lock = threading.Lock()
+
+
+def fare_table() -> FareTable:
+    """The process-wide fare table, loaded once on first use."""
+    global _fare_table
+    if _fare_table is None:
+        with _lock:
+            if _fare_table is None:
+                _fare_table = FareTable.load_csv(FARES_PATH)
+    return _fare_table
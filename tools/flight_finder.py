@@ -1,25 +1,41 @@
-# Tool: Dummy flight lookup tool
+# Tool: Flight search over the local fare table
 # tools/flight_tool.py
 
-def search_flights(origin: str, destination: str, date: str, num_travelers: int = 1) -> str:
+import json
+from typing import Any, Dict, Optional
+
+from tools.tool_cache import cached_tool
+from tools.fare_table import city_codes, fare_table, parse_date_window
+
+FLIGHT_SEARCH_TIMEOUT = 15.0  # seconds; the registry's call timeout and the cache's coalescing wait
+
+
+# Fares move during the day, so flight results are kept for 15 minutes
+@cached_tool(ttl=15 * 60, wait_timeout=FLIGHT_SEARCH_TIMEOUT)
+def search_flights(origin: str, destination: str, date: str, num_travelers: int = 1,
+                   date_to: str = None, max_results: int = 5) -> str:
     """
-    Simulates searching for flights. In a real application, this would call a flight API.
-    Assumes fixed dummy prices and availability.
+    Searches the fare table for every origin/destination pair (comma-separated
+    cities) departing on `date`, in the month `date` names, or from `date` to
+    `date_to`. Returns JSON with the cheapest option overall, the best options
+    and the cheapest per route. In a real application, this would call a flight API.
     """
-    print(f"\n[TOOL CALL] Searching flights: {origin} to {destination} on {date} for {num_travelers} people.")
-    
-    # Dummy flight data
-    if origin.lower() == "delhi" and destination.lower() == "bali":
-        if "july 2025" in date.lower() or "august 2025" in date.lower():
-            # Example: Round trip for one person
-            base_price = 30000.0  # INR
-            total_price = base_price * num_travelers
-            return_date = "7 days after " + date
-            return (
-                f"Found flights from {origin} to {destination} on {date} (returning {return_date}) "
-                f"for {num_travelers} person(s). Estimated total cost: ₹{total_price:.2f}. "
-                "Availability: Good. (Dummy Data)"
-            )
-        else:
-            return f"No direct flights found for {date}. (Dummy Data)"
-    return f"No flights found for { requested route {origin} to {destination}. (Dummy Data)"
\ No newline at end of file
+    window = f"{date} to {date_to}" if date_to else date
+    print(f"\n[TOOL CALL] Searching flights: {origin} to {destination} on {window} for {num_travelers} people.")
+    try:
+        start, end = parse_date_window(date, date_to)
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+    result = fare_table().search(city_codes(origin), city_codes(destination), start, end,
+                                 max(1, num_travelers), max(1, max_results))
+    if result["cheapest"] is None:
+        result["error"] = f"No flights with {num_travelers} seat(s) found for {origin} to {destination} on {window}."
+    return json.dumps(result, ensure_ascii=False)
+
+
+def cheapest_flight(tool_response: str) -> Optional[Dict[str, Any]]:
+    """The cheapest option from a search_flights result, or None (no flights, errors, timeouts)."""
+    try:
+        return json.loads(tool_response).get("cheapest")
+    except (TypeError, ValueError, AttributeError):
+        return None
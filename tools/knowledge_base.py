@@ -0,0 +1,325 @@
+# Local destination knowledge base: ranked snippet search over JSON/CSV data files
+# tools/knowledge_base.py
+
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from framework.memory_store import tokenize
+
+INDEX_VERSION = 2
+INDEX_FILE_NAME = ".knowledge_base.index.json"
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+# os.pathsep-separated data files or directories, and where the built index is saved
+# (by default next to the first data file; "none" disables saving)
+KNOWLEDGE_BASE_DATA = os.getenv("KNOWLEDGE_BASE_DATA", os.path.join(DATA_DIR, "destinations.json"))
+KNOWLEDGE_BASE_INDEX = os.getenv("KNOWLEDGE_BASE_INDEX", "")
+
+FUZZY_WEIGHT = 0.7  # a misspelled query term counts less than an exact one
+
+
+def stem(token: str) -> str:
+    """Light suffix stripping, enough to match plurals and verb forms ("beaches", "relaxing", "temples")."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("es") and token[:-2].endswith(("ch", "sh", "x", "ss", "z")):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    for suffix in ("ation", "ing", "ed", "al", "ly"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            # "snorkelling" -> "snorkel", "surfing" -> "surf"
+            if suffix in ("ing", "ed") and token[-1] == token[-2] and token[-1] not in "sz":
+                token = token[:-1]
+            break
+    if token.endswith("e") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(token) for token in tokenize(text)]
+
+
+def _deletes(term: str) -> List[str]:
+    return [term] + [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True when a and b differ by at most one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    return shorter[i:] == longer[i + 1:]
+
+
+class Snippet:
+    __slots__ = ("destination", "country", "region", "text")
+
+    def __init__(self, destination: str, country: str, region: str, text: str):
+        self.destination = destination
+        self.country = country
+        self.region = region
+        self.text = text
+
+    def to_dict(self, score: float = None) -> Dict[str, Any]:
+        result = {"destination": self.destination, "country": self.country, "region": self.region, "text": self.text}
+        if score is not None:
+            result["score"] = round(score, 4)
+        return result
+
+
+class KnowledgeBase:
+    """
+    Snippets about destinations behind an inverted index. Each snippet is
+    indexed with its destination's name, region and country, so "beaches in Bali"
+    finds Bali's beach snippets. BM25 weights are computed once in build() and
+    each posting list is stored sorted by weight and cut at `max_postings`, so
+    a query touches at most max_postings entries per term however large the
+    corpus grows. Unknown query terms are matched to indexed terms within one
+    edit through a deletion index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_postings: int = 256):
+        self.k1 = k1
+        self.b = b
+        self.max_postings = max_postings
+        self.snippets: List[Snippet] = []
+        self.destinations: Dict[str, Dict[str, Any]] = {}
+        self._doc_terms: List[Dict[str, int]] = []  # snippet -> {term: tf}, kept so later adds can rebuild
+        self.postings: Dict[str, List[Tuple[float, int]]] = {}  # term -> [(weight, snippet id)], best first
+        self.fuzzy: Dict[str, List[str]] = {}  # deletion key -> terms
+        self.signature: Optional[str] = None  # content hash of the source files the index was built from
+        self._built = True
+
+    def __len__(self) -> int:
+        return len(self.snippets)
+
+    def add(self, record: Dict[str, Any]) -> int:
+        """Adds one destination record (name, country, region, tags, snippets); returns the snippets added."""
+        name = record["name"]
+        country, region = record.get("country", ""), record.get("region", "")
+        tags = record.get("tags", [])
+        if isinstance(tags, str):
+            tags = [tag for tag in tags.replace(";", ",").split(",") if tag.strip()]
+        entry = self.destinations.setdefault(name, {"name": name, "country": country, "region": region, "tags": []})
+        entry["tags"] = list(dict.fromkeys(entry["tags"] + [tag.strip() for tag in tags]))
+        # Tags are kept on the destination but not indexed: they would outrank the snippets' own text
+        context = analyze(" ".join([name, region, country]))
+        added = 0
+        for text in record.get("snippets", []):
+            counts: Dict[str, int] = {}
+            for term in context + analyze(text):
+                counts[term] = counts.get(term, 0) + 1
+            self.snippets.append(Snippet(name, country, region, text))
+            self._doc_terms.append(counts)
+            added += 1
+        self._built = False
+        return added
+
+    def add_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Bulk loader; the index is rebuilt once, on the next build() or search()."""
+        return sum(self.add(record) for record in records)
+
+    def load_file(self, path: str) -> int:
+        """Loads a JSON file ({"destinations": [...]} or a list) or a CSV with one snippet per row."""
+        if path.endswith(".csv"):
+            records: Dict[str, Dict[str, Any]] = {}
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    record = records.setdefault(row["name"], {
+                        "name": row["name"], "country": row.get("country", ""),
+                        "region": row.get("region", ""), "tags": row.get("tags", ""), "snippets": [],
+                    })
+                    record["snippets"].append(row["snippet"])
+            return self.add_many(records.values())
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return self.add_many(data["destinations"] if isinstance(data, dict) else data)
+
+    def load_paths(self, paths: Iterable[str]) -> int:
+        return sum(self.load_file(path) for path in data_files(paths))
+
+    def build(self) -> None:
+        """Computes BM25 weights and the fuzzy index. Called automatically before searching."""
+        if self._built:
+            return
+        n_docs = len(self._doc_terms)
+        lengths = [sum(counts.values()) for counts in self._doc_terms]
+        avg_length = (sum(lengths) / n_docs) if n_docs else 1.0
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, counts in enumerate(self._doc_terms):
+            for term, tf in counts.items():
+                postings[term].append((doc_id, tf))
+
+        k1, b = self.k1, self.b
+        self.postings = {}
+        for term, docs in postings.items():
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            weighted = [
+                (idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc_id] / avg_length)), doc_id)
+                for doc_id, tf in docs
+            ]
+            self.postings[term] = heapq.nlargest(self.max_postings, weighted)
+
+        fuzzy: Dict[str, List[str]] = defaultdict(list)
+        for term in self.postings:
+            if len(term) >= 4 and term.isalpha():
+                for key in _deletes(term):
+                    fuzzy[key].append(term)
+        self.fuzzy = dict(fuzzy)
+        self._built = True
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < 4 or not term.isalpha():
+            return []
+        candidates = {match for key in _deletes(term) for match in self.fuzzy.get(key, ())}
+        return [(match, FUZZY_WEIGHT) for match in candidates if _within_one_edit(term, match)]
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Top-k snippets for the query, best first, as dicts with a score."""
+        self.build()
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(analyze(query)):
+            for match, weight in self._expand(term):
+                for impact, doc_id in self.postings[match]:
+                    scores[doc_id] += weight * impact
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [self.snippets[doc_id].to_dict(score) for doc_id, score in best]
+
+    def save(self, path: str) -> None:
+        """Writes the built index as plain JSON; the file is replaced atomically."""
+        self.build()
+        payload = {
+            "version": INDEX_VERSION,
+            "signature": self.signature,
+            "params": [self.k1, self.b, self.max_postings],
+            "snippets": [[s.destination, s.country, s.region, s.text] for s in self.snippets],
+            "destinations": self.destinations,
+            "doc_terms": self._doc_terms,
+            "postings": self.postings,
+            "fuzzy": self.fuzzy,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["KnowledgeBase"]:
+        """Reads an index written by save(), or None when it is missing, unreadable or from another version."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != INDEX_VERSION:
+                return None
+            knowledge_base = cls(*payload["params"])
+            knowledge_base.snippets = [Snippet(*fields) for fields in payload["snippets"]]
+            knowledge_base.destinations = payload["destinations"]
+            knowledge_base._doc_terms = payload["doc_terms"]
+            knowledge_base.postings = {term: [tuple(p) for p in ps] for term, ps in payload["postings"].items()}
+            knowledge_base.fuzzy = payload["fuzzy"]
+            knowledge_base.signature = payload["signature"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        return knowledge_base
+
+    @classmethod
+    def open(cls, paths: Iterable[str], index_path: Optional[str] = None) -> "KnowledgeBase":
+        """
+        Warm start: reuses the saved index at `index_path` while its recorded
+        content hash matches the data files, and otherwise loads the files,
+        builds the index and saves it.
+        """
+        files = data_files(paths)
+        signature = source_hash(files)
+        if index_path:
+            cached = cls.load(index_path)
+            if cached is not None and cached.signature == signature:
+                return cached
+        knowledge_base = cls()
+        for path in files:
+            knowledge_base.load_file(path)
+        knowledge_base.build()
+        knowledge_base.signature = signature
+        if index_path:
+            try:
+                knowledge_base.save(index_path)
+            except OSError as e:
+                print(f"[KNOWLEDGE BASE] Could not save the index to {index_path}: {e}")
+        return knowledge_base
+
+
+def source_hash(files: Iterable[str]) -> str:
+    """SHA-256 over the names and contents of the data files, in order."""
+    digest = hashlib.sha256(str(INDEX_VERSION).encode())
+    for path in files:
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def default_index_path(files: List[str]) -> Optional[str]:
+    """The index lives next to the data it was built from, not in the working directory."""
+    return os.path.join(os.path.dirname(files[0]), INDEX_FILE_NAME) if files else None
+
+
+def data_files(paths: Iterable[str]) -> List[str]:
+    """Expands directories into their .json and .csv files, in a stable order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith((".json", ".csv"))
+            )
+        elif path:
+            files.append(path)
+    return [os.path.abspath(path) for path in files]
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_lock = threading.Lock()
+
+
+def knowledge_base() -> KnowledgeBase:
+    """The process-wide knowledge base, loaded (or built) once on first use."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                started = time.perf_counter()
+                paths = [path for path in KNOWLEDGE_BASE_DATA.split(os.pathsep) if path]
+                index_path = KNOWLEDGE_BASE_INDEX or default_index_path(data_files(paths))
+                if index_path and index_path.lower() == "none":
+                    index_path = None
+                _knowledge_base = KnowledgeBase.open(paths, index_path)
+                print(f"[KNOWLEDGE BASE] {len(_knowledge_base.destinations)} destinations, "
+                      f"{len(_knowledge_base)} snippets ready in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return _knowledge_base
@@ -0,0 +1,202 @@
+# Tool: memoizing result cache for the search tools
+# tools/tool_cache.py
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from framework.tracing import current_span
+
+# Shared by every cached tool; set TOOL_CACHE_DB to keep results across runs
+TOOL_CACHE_DB = os.getenv("TOOL_CACHE_DB")
+
+# name -> ToolCache, for reporting
+TOOL_CACHES: Dict[str, "ToolCache"] = {}
+
+# How long a call waits for an identical in-flight call before running the tool itself;
+# tools pass their own call timeout through cached_tool(wait_timeout=...)
+DEFAULT_WAIT_TIMEOUT = 30.0
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class _Pending:
+    """An in-flight computation that concurrent identical calls wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class ToolCache:
+    """
+    LRU + TTL cache for one tool function, with single-flight deduplication of
+    concurrent identical calls and optional SQLite persistence.
+    Arguments are bound to the signature (so defaults count) and strings are
+    lowercased and whitespace-collapsed before hashing. A call coalesced onto
+    an in-flight one waits at most `wait_timeout` seconds, then calls the
+    tool directly, so a hung leader cannot hang its followers.
+    """
+
+    def __init__(self, func: Callable[..., Any], ttl: float, maxsize: int, persist_path: Optional[str] = None,
+                 wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+        self.func = func
+        self.wait_timeout = wait_timeout
+        self.name = func.__name__
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.signature = inspect.signature(func)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (created, result, latency)
+        self._inflight: Dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "wait_timeouts": 0, "saved_seconds": 0.0}
+
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results "
+                "(tool TEXT, key TEXT, created REAL, latency REAL, result TEXT, PRIMARY KEY (tool, key))"
+            )
+            self._db.commit()
+
+    def key(self, *args, **kwargs) -> str:
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        canonical = json.dumps(_normalize(dict(bound.arguments)), sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str, now: float) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT created, result, latency FROM tool_results WHERE tool = ? AND key = ?", (self.name, key)
+            ).fetchone()
+            if row is not None and now - row[0] <= self.ttl:
+                entry = (row[0], json.loads(row[1]), row[2])
+                self._store(key, entry)
+                return entry
+        return None
+
+    def _store(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        key = self.key(*args, **kwargs)
+        with self._lock:
+            entry = self._lookup(key, time.time())
+            if entry is not None:
+                self.stats["hits"] += 1
+                self.stats["saved_seconds"] += entry[2]
+                current_span().set("cache.hit", True)
+                return entry[1]
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = _Pending()
+
+        if not leader:
+            # An identical call is already running: wait for its result instead of repeating it
+            if not pending.event.wait(self.wait_timeout):
+                with self._lock:
+                    self.stats["wait_timeouts"] += 1
+                current_span().set("cache.hit", False)
+                return self.func(*args, **kwargs)
+            with self._lock:
+                self.stats["coalesced"] += 1
+            current_span().set("cache.hit", True)
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        current_span().set("cache.hit", False)
+        started = time.perf_counter()
+        try:
+            pending.result = self.func(*args, **kwargs)
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                del self._inflight[key]
+                if pending.error is None:
+                    self.stats["misses"] += 1
+                    created = time.time()
+                    self._store(key, (created, pending.result, latency))
+                    if self._db is not None:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO tool_results (tool, key, created, latency, result) VALUES (?, ?, ?, ?, ?)",
+                            (self.name, key, created, latency, json.dumps(pending.result)),
+                        )
+                        self._db.commit()
+            pending.event.set()
+        return pending.result
+
+    def hit_ratio(self) -> float:
+        served = self.stats["hits"] + self.stats["coalesced"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def clear(self, persisted: bool = True) -> None:
+        """Drops cached results; persisted=False keeps the on-disk copy."""
+        with self._lock:
+            self._entries.clear()
+            if persisted and self._db is not None:
+                self._db.execute("DELETE FROM tool_results WHERE tool = ?", (self.name,))
+                self._db.commit()
+
+
+def cached_tool(ttl: float = 3600.0, maxsize: int = 1024, persist_path: Optional[str] = TOOL_CACHE_DB,
+                wait_timeout: float = DEFAULT_WAIT_TIMEOUT):
+    """
+    Decorator that caches a tool's results, e.g.
+
+        @cached_tool(ttl=900)
+        def search_flights(origin, destination, date, num_travelers=1): ...
+
+    The ToolCache is available as `search_flights.cache`.
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        cache = ToolCache(func, ttl, maxsize, persist_path, wait_timeout)
+        TOOL_CACHES[cache.name] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache(*args, **kwargs)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit ratio and saved latency for every cached tool."""
+    return {
+        name: dict(cache.stats, hit_ratio=round(cache.hit_ratio(), 3), size=len(cache._entries))
+        for name, cache in TOOL_CACHES.items()
+    }
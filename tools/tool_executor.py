@@ -0,0 +1,237 @@
+# Shared tool executor: runs the tool calls of one LLM response concurrently
+# tools/tool_executor.py
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.tool_registry import TOOL_REGISTRY, ToolArgumentError, ToolRegistry
+from framework.tracing import TRACER
+
+DEFAULT_TOOL_TIMEOUT = 30.0  # seconds
+
+
+class SerialLane:
+    """
+    FIFO of serial tool calls for one session. One call runs at a time on the
+    shared pool; the next is submitted when the previous one finishes, so a
+    call that timed out but is still running delays the next instead of
+    overlapping it. A call still queued can be cancelled through its future.
+    """
+
+    __slots__ = ("session_id", "pool", "on_idle", "queue", "busy", "lock")
+
+    def __init__(self, session_id: Optional[str], pool: ThreadPoolExecutor, on_idle: Callable[["SerialLane"], None]):
+        self.session_id = session_id
+        self.pool = pool
+        self.on_idle = on_idle
+        self.queue: deque = deque()
+        self.busy = False
+        self.lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        future: Future = Future()
+        with self.lock:
+            self.queue.append((future, fn, args))
+            start = not self.busy
+            self.busy = True
+        if start:
+            self._next()
+        return future
+
+    def _next(self) -> None:
+        with self.lock:
+            while self.queue:
+                future, fn, args = self.queue.popleft()
+                if future.set_running_or_notify_cancel():
+                    break
+            else:
+                self.busy = False
+                future = None
+        if future is None:
+            self.on_idle(self)
+        else:
+            self.pool.submit(self._run, future, fn, args)
+
+    def _run(self, future: Future, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._next()
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls from a single model response.
+    Independent calls run in parallel on a thread pool, calls to serial tools
+    (registered with serial=True, e.g. the budget) run one after another in
+    their original order, and results always come back in the original
+    tool_call order.
+
+    Serial calls are ordered per session (the context's session_id) through
+    a SerialLane, so a timed-out call that is still running delays the next
+    serial call of its own session instead of overlapping it, while other
+    sessions' serial calls go ahead. A call still queued when its timeout
+    expires never runs.
+    """
+
+    def __init__(self, registry: ToolRegistry = TOOL_REGISTRY, max_workers: int = 8):
+        self.registry = registry
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.serial_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-serial")
+        self.lanes: Dict[Optional[str], SerialLane] = {}  # session id -> lane, while it has calls
+        self._lanes_lock = threading.Lock()
+
+    def _run_one(self, function_name: str, function_args: Dict[str, Any], context: Optional[Dict[str, Any]]) -> str:
+        with TRACER.span(function_name, "tool") as span:
+            try:
+                return self.registry.call(function_name, function_args, context)
+            except Exception as e:
+                span.set("tool.error", str(e))
+                return f"Error running tool '{function_name}': {e}"
+
+    def _release_lane(self, lane: SerialLane) -> None:
+        # Idle lanes are dropped, so finished sessions leave nothing behind
+        with self._lanes_lock:
+            with lane.lock:
+                if lane.busy:
+                    return
+            if self.lanes.get(lane.session_id) is lane:
+                del self.lanes[lane.session_id]
+
+    def _submit(self, function_name: str, function_args: Dict[str, Any], context: Optional[Dict[str, Any]]):
+        # The caller's context goes along, so tool spans nest under the node that made the call
+        args = (contextvars.copy_context().run, self._run_one, function_name, function_args, context)
+        if not self._is_serial(function_name):
+            return self.pool.submit(*args)
+        session_id = (context or {}).get("session_id")
+        with self._lanes_lock:
+            lane = self.lanes.get(session_id)
+            if lane is None:
+                lane = self.lanes[session_id] = SerialLane(session_id, self.serial_pool, self._release_lane)
+            return lane.submit(*args)
+
+    def _timeout(self, function_name: str) -> float:
+        spec = self.registry.get(function_name)
+        return (spec.timeout if spec and spec.timeout else None) or DEFAULT_TOOL_TIMEOUT
+
+    def _is_serial(self, function_name: str) -> bool:
+        spec = self.registry.get(function_name)
+        return bool(spec and spec.serial)
+
+    def _result(self, future, function_name: str, deadline: float) -> str:
+        timeout = self._timeout(function_name)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # Only a call that has not started yet can be cancelled; a running one finishes in its thread
+            if future.cancel():
+                return f"Tool '{function_name}' was not run: still waiting for an earlier call after {timeout:.1f}s."
+            return f"Tool '{function_name}' timed out after {timeout:.1f}s."
+
+    def parse(self, tool_calls) -> List[Tuple[Any, str, Any]]:
+        """
+        Parses model tool calls into (tool_call, function_name, args) triples.
+        Invalid arguments become a ToolArgumentError in place of the args, so the
+        model still gets a result for every call it made.
+        """
+        calls = []
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            try:
+                function_args = self.registry.parse_arguments(function_name, tool_call.function.arguments)
+            except ToolArgumentError as e:
+                print(f"Invalid tool arguments: {e}")
+                function_args = e
+            calls.append((tool_call, function_name, function_args))
+        return calls
+
+    def start(self, call: Tuple[Any, str, Any], context: Optional[Dict[str, Any]] = None):
+        """
+        Submits one parsed call ahead of execute(), e.g. while a streamed response
+        is still arriving. Returns a (future, deadline) handle for execute(started=...),
+        or None for calls that must wait (serial tools, invalid arguments).
+        """
+        _, function_name, function_args = call
+        if isinstance(function_args, ToolArgumentError) or self._is_serial(function_name):
+            return None
+        deadline = time.monotonic() + self._timeout(function_name)
+        return self._submit(function_name, function_args, context), deadline
+
+    def execute(self, calls: List[Tuple[Any, str, Any]], context: Optional[Dict[str, Any]] = None,
+                started: Optional[Dict[int, Any]] = None) -> List[Tuple[Any, str, str]]:
+        """
+        Executes (tool_call, function_name, function_args) triples.
+        `started` maps call index -> handle from start() for calls already running.
+        Returns (tool_call, function_name, tool_response) triples in the same order.
+        """
+        results: List[Optional[str]] = [None] * len(calls)
+
+        # Start every independent call first so they overlap with the serial chain.
+        # Each call's timeout counts from the moment it was submitted.
+        parallel = dict(started or {})
+        for index, call in enumerate(calls):
+            if isinstance(call[2], ToolArgumentError):
+                results[index] = f"Error: {call[2]}"
+            elif index not in parallel:
+                handle = self.start(call, context)
+                if handle is not None:
+                    parallel[index] = handle
+
+        for index, (_, function_name, function_args) in enumerate(calls):
+            if results[index] is None and self._is_serial(function_name):
+                deadline = time.monotonic() + self._timeout(function_name)
+                future = self._submit(function_name, function_args, context)
+                results[index] = self._result(future, function_name, deadline)
+
+        for index, (future, deadline) in parallel.items():
+            results[index] = self._result(future, calls[index][1], deadline)
+
+        return [(tool_call, function_name, results[index]) for index, (tool_call, function_name, _) in enumerate(calls)]
+
+    def run_tool_calls(self, tool_calls, context: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, str, str]]:
+        """Parses and executes a response's tool calls; `context` fills registered context args."""
+        return self.execute(self.parse(tool_calls), context)
+
+    async def _arun(self, function_name: str, function_args: Dict[str, Any], context: Optional[Dict[str, Any]]) -> str:
+        timeout = self._timeout(function_name)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self._submit(function_name, function_args, context)), timeout)
+        except asyncio.TimeoutError:
+            return f"Tool '{function_name}' timed out after {timeout:.1f}s."
+
+    def astart(self, call: Tuple[Any, str, Any], context: Optional[Dict[str, Any]] = None):
+        """Async counterpart of start(): returns a task for aexecute(started=...), or None."""
+        _, function_name, function_args = call
+        if isinstance(function_args, ToolArgumentError) or self._is_serial(function_name):
+            return None
+        return asyncio.ensure_future(self._arun(function_name, function_args, context))
+
+    async def aexecute(self, calls: List[Tuple[Any, str, Any]], context: Optional[Dict[str, Any]] = None,
+                       started: Optional[Dict[int, Any]] = None) -> List[Tuple[Any, str, str]]:
+        """Async counterpart of execute(): same ordering rules, without blocking the event loop."""
+        results: List[Optional[str]] = [None] * len(calls)
+        parallel = dict(started or {})
+        for index, call in enumerate(calls):
+            if isinstance(call[2], ToolArgumentError):
+                results[index] = f"Error: {call[2]}"
+            elif index not in parallel:
+                task = self.astart(call, context)
+                if task is not None:
+                    parallel[index] = task
+        for index, (_, function_name, function_args) in enumerate(calls):
+            if results[index] is None and self._is_serial(function_name):
+                results[index] = await self._arun(function_name, function_args, context)
+        for index, task in parallel.items():
+            results[index] = await task
+
+        return [(tool_call, function_name, results[index]) for index, (tool_call, function_name, _) in enumerate(calls)]
+
+    async def arun_tool_calls(self, tool_calls, context: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, str, str]]:
+        return await self.aexecute(self.parse(tool_calls), context)
@@ -0,0 +1,165 @@
+# Tool registry: one place for tool schemas, argument validation and dispatch
+# tools/tool_registry.py
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from tools.search_tool import SEARCH_TIMEOUT, search_internet
+from tools.flight_tool import FLIGHT_SEARCH_TIMEOUT, search_flights
+from tools.budget_tool import manage_budget
+
+_JSON_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+
+class ToolArgumentError(ValueError):
+    """Raised when a tool call's arguments are not valid JSON or do not match the schema."""
+
+
+class ToolSpec:
+    __slots__ = ("name", "func", "schema", "required", "properties", "serial", "timeout", "context_args")
+
+    def __init__(self, name: str, func: Callable[..., str], schema: Dict[str, Any], serial: bool,
+                 timeout: Optional[float], context_args: Tuple[str, ...]):
+        self.name = name
+        self.func = func
+        self.schema = schema
+        parameters = schema["function"]["parameters"]
+        self.required = tuple(parameters.get("required", ()))
+        # name -> (accepted Python types, enum values or None), precomputed for validation
+        self.properties = {
+            prop: (_JSON_TYPES[spec["type"]], tuple(spec["enum"]) if "enum" in spec else None)
+            for prop, spec in parameters.get("properties", {}).items()
+        }
+        self.serial = serial
+        self.timeout = timeout
+        self.context_args = context_args
+
+    def validate(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(args, dict):
+            raise ToolArgumentError(f"{self.name}: arguments must be a JSON object")
+        for prop in self.required:
+            if args.get(prop) is None:
+                raise ToolArgumentError(f"{self.name}: missing required argument '{prop}'")
+        for prop, value in args.items():
+            spec = self.properties.get(prop)
+            if spec is None:
+                raise ToolArgumentError(f"{self.name}: unexpected argument '{prop}'")
+            if value is None:
+                continue
+            types, enum = spec
+            # bool is an int subclass in Python but not a JSON number
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise ToolArgumentError(f"{self.name}: argument '{prop}' has the wrong type")
+            if enum is not None and value not in enum:
+                raise ToolArgumentError(f"{self.name}: argument '{prop}' must be one of {list(enum)}")
+        return args
+
+
+class ToolRegistry:
+    """
+    Tools register once with their JSON schema and callable. Agents share the
+    schema lists, dispatch is a dict lookup, and arguments are parsed as
+    strict JSON and validated against the schema before the call.
+    """
+
+    def __init__(self):
+        self.tools: Dict[str, ToolSpec] = {}
+        self._schema_lists: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+
+    def register(self, func: Callable[..., str], description: str, properties: Dict[str, Any],
+                 required: Iterable[str] = (), name: str = None, serial: bool = False,
+                 timeout: float = None, context_args: Iterable[str] = ()) -> ToolSpec:
+        """
+        Registers `func` as a tool. `serial` tools keep their call order (they
+        mutate state); `context_args` are filled from the agent's context (e.g.
+        session_id) instead of by the model.
+        """
+        name = name or func.__name__
+        schema = {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": {"type": "object", "properties": properties, "required": list(required)},
+            },
+        }
+        spec = ToolSpec(name, func, schema, serial, timeout, tuple(context_args))
+        self.tools[name] = spec
+        self._schema_lists.clear()
+        return spec
+
+    def schemas(self, names: Iterable[str]) -> List[Dict[str, Any]]:
+        """The `tools=` list for a set of tool names, built once and shared."""
+        key = tuple(names)
+        schemas = self._schema_lists.get(key)
+        if schemas is None:
+            schemas = self._schema_lists[key] = [self.tools[name].schema for name in key]
+        return schemas
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self.tools.get(name)
+
+    def parse_arguments(self, name: str, raw_arguments: str) -> Dict[str, Any]:
+        spec = self.tools.get(name)
+        if spec is None:
+            raise ToolArgumentError(f"Unknown tool '{name}'")
+        try:
+            args = json.loads(raw_arguments or "{}")
+        except json.JSONDecodeError as e:
+            raise ToolArgumentError(f"{name}: arguments are not valid JSON ({e.msg})")
+        return spec.validate(args)
+
+    def call(self, name: str, args: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> str:
+        spec = self.tools.get(name)
+        if spec is None:
+            return f"Unknown tool '{name}'."
+        if context and spec.context_args:
+            args = dict(args, **{key: context[key] for key in spec.context_args if key in context})
+        return spec.func(**args)
+
+
+TOOL_REGISTRY = ToolRegistry()
+
+TOOL_REGISTRY.register(
+    search_internet,
+    "Search the internet for information about Bali trip planning, attractions, costs, "
+    "or specific details for parts of the plan (e.g., a restaurant, exact timings for a temple).",
+    {"query": {"type": "string", "description": "The search query."}},
+    required=["query"],
+    timeout=SEARCH_TIMEOUT,
+)
+TOOL_REGISTRY.register(
+    search_flights,
+    "Search round-trip fares across a date window and several routes in one call. "
+    "Returns JSON with the cheapest option, the best options and the cheapest fare per route.",
+    {
+        "origin": {"type": "string", "description": "Departure city, or several comma-separated (e.g., 'Delhi' or 'Delhi, Mumbai')."},
+        "destination": {"type": "string", "description": "Arrival city, or several comma-separated (e.g., Bali)."},
+        "date": {"type": "string", "description": "Departure date (e.g., '2025-07-20') or month (e.g., 'July 2025')."},
+        "num_travelers": {"type": "integer", "description": "Number of travelers; only fares with enough seats are returned."},
+        "date_to": {"type": "string", "description": "Last departure date of the window (optional)."},
+        "max_results": {"type": "integer", "description": "How many of the cheapest options to return (default 5)."},
+    },
+    required=["origin", "destination", "date"],
+    timeout=FLIGHT_SEARCH_TIMEOUT,
+)
+TOOL_REGISTRY.register(
+    manage_budget,
+    "Track and manage the trip budget, including granular expenses.",
+    {
+        "action": {"type": "string", "enum": ["add_expense", "get_status"], "description": "Action to perform on the budget."},
+        "item": {"type": "string", "description": "Name of the expense item (required for add_expense)."},
+        "cost": {"type": "number", "description": "Cost of the item (required for add_expense)."},
+        "category": {"type": "string", "description": "Expense category, e.g. transport, lodging, food, activities (optional)."},
+    },
+    required=["action"],
+    serial=True,
+    context_args=["session_id"],
+)
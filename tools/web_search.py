@@ -1,23 +1,23 @@
-# Tool: Web search stub for now
+# Tool: Web search stub for now, answered from the local destination knowledge base
 # tools/search_tool.py
 
+from tools.tool_cache import cached_tool
+from tools.knowledge_base import knowledge_base
+
+MAX_SNIPPETS = 3
+MIN_RELATIVE_SCORE = 0.5  # drop snippets scoring under half of the best one
+SEARCH_TIMEOUT = 10.0  # seconds; the registry's call timeout and the cache's coalescing wait
+
+
+@cached_tool(ttl=24 * 3600, wait_timeout=SEARCH_TIMEOUT)
 def search_internet(query: str) -> str:
     """
-    Simulates an internet search. In a real application, this would call a search API.
+    Simulates an internet search with ranked snippets from the local knowledge base.
+    In a real application, this would call a search API.
     """
     print(f"\n[TOOL CALL] Searching for: '{query}'...")
-    # Dummy results based on common Bali search queries
-    if "7-day relaxing trip Bali" in query.lower():
-        return "Bali offers diverse experiences: beaches (Seminyak, Kuta, Nusa Dua), cultural sites (Ubud, temples like Tanah Lot, Uluwatu), and nature (Mount Batur, Tegalalang rice terraces). Average cost for 7 days can range from ₹60,000 to ₹120,000 depending on luxury."
-    elif "beaches in Bali" in query.lower():
-        return "Popular beaches include Kuta (lively, surfing), Seminyak (upscale, dining), Nusa Dua (resorts, water sports), Jimbaran (seafood dinners), Padang Padang (small, scenic)."
-    elif "cultural sites Bali" in query.lower() or "temples Bali" in query.lower():
-        return "Key cultural sites: Ubud (art, yoga, Monkey Forest, rice terraces), Tanah Lot Temple (ocean temple, sunset), Uluwatu Temple (cliff temple, Kecak dance), Besakih Temple (mother temple)."
-    elif "nature activities Bali" in query.lower():
-        return "Nature activities: Mount Batur sunrise trek, Tegalalang Rice Terraces, Tegenungan Waterfall, snorkeling/diving in Nusa Penida or Menjangan Island."
-    elif "cost of food Bali" in query.lower():
-        return "Food in Bali can range from 100-300 INR for local warungs to 1000-3000 INR+ per meal for fine dining."
-    elif "transportation in Bali" in query.lower():
-        return "Transportation options include ride-hailing apps (Gojek, Grab), private drivers, scooter rentals, and taxis. A private driver for a day costs around 2000-4000 INR."
-    else:
-        return f"No specific information found for '{query}'. This is a dummy search."
\ No newline at end of file
+    results = knowledge_base().search(query, k=MAX_SNIPPETS)
+    if not results:
+        return f"No specific information found for '{query}'. This is a dummy search."
+    cutoff = results[0]["score"] * MIN_RELATIVE_SCORE
+    return "\n".join(f"- {r['destination']}: {r['text']}" for r in results if r["score"] >= cutoff)